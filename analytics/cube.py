@@ -0,0 +1,187 @@
+import copy
+import numpy as np
+import pandas as pd
+from analytics.gpa import first_year_level
+from analytics.pass_fail import PASSING_GRADE, teacher_display_names
+from analytics.incomplete import INCOMPLETE_REMARKS
+
+# Finest grain of the cube. SchoolYear and Semester depend on SemesterID and
+# are carried along so they can be grouped and filtered on directly.
+CUBE_DIMENSIONS = ["SemesterID", "SchoolYear", "Semester", "Course", "YearLevel", "SubjectCode", "Teacher", "section"]
+CUBE_MEASURES = ["Records", "Count", "Sum", "SumSq", "Pass", "Fail", "Incomplete"]
+CELL_GRAIN = ["SemesterID", "Course", "YearLevel", "SubjectCode", "Teacher", "section"]
+
+
+def _cell_key(values):
+    # Missing values group together in the cube (dropna=False); make them hash alike
+    return tuple(None if pd.isna(value) else value for value in values)
+
+
+class GradeCube:
+    """
+    Additive grade aggregates at the finest grain of the registrar dimensions.
+
+    Each cell holds, for one (semester, course, year level, subject, teacher,
+    section):
+      Records     grade entries
+      Count       numeric grades
+      Sum, SumSq  sum and sum of squares of the numeric grades
+      Pass, Fail  numeric grades at/above and below the passing grade
+      Incomplete  INC, Dropped and missing grades
+
+    All measures are sums, so any roll-up or slice is a group-by over the
+    cells (see query) and never touches the raw grades again. Teacher holds
+    display names; `teacher_names` maps teacher ids to names, other values
+    are shown as is and a missing teacher becomes "Unknown".
+
+    The cube is maintained incrementally: updated() applies a batch of
+    grade fact changes by moving each grade out of its old cell and into
+    its new one.
+    """
+
+    def __init__(self, facts, students, semesters_df, teacher_names=None, passing_grade=PASSING_GRADE):
+        self.passing_grade = passing_grade
+        self._students = students
+        self._teacher_names = teacher_names
+        self._semesters = semesters_df.drop_duplicates(subset=["_id"], keep="last").set_index("_id")[["SchoolYear", "Semester"]]
+        grades = facts["Grade"].to_numpy()
+        graded = ~np.isnan(grades)
+        values = np.where(graded, grades, 0.0)
+        remarks = facts["GradeRemark"]
+        incomplete = ~graded & (remarks.isna() | remarks.isin(list(INCOMPLETE_REMARKS))).to_numpy()
+
+        student_keys = students.keys_for(facts["StudentID"].to_numpy())
+        entries = pd.DataFrame({
+            "SemesterID": facts["SemesterID"].to_numpy(),
+            "Course": students.take("Course", student_keys),
+            "YearLevel": first_year_level(students.take("YearLevel", student_keys)),
+            "SubjectCode": facts["SubjectCode"],
+            "Teacher": facts["Teacher"],
+            "section": facts["section"],
+            "Records": np.ones(len(facts), dtype="int64"),
+            "Count": graded.astype("int64"),
+            "Sum": values,
+            "SumSq": values * values,
+            "Pass": (graded & (values >= passing_grade)).astype("int64"),
+            "Fail": (graded & (values < passing_grade)).astype("int64"),
+            "Incomplete": incomplete.astype("int64"),
+        }, index=facts.index)
+
+        cells = entries.groupby(CELL_GRAIN, sort=False, observed=True, dropna=False)[CUBE_MEASURES].sum().reset_index()
+        for column in ["SubjectCode", "Teacher", "section"]:
+            cells[column] = np.asarray(cells[column], dtype=object)
+
+        # Resolve teacher names once per cell instead of once per grade
+        cells["Teacher"] = teacher_display_names(cells["Teacher"], teacher_names)
+
+        cells.insert(1, "SchoolYear", cells["SemesterID"].map(self._semesters["SchoolYear"]).to_numpy())
+        cells.insert(2, "Semester", cells["SemesterID"].map(self._semesters["Semester"]).to_numpy())
+        self._set_cells(cells)
+
+    def _set_cells(self, cells):
+        self.cells = cells
+        self._cell_positions = {
+            _cell_key(values): position
+            for position, values in enumerate(cells[CELL_GRAIN].itertuples(index=False, name=None))
+        }
+
+    def __len__(self):
+        return len(self.cells)
+
+    def _measures(self, row):
+        grade = row["Grade"]
+        graded = pd.notna(grade)
+        value = float(grade) if graded else 0.0
+        remark = row["GradeRemark"]
+        incomplete = not graded and (pd.isna(remark) or remark in INCOMPLETE_REMARKS)
+        return np.array([
+            1, graded, value, value * value,
+            graded and value >= self.passing_grade, graded and value < self.passing_grade, incomplete,
+        ], dtype="float64")
+
+    def _cell_of(self, row):
+        student_key = self._students.keys_for([row["StudentID"]])
+        return _cell_key((
+            row["SemesterID"],
+            self._students.take("Course", student_key)[0],
+            first_year_level(self._students.take("YearLevel", student_key))[0],
+            row["SubjectCode"],
+            teacher_display_names([row["Teacher"]], self._teacher_names)[0],
+            row["section"],
+        ))
+
+    def updated(self, changes):
+        """
+        Copy of the cube with a batch of grade fact changes applied
+        (snapshot_store.FactChange): each old row's measures leave its cell
+        and each new row's enter its cell, which is added when missing.
+        Cells left without records are dropped, as a rebuild would.
+        """
+        adjustments = {}
+        for change in changes:
+            for row, sign in ((change.old, -1), (change.new, 1)):
+                if row is not None:
+                    cell = self._cell_of(row)
+                    adjustments[cell] = adjustments.get(cell, 0) + sign * self._measures(row)
+
+        cube = copy.copy(self)
+        cells = self.cells.copy()
+        measures = {measure: cells[measure].to_numpy(copy=True) for measure in CUBE_MEASURES}
+        added = []
+        for cell, adjustment in adjustments.items():
+            position = self._cell_positions.get(cell)
+            if position is None:
+                added.append(dict(zip(CELL_GRAIN, cell), **dict(zip(CUBE_MEASURES, adjustment))))
+                continue
+            for measure, value in zip(CUBE_MEASURES, adjustment):
+                measures[measure][position] += value
+        for measure, values in measures.items():
+            cells[measure] = values
+
+        if added:
+            added = pd.DataFrame(added).astype({measure: cells[measure].dtype for measure in CUBE_MEASURES})
+            added.insert(1, "SchoolYear", added["SemesterID"].map(self._semesters["SchoolYear"]).to_numpy())
+            added.insert(2, "Semester", added["SemesterID"].map(self._semesters["Semester"]).to_numpy())
+            cells = pd.concat([cells, added[cells.columns]], ignore_index=True)
+        cube._set_cells(cells[cells["Records"] > 0].reset_index(drop=True))
+        return cube
+
+    def slice(self, where=None):
+        """
+        Cells matching `where`: {dimension: value}. A list, tuple, set, array
+        or Index matches any of its values; None leaves a dimension open.
+        """
+        cells = self.cells
+        for dimension, value in (where or {}).items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set, np.ndarray, pd.Index)):
+                cells = cells[cells[dimension].isin(list(value))]
+            else:
+                cells = cells[cells[dimension] == value]
+        return cells
+
+    def query(self, by=(), where=None, measures=None):
+        """
+        Roll the cube up to the `by` dimensions after slicing it with `where`.
+
+        Returns one row per group (sorted by `by`) with the requested measures
+        (all by default) plus Mean and Std of the numeric grades when Count,
+        Sum and SumSq are included. With no `by`, a single grand-total row.
+        """
+        measures = list(measures or CUBE_MEASURES)
+        by = [by] if isinstance(by, str) else list(by)
+        cells = self.slice(where)
+        if by:
+            result = cells.groupby(by, sort=True, dropna=False)[measures].sum().reset_index()
+        else:
+            result = pd.DataFrame({measure: [cells[measure].sum()] for measure in measures})
+
+        if {"Count", "Sum", "SumSq"} <= set(measures):
+            count = result["Count"].to_numpy(dtype="float64")
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(count > 0, result["Sum"].to_numpy() / count, np.nan)
+                variance = np.where(count > 0, result["SumSq"].to_numpy() / count - mean * mean, np.nan)
+            result["Mean"] = mean
+            result["Std"] = np.sqrt(np.clip(variance, 0, None))
+        return result
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from analytics.gpa import first_year_level
+
+ENROLLMENT_DIMENSIONS = ["SchoolYear", "Semester", "Course", "YearLevel"]
+
+
+class EnrollmentCube:
+    """
+    Distinct students per (SchoolYear, Semester, Course, YearLevel).
+
+    Enrollments are the distinct (StudentID, SemesterID) pairs of the grades
+    collection; Course and YearLevel come from the students DimensionTable
+    and SchoolYear/Semester from the semesters frame. Enrollments whose
+    student, course or semester is unknown are left out of the cells.
+
+    A student has one Course and YearLevel, so summing cells over any of the
+    dimensions gives enrollment counts (student-semesters). Distinct students
+    across semesters cannot be summed and are kept per course in
+    `students_by_course`.
+    """
+
+    def __init__(self, grades_df, students, semesters_df):
+        pairs = grades_df[["StudentID", "SemesterID"]].drop_duplicates()
+        student_keys = students.keys_for(pairs["StudentID"].to_numpy())
+        semesters = semesters_df.drop_duplicates(subset=["_id"], keep="last").set_index("_id")
+        enrollments = pd.DataFrame({
+            "StudentID": pairs["StudentID"].to_numpy(),
+            "SchoolYear": pairs["SemesterID"].map(semesters["SchoolYear"]).to_numpy(),
+            "Semester": pairs["SemesterID"].map(semesters["Semester"]).to_numpy(),
+            "Course": students.take("Course", student_keys),
+            "YearLevel": first_year_level(students.take("YearLevel", student_keys)),
+        })
+
+        self.total_students = enrollments["StudentID"].nunique()
+        self.students_by_course = enrollments.groupby("Course", sort=False)["StudentID"].nunique()
+
+        known = enrollments[["SchoolYear", "Semester", "Course"]].notna().all(axis=1)
+        self.cells = (
+            enrollments[known]
+            .groupby(ENROLLMENT_DIMENSIONS, sort=True, dropna=False)
+            .size()
+            .reset_index(name="Count")
+        )
+
+    def rollup(self, by, course=None):
+        """Enrollment counts summed up to the `by` dimensions (optionally for one course)"""
+        cells = self.cells if course is None else self.cells[self.cells["Course"] == course]
+        return cells.groupby(by, sort=True)["Count"].sum().reset_index()
+
+    def distinct_students(self, course=None):
+        """Distinct enrolled students, overall or for one course"""
+        if course is None:
+            return int(self.total_students)
+        return int(self.students_by_course.get(course, 0))
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+def semester_gpa(facts, weights=None):
+    """
+    GPA per student per semester from the grade fact table.
+    Plain mean of numeric grades, or a weighted mean when `weights`
+    (e.g. subject units, aligned with `facts`) is given.
+    Returns StudentID, SemesterID, GPA, Subjects.
+    """
+    graded = facts["Grade"].notna()
+    if weights is not None:
+        weights = pd.Series(np.asarray(weights, dtype="float64"), index=facts.index)
+        graded &= weights.notna() & (weights > 0)
+    rows = facts.loc[graded, ["StudentID", "SemesterID", "Grade"]]
+    if rows.empty:
+        return pd.DataFrame({
+            "StudentID": pd.Series(dtype="int64"),
+            "SemesterID": pd.Series(dtype="int64"),
+            "GPA": pd.Series(dtype="float64"),
+            "Subjects": pd.Series(dtype="int64"),
+        })
+
+    if weights is None:
+        grouped = rows.groupby(["StudentID", "SemesterID"], sort=False)["Grade"].agg(["mean", "size"])
+        return grouped.set_axis(["GPA", "Subjects"], axis=1).reset_index()
+
+    rows = rows.assign(Weight=weights[graded], Weighted=rows["Grade"] * weights[graded])
+    grouped = rows.groupby(["StudentID", "SemesterID"], sort=False).agg(
+        Weighted=("Weighted", "sum"), Weight=("Weight", "sum"), Subjects=("Grade", "size")
+    )
+    grouped["GPA"] = grouped["Weighted"] / grouped["Weight"]
+    return grouped[["GPA", "Subjects"]].reset_index()
+
+
+def student_gpa(semester_gpas):
+    """Overall GPA per student: mean of the student's semester GPAs (indexed by StudentID)"""
+    return semester_gpas.groupby("StudentID", sort=False)["GPA"].mean()
+
+
+def first_year_level(values):
+    """YearLevel values may be stored as one-element lists; take the first (0 when empty)"""
+    return [
+        (v[0] if len(v) else 0) if isinstance(v, (list, tuple, np.ndarray)) else v
+        for v in values
+    ]
+
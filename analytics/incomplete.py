@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+# Grade type of each incomplete grade remark; a missing grade is "Missing"
+INCOMPLETE_REMARKS = {"INC": "Incomplete", "Dropped": "Dropped"}
+
+
+def _incomplete_entries(rows):
+    grade = rows["GradeRemark"].to_numpy()
+    return pd.DataFrame({
+        "StudentID": rows["StudentID"].to_numpy(),
+        "SemesterID": rows["SemesterID"].to_numpy(),
+        "SubjectCode": np.asarray(rows["SubjectCode"], dtype=object),
+        "Grade": grade,
+        "Teacher": np.asarray(rows["Teacher"], dtype=object),
+        "Position": rows["Position"].to_numpy(),
+        "GradeType": pd.Series(grade, dtype=object).map(INCOMPLETE_REMARKS).fillna("Missing").to_numpy(),
+    })
+
+
+class IncompleteGradeIndex:
+    """
+    Positions of incomplete grades (INC, Dropped and missing) in the grade
+    fact table, keyed by teacher and by semester.
+
+    `entries` has one row per incomplete grade: StudentID, SemesterID,
+    SubjectCode, Grade (the raw remark, None when missing), Teacher,
+    Position (index inside the source document) and GradeType.
+    """
+
+    def __init__(self, facts):
+        remarks = facts["GradeRemark"]
+        incomplete = facts["Grade"].isna().to_numpy() & (remarks.isna() | remarks.isin(list(INCOMPLETE_REMARKS))).to_numpy()
+        self._set_entries(_incomplete_entries(facts[incomplete]))
+
+    def _set_entries(self, entries):
+        self.entries = entries
+        self._by_teacher = self.entries.groupby("Teacher", sort=False).indices
+        self._by_semester = self.entries.groupby("SemesterID", sort=False).indices
+
+    def __len__(self):
+        return len(self.entries)
+
+    def updated(self, changes):
+        """
+        Copy of the index with a batch of grade fact changes applied
+        (snapshot_store.FactChange): a changed grade leaves the index and
+        re-enters it (at the end) only if its new value is still incomplete.
+        """
+        if not changes:
+            return self
+        entries = self.entries
+        changed = pd.MultiIndex.from_tuples(
+            [(c.new["StudentID"], c.new["SemesterID"], c.new["SubjectCode"]) for c in changes]
+        )
+        stale = pd.MultiIndex.from_frame(entries[["StudentID", "SemesterID", "SubjectCode"]]).isin(changed)
+
+        # Later changes to the same grade win
+        latest = {(c.new["StudentID"], c.new["SemesterID"], c.new["SubjectCode"]): c.new for c in changes}
+        rows = pd.DataFrame([
+            row for row in latest.values()
+            if pd.isna(row["Grade"]) and (pd.isna(row["GradeRemark"]) or row["GradeRemark"] in INCOMPLETE_REMARKS)
+        ], columns=["StudentID", "SemesterID", "SubjectCode", "GradeRemark", "Teacher", "Position"])
+
+        index = IncompleteGradeIndex.__new__(IncompleteGradeIndex)
+        index._set_entries(pd.concat([entries[~stale], _incomplete_entries(rows)], ignore_index=True))
+        return index
+
+    def positions(self, teacher=None, semester_id=None):
+        """Row positions in `entries` for a teacher and/or semester (None means any)"""
+        selected = np.arange(len(self.entries))
+        empty = np.array([], dtype=np.int64)
+        if teacher is not None:
+            selected = np.intersect1d(selected, self._by_teacher.get(teacher, empty))
+        if semester_id is not None:
+            selected = np.intersect1d(selected, self._by_semester.get(semester_id, empty))
+        return selected
+
+    def lookup(self, teacher=None, semester_id=None):
+        """Incomplete grades for a teacher and/or semester, in index order (fact table order until updated)"""
+        return self.entries.take(self.positions(teacher, semester_id))
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+PASSING_GRADE = 75
+
+
+def teacher_display_names(values, teacher_names=None):
+    """
+    Display names for teacher values: `teacher_names` maps teacher ids to
+    names, other values are shown as is and a missing teacher is "Unknown".
+    """
+    teacher_names = teacher_names or {}
+    return np.array(
+        ["Unknown" if pd.isna(value) else teacher_names.get(value, str(value)) for value in values],
+        dtype=object,
+    )
+
+
+def subject_pass_fail(counts, subject_names=None):
+    """
+    Roll pass/fail counts up to one row per subject, sorted by Subject:
+    Subject, Fail, Pass, Total, Pass Rate (%), Fail Rate (%).
+    `subject_names` maps SubjectCode -> display name (unmapped codes are shown
+    as is). Subjects without numeric grades are left out.
+    """
+    counts = counts[(counts["Pass"] + counts["Fail"]) > 0]
+    subjects = counts["SubjectCode"]
+    if subject_names is not None:
+        subjects = subjects.map(subject_names).fillna(subjects)
+    summary = counts[["Fail", "Pass"]].groupby(subjects.rename("Subject")).sum().reset_index()
+    summary["Total"] = summary["Pass"] + summary["Fail"]
+    summary["Pass Rate (%)"] = (summary["Pass"] / summary["Total"] * 100).round(2)
+    summary["Fail Rate (%)"] = (summary["Fail"] / summary["Total"] * 100).round(2)
+    return summary
+
+
+def pass_fail_rollup(counts, by):
+    """
+    Roll pass/fail counts up to `by`: Fail, Pass, Total and Pass Rate (%)
+    per group, best pass rate first (ties broken by Total, then Pass).
+    Groups without numeric grades are left out.
+    """
+    rollup = counts.groupby(by, sort=True, dropna=False)[["Fail", "Pass"]].sum()
+    rollup = rollup[(rollup["Pass"] + rollup["Fail"]) > 0]
+    rollup["Total"] = rollup["Pass"] + rollup["Fail"]
+    rollup["Pass Rate (%)"] = (rollup["Pass"] / rollup["Total"] * 100).round(1)
+    return rollup.reset_index().sort_values(["Pass Rate (%)", "Total", "Pass"], ascending=[False, False, False], kind="stable")
+
+
+def teacher_grade_histogram(facts, teacher_names=None):
+    """
+    Number of numeric grades per (Teacher display name, Grade rounded to a
+    whole number) from the grade fact table.
+    """
+    graded = facts[facts["Grade"].notna()]
+    if graded.empty:
+        return pd.DataFrame({
+            "Teacher": pd.Series(dtype=object),
+            "Grade": pd.Series(dtype="int64"),
+            "Count": pd.Series(dtype="int64"),
+        })
+
+    # Resolve each distinct teacher value once instead of once per grade
+    teachers = pd.Categorical(graded["Teacher"])
+    names = np.append(teacher_display_names(teachers.categories, teacher_names), "Unknown")
+    histogram = pd.DataFrame({
+        "Teacher": names[teachers.codes],
+        "Grade": np.round(graded["Grade"].to_numpy()).astype("int64"),
+    }).groupby(["Teacher", "Grade"], sort=True).size()
+    return histogram.reset_index(name="Count")
+
+
+def update_teacher_grade_histogram(histogram, changes, teacher_names=None):
+    """
+    Teacher grade histogram with a batch of grade fact changes applied
+    (snapshot_store.FactChange): each old numeric grade is counted out of
+    its (Teacher, Grade) bin and each new one into its bin.
+    """
+    adjustments = {}
+    for change in changes:
+        for row, sign in ((change.old, -1), (change.new, 1)):
+            if row is not None and pd.notna(row["Grade"]):
+                teacher = teacher_display_names([row["Teacher"]], teacher_names)[0]
+                key = (teacher, int(np.round(row["Grade"])))
+                adjustments[key] = adjustments.get(key, 0) + sign
+    if not adjustments:
+        return histogram
+
+    counts = histogram.set_index(["Teacher", "Grade"])["Count"].add(
+        pd.Series(adjustments, dtype="int64").rename_axis(["Teacher", "Grade"]), fill_value=0
+    ).astype("int64")
+    return counts[counts > 0].sort_index().reset_index(name="Count")
+
+
+def grade_distribution(histogram):
+    """Number of grades per rounded Grade in (a slice of) a grade histogram (Grade, Count)"""
+    return histogram.groupby("Grade", sort=True)["Count"].sum().reset_index()
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from analytics.gpa import student_gpa, first_year_level
+
+COHORT_FIELDS = ("Course", "YearLevel")
+
+
+class GPARankIndex:
+    """
+    Sorted GPA arrays per cohort, so rank, percentile and top-N questions are
+    a searchsorted instead of recomputing and sorting everybody's GPA.
+
+    A cohort is (SemesterID, Course, YearLevel) with None meaning "all";
+    SemesterID None ranks the overall GPA (student_gpa: mean of the semester
+    GPAs). GPAs are ranked unrounded and only rounded for display. Each
+    cohort keeps its GPAs negated in ascending order (best first) with the
+    matching StudentIDs; exact ties keep the order students first appear in
+    `semester_gpas`. Students missing from the `students` DimensionTable are
+    left out.
+    """
+
+    def __init__(self, semester_gpas, students):
+        self._cohorts = {}
+        self._scopes = {}
+        self._courses = {}
+        self._add_scope(None, student_gpa(semester_gpas), students)
+        for semester_id, rows in semester_gpas.groupby("SemesterID", sort=True):
+            self._add_scope(semester_id, student_gpa(rows), students)
+
+    def _add_scope(self, semester_id, gpa, students):
+        keys = students.keys_for(gpa.index.to_numpy())
+        known = keys >= 0
+        scope = pd.DataFrame({
+            "StudentID": gpa.index.to_numpy()[known],
+            "GPA": gpa.to_numpy(dtype="float64")[known],
+            "Course": students.take("Course", keys[known]),
+            "YearLevel": first_year_level(students.take("YearLevel", keys[known])),
+        })
+        negated = -scope["GPA"].to_numpy()
+        student_ids = scope["StudentID"].to_numpy()
+
+        def add(cohort, rows):
+            order = np.argsort(negated[rows], kind="stable")
+            self._cohorts[(semester_id, *cohort)] = (negated[rows][order], student_ids[rows][order])
+
+        add((None, None), np.arange(len(scope)))
+        for course, rows in scope.groupby("Course", sort=False).indices.items():
+            add((course, None), rows)
+        for year_level, rows in scope.groupby("YearLevel", sort=False).indices.items():
+            add((None, year_level), rows)
+        for (course, year_level), rows in scope.groupby(["Course", "YearLevel"], sort=False).indices.items():
+            add((course, year_level), rows)
+
+        self._scopes[semester_id] = scope.set_index("StudentID")
+        self._courses[semester_id] = list(pd.unique(scope["Course"].dropna()))
+
+    def _cohort(self, semester_id, course, year_level):
+        empty = np.array([], dtype="float64")
+        return self._cohorts.get((semester_id, course, year_level), (empty, empty))
+
+    def cohort_size(self, semester_id=None, course=None, year_level=None):
+        return len(self._cohort(semester_id, course, year_level)[0])
+
+    def rank_of(self, gpa, semester_id=None, course=None, year_level=None):
+        """1 + number of cohort students with a higher GPA"""
+        negated, _ = self._cohort(semester_id, course, year_level)
+        return int(np.searchsorted(negated, -gpa, side="left")) + 1
+
+    def percentile_of(self, gpa, semester_id=None, course=None, year_level=None):
+        """Percentage of the cohort with a GPA at or below `gpa` (None for an empty cohort)"""
+        negated, _ = self._cohort(semester_id, course, year_level)
+        if not len(negated):
+            return None
+        above = np.searchsorted(negated, -gpa, side="left")
+        return 100.0 * (len(negated) - above) / len(negated)
+
+    def top(self, n, semester_id=None, course=None, year_level=None):
+        """StudentIDs and GPAs of the n best in a cohort, best first"""
+        negated, student_ids = self._cohort(semester_id, course, year_level)
+        return student_ids[:n], -negated[:n]
+
+    def position(self, student_id, semester_id=None, by=COHORT_FIELDS):
+        """
+        Where a student stands within the cohort sharing their `by` fields
+        (any of Course, YearLevel; empty for everybody): GPA, Rank, CohortSize,
+        Percentile, plus the Course and YearLevel used. None when the student
+        has no GPA in that scope or no cohort (a missing Course / YearLevel).
+        """
+        scope = self._scopes.get(semester_id)
+        if scope is None or student_id not in scope.index:
+            return None
+        row = scope.loc[student_id]
+        course = row["Course"] if "Course" in by else None
+        year_level = row["YearLevel"] if "YearLevel" in by else None
+        if not self.cohort_size(semester_id, course, year_level):
+            return None
+        return {
+            "GPA": row["GPA"],
+            "Course": course,
+            "YearLevel": year_level,
+            "Rank": self.rank_of(row["GPA"], semester_id, course, year_level),
+            "CohortSize": self.cohort_size(semester_id, course, year_level),
+            "Percentile": self.percentile_of(row["GPA"], semester_id, course, year_level),
+        }
+
+    def is_top(self, student_id, n, semester_id=None, by=COHORT_FIELDS):
+        """
+        True when the student is among the n students top() lists for their
+        cohort (exactly n, like the Top Performers tab, even with ties)
+        """
+        position = self.position(student_id, semester_id, by)
+        if position is None:
+            return False
+        top_ids, _ = self.top(n, semester_id, position["Course"], position["YearLevel"])
+        return student_id in top_ids
+
+    def top_per_course(self, n, semester_id=None):
+        """
+        The n best per course (StudentID, Course, YearLevel, GPA), ordered by
+        GPA descending across courses. GPA is rounded to 2 decimals for
+        display after the selection.
+        """
+        scope = self._scopes.get(semester_id)
+        if scope is None or scope.empty:
+            return pd.DataFrame()
+        student_ids = np.concatenate(
+            [self.top(n, semester_id, course)[0] for course in self._courses[semester_id]] or [np.array([], dtype="int64")]
+        )
+        top = scope.loc[student_ids].reset_index()
+        top = top.sort_values("GPA", ascending=False, kind="stable", ignore_index=True)[["StudentID", "Course", "YearLevel", "GPA"]]
+        top["GPA"] = top["GPA"].round(2)
+        return top
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+RETENTION_STATUSES = ["Retained", "Dropped", "At Risk"]
+
+
+def semester_order(semesters_df):
+    """Chronological rank of each semester _id (by SchoolYear, then Semester)"""
+    ordered = semesters_df.sort_values(by=["SchoolYear", "Semester"], kind="stable")
+    return pd.Series(np.arange(len(ordered)), index=ordered["_id"].to_numpy())
+
+
+def student_activity(grades_df, semesters_df, standing):
+    """
+    Activity index with one row per student that has grade records.
+
+    Indexed by StudentID with FirstSemesterID, LastSemesterID (in semester
+    order), SemestersEnrolled and LatestStatus, the academic standing in the
+    last active semester (None when its document lists no subjects).
+    `standing` comes from analytics.standing.semester_standing().
+    """
+    pairs = grades_df[["StudentID", "SemesterID"]].drop_duplicates()
+    if pairs.empty:
+        return pd.DataFrame(
+            {
+                "FirstSemesterID": pd.Series(dtype=object),
+                "LastSemesterID": pd.Series(dtype=object),
+                "SemestersEnrolled": pd.Series(dtype="int64"),
+                "LatestStatus": pd.Series(dtype=object),
+            },
+            index=pd.Index([], name="StudentID"),
+        )
+
+    # Unknown semesters sort before every known one
+    rank = pd.Index(semester_order(semesters_df).index).get_indexer(pairs["SemesterID"].to_numpy())
+    pairs = pairs.assign(Rank=rank).sort_values(["StudentID", "Rank"], kind="stable")
+    grouped = pairs.groupby("StudentID", sort=True)["SemesterID"]
+    activity = pd.DataFrame({
+        "FirstSemesterID": grouped.first(),
+        "LastSemesterID": grouped.last(),
+        "SemestersEnrolled": grouped.size(),
+    })
+
+    standing_keys = pd.MultiIndex.from_arrays([standing["StudentID"].to_numpy(), standing["SemesterID"].to_numpy()])
+    positions = standing_keys.get_indexer(
+        pd.MultiIndex.from_arrays([activity.index.to_numpy(), activity["LastSemesterID"].to_numpy()])
+    )
+    statuses = standing["Status"].to_numpy()
+    latest = np.full(len(activity), None, dtype=object)
+    latest[positions >= 0] = statuses[positions[positions >= 0]]
+    activity["LatestStatus"] = latest
+    return activity
+
+
+def retention_status(student_ids, activity, latest_semester_ids):
+    """
+    Retained / Dropped / At Risk for each student id, in one pass over the activity index.
+
+    Students with no grade records are Dropped. Students whose standing in
+    the latest semester is Probation are At Risk; everyone else (including
+    students with no grade entries in the latest semester) is Retained.
+    """
+    positions = activity.index.get_indexer(np.asarray(student_ids))
+    known = positions >= 0
+    rows = positions[known]
+
+    latest_status = np.full(len(positions), None, dtype=object)
+    in_latest = activity["LastSemesterID"].isin(np.atleast_1d(latest_semester_ids)).to_numpy()[rows]
+    latest_status[known] = np.where(in_latest, activity["LatestStatus"].to_numpy()[rows], None)
+
+    at_risk = pd.notna(latest_status) & ~np.isin(latest_status, ["Good Standing", "Dean's List"])
+    return np.select([~known, at_risk], ["Dropped", "At Risk"], default="Retained")
+
+
+def status_by_year_level(year_levels, statuses):
+    """Student counts per YearLevel and retention status, with every status present for every year level"""
+    counts = pd.crosstab(pd.Series(year_levels, name="YearLevel"), pd.Series(statuses, name="Status"))
+    counts = counts.reindex(columns=RETENTION_STATUSES, fill_value=0)
+    return counts.reset_index().melt(id_vars="YearLevel", value_vars=RETENTION_STATUSES, var_name="Status", value_name="Count")
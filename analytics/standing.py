@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# GPA thresholds used by the registrar standing report
+DEANS_LIST_GPA = 90
+GOOD_STANDING_GPA = 75
+STANDING_STATUSES = ["Dean's List", "Good Standing", "Probation"]
+
+
+def standing_status(gpa):
+    """Dean's List / Good Standing / Probation for an array of GPAs"""
+    gpa = np.asarray(gpa, dtype="float64")
+    return np.select(
+        [gpa >= DEANS_LIST_GPA, gpa >= GOOD_STANDING_GPA],
+        STANDING_STATUSES[:2],
+        default=STANDING_STATUSES[2],
+    )
+
+
+def semester_standing(facts):
+    """
+    Academic standing per student per semester from the grade fact table.
+
+    GPA is the mean of numeric grades (0 when a semester has none) and
+    TotalUnits counts those numeric grades, as the standing report defines
+    them; Points is their sum, kept so the table can be updated in place
+    (update_semester_standing). Sorted by StudentID, SemesterID.
+    """
+    if facts.empty:
+        return pd.DataFrame({
+            "StudentID": pd.Series(dtype="int64"),
+            "SemesterID": pd.Series(dtype="int64"),
+            "Points": pd.Series(dtype="float64"),
+            "GPA": pd.Series(dtype="float64"),
+            "TotalUnits": pd.Series(dtype="int64"),
+            "Status": pd.Series(dtype=object),
+        })
+
+    graded = facts["Grade"].notna()
+    totals = pd.DataFrame({
+        "StudentID": facts["StudentID"].to_numpy(),
+        "SemesterID": facts["SemesterID"].to_numpy(),
+        "Points": facts["Grade"].fillna(0).to_numpy(),
+        "TotalUnits": graded.to_numpy().astype("int64"),
+    }).groupby(["StudentID", "SemesterID"], sort=True).sum()
+
+    units = totals["TotalUnits"].to_numpy()
+    gpa = _gpa(totals["Points"].to_numpy(), units)
+    standing = totals.index.to_frame(index=False)
+    standing["Points"] = totals["Points"].to_numpy()
+    standing["GPA"] = gpa
+    standing["TotalUnits"] = units
+    standing["Status"] = standing_status(gpa)
+    return standing
+
+
+def _gpa(points, units):
+    return np.divide(points, units, out=np.zeros(len(units)), where=units > 0)
+
+
+def update_semester_standing(standing, changes):
+    """
+    Standing table with a batch of grade fact changes applied
+    (snapshot_store.FactChange): each change takes its old numeric grade out
+    of, and puts its new one into, the Points / TotalUnits of its student's
+    semester, whose GPA and Status are then recomputed. A semester seen for
+    the first time gets a new row; its other columns are left missing.
+    """
+    adjustments = {}
+    for change in changes:
+        key = (change.new["StudentID"], change.new["SemesterID"])
+        points, units = adjustments.get(key, (0.0, 0))
+        for row, sign in ((change.old, -1), (change.new, 1)):
+            if row is not None and pd.notna(row["Grade"]):
+                points += sign * row["Grade"]
+                units += sign
+        adjustments[key] = (points, units)
+    if not adjustments:
+        return standing
+
+    keys = pd.MultiIndex.from_tuples(list(adjustments), names=["StudentID", "SemesterID"])
+    rows = pd.MultiIndex.from_frame(standing[["StudentID", "SemesterID"]]).get_indexer(keys)
+    adjustment = np.array(list(adjustments.values()), dtype="float64")
+    found = rows >= 0
+
+    standing = standing.copy()
+    points = standing["Points"].to_numpy(dtype="float64", copy=True)
+    units = standing["TotalUnits"].to_numpy(dtype="int64", copy=True)
+    points[rows[found]] += adjustment[found, 0]
+    units[rows[found]] += adjustment[found, 1].astype("int64")
+    gpa = standing["GPA"].to_numpy(dtype="float64", copy=True)
+    gpa[rows[found]] = _gpa(points[rows[found]], units[rows[found]])
+    status = standing["Status"].to_numpy(dtype=object, copy=True)
+    status[rows[found]] = standing_status(gpa[rows[found]])
+    standing["Points"] = points
+    standing["TotalUnits"] = units
+    standing["GPA"] = gpa
+    standing["Status"] = status
+
+    if not found.all():
+        added = keys[~found].to_frame(index=False)
+        added["Points"] = adjustment[~found, 0]
+        added["TotalUnits"] = adjustment[~found, 1].astype("int64")
+        added["GPA"] = _gpa(added["Points"].to_numpy(), added["TotalUnits"].to_numpy())
+        added["Status"] = standing_status(added["GPA"].to_numpy())
+        standing = pd.concat([standing, added], ignore_index=True).sort_values(
+            ["StudentID", "SemesterID"], kind="stable", ignore_index=True
+        )
+    return standing
+
+
+def standing_semester_gpa(standing):
+    """
+    semester_gpa() figures (StudentID, SemesterID, GPA, Subjects) read off a
+    standing table: the semesters that have numeric grades.
+    """
+    graded = standing[standing["TotalUnits"] > 0]
+    return pd.DataFrame({
+        "StudentID": graded["StudentID"].to_numpy(),
+        "SemesterID": graded["SemesterID"].to_numpy(),
+        "GPA": graded["GPA"].to_numpy(),
+        "Subjects": graded["TotalUnits"].to_numpy(),
+    })
+
+
+def filter_standing(standing, semester_ids=None, student_ids=None):
+    """Restrict a standing table to some semesters and/or students (typed compares, no string casts)"""
+    mask = np.ones(len(standing), dtype=bool)
+    if semester_ids is not None:
+        mask &= standing["SemesterID"].isin(np.atleast_1d(semester_ids)).to_numpy()
+    if student_ids is not None:
+        mask &= standing["StudentID"].isin(np.atleast_1d(student_ids)).to_numpy()
+    return standing[mask]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from analytics.pass_fail import PASSING_GRADE
+
+# Percentiles reported for every group (P25, P75, P90; the median is P50)
+SUBJECT_STAT_PERCENTILES = [25, 75, 90]
+SUBJECT_STAT_COLUMNS = ["Students", "Count", "Failed", "Mean", "Median", "Std", "Min", "Max"] + [f"P{p}" for p in SUBJECT_STAT_PERCENTILES]
+
+
+def subject_statistics(facts, by=("SubjectCode",)):
+    """
+    Class grade statistics per group of the grade fact table, e.g. per
+    subject or per (subject, section, semester).
+
+    Students counts every grade entry of the group; Count, Mean, Median,
+    Std (sample), Min, Max and the P25/P75/P90 percentiles are over its
+    numeric grades, Failed counts those below PASSING_GRADE. One row per group, sorted by `by`.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = pd.DataFrame({column: np.asarray(facts[column], dtype=object) for column in by})
+    grades = pd.Series(facts["Grade"].to_numpy(dtype="float64"), name="Grade")
+    if keys.empty:
+        return pd.DataFrame({column: pd.Series(dtype=object) for column in by + SUBJECT_STAT_COLUMNS})
+
+    entries = keys.groupby(by, sort=True, dropna=False).size().rename("Students")
+    grouped = grades.groupby([keys[column] for column in by], sort=True, dropna=False)
+    stats = pd.concat([
+        entries,
+        grouped.count().rename("Count"),
+        (grades < PASSING_GRADE).groupby([keys[column] for column in by], sort=True, dropna=False).sum().rename("Failed"),
+        grouped.mean().rename("Mean"),
+        grouped.median().rename("Median"),
+        grouped.std().rename("Std"),
+        grouped.min().rename("Min"),
+        grouped.max().rename("Max"),
+        *(grouped.quantile(p / 100).rename(f"P{p}") for p in SUBJECT_STAT_PERCENTILES),
+    ], axis=1)
+    return stats.reset_index()
+
+
+class SubjectGradeRanks:
+    """
+    Numeric grades of every group of the grade fact table (e.g. per subject,
+    section and semester) sorted best first, so a student's rank in a class
+    is a searchsorted of their own grade instead of ranking the whole school.
+
+    Ranks follow rank(method="min", ascending=False): 1 + the number of
+    higher grades in the group, ties sharing the best rank.
+    """
+
+    def __init__(self, facts, by=("SubjectCode", "section", "SemesterID")):
+        self.by = [by] if isinstance(by, str) else list(by)
+        grades = facts["Grade"].to_numpy(dtype="float64")
+        graded = ~np.isnan(grades)
+        keys = pd.DataFrame({column: np.asarray(facts[column], dtype=object)[graded] for column in self.by})
+        negated = -grades[graded]
+        # indices keys are tuples for several `by` columns, scalars for one
+        self._groups = {
+            key if isinstance(key, tuple) else (key,): np.sort(negated[rows])
+            for key, rows in keys.groupby(self.by, sort=False, dropna=False).indices.items()
+        } if len(keys) else {}
+
+    def rank_of(self, grade, *key):
+        """Rank of `grade` within the group `key` (values of `by`); NaN for a non-numeric grade or unknown group"""
+        negated = self._groups.get(key)
+        grade = pd.to_numeric(grade, errors="coerce")
+        if negated is None or pd.isna(grade):
+            return np.nan
+        return int(np.searchsorted(negated, -float(grade), side="left")) + 1
+
+    def ranks(self, rows, grade_column="Grade"):
+        """rank_of() for each row of a frame carrying the `by` columns and `grade_column`"""
+        return pd.Series(
+            [self.rank_of(grade, *key) for grade, *key in zip(rows[grade_column], *(rows[column] for column in self.by))],
+            index=rows.index, dtype="float64",
+        )
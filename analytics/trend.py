@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+
+def semester_labels(semester_ids, semesters_df):
+    """'<SchoolYear> - Sem <Semester>' for semester ids (blank parts when a semester is unknown)"""
+    semesters = semesters_df.drop_duplicates(subset=["_id"], keep="first").set_index("_id")
+    semester_ids = pd.Series(np.asarray(semester_ids))
+    school_year = semester_ids.map(semesters["SchoolYear"]).astype(object).fillna("").astype(str)
+    semester = semester_ids.map(semesters["Semester"]).astype(object).fillna("").astype(str)
+    return (school_year + " - Sem " + semester).to_numpy(dtype=object)
+
+
+class ClassTrend:
+    """
+    Class average grade per semester, overall and per course.
+
+    `cells` holds the Sum and Count of numeric grades per (SemesterID,
+    Course), with the course taken from the students DimensionTable (None
+    when unknown). series() rolls the cells up, so a student view never
+    touches the grades themselves.
+    """
+
+    def __init__(self, facts, students, semesters_df):
+        graded = facts[facts["Grade"].notna()]
+        student_keys = students.keys_for(graded["StudentID"].to_numpy())
+        cells = pd.DataFrame({
+            "SemesterID": graded["SemesterID"].to_numpy(),
+            "Course": students.take("Course", student_keys),
+            "Sum": graded["Grade"].to_numpy(dtype="float64"),
+            "Count": np.ones(len(graded), dtype="int64"),
+        }).groupby(["SemesterID", "Course"], sort=True, dropna=False)[["Sum", "Count"]].sum().reset_index()
+        cells.insert(1, "SemesterLabel", semester_labels(cells["SemesterID"], semesters_df))
+        self.cells = cells
+
+    def series(self, course=None):
+        """SemesterID, SemesterLabel, ClassAverage for all students or one course, by SemesterID"""
+        cells = self.cells if course is None else self.cells[self.cells["Course"] == course]
+        trend = cells.groupby(["SemesterID", "SemesterLabel"], sort=True)[["Sum", "Count"]].sum().reset_index()
+        trend["ClassAverage"] = trend["Sum"] / trend["Count"]
+        return trend[["SemesterID", "SemesterLabel", "ClassAverage"]]
@@ -0,0 +1,167 @@
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from snapshot_store import read_collection, read_collection_facts, apply_grade_deltas, replay_fact_deltas, snapshot_version, encode_dimensions
+
+def _view(frame):
+    """
+    A caller's copy of a shared frame. pandas copies on write, so a shallow
+    copy is enough: a tab modifying it never touches the process-wide original.
+    """
+    return frame.copy(deep=False)
+
+
+def _read_encoded_facts(cache_path):
+    return encode_dimensions(read_collection_facts(cache_path))
+
+
+class DataStore:
+    """
+    Process-wide store of collection snapshots.
+
+    Each collection is read from disk once per snapshot version and shared by
+    every tab and every session; callers get a shallow copy they may modify
+    (see _view) instead of their own unpickled copy.
+    """
+
+    def __init__(self):
+        self._frames = {}
+        self._facts = {}
+        self._derived = {}
+        self._frame_versions = {}
+        self._fact_versions = {}
+        self._derived_versions = {}
+        self._derived_sources = {}
+        self._change_handlers = {}
+        self._lock = threading.Lock()
+        self.load_times = {}
+
+    def _load(self, cache, versions, key, reader, version=None):
+        with self._lock:
+            if key in cache and versions.get(key) == version:
+                return cache[key]
+        # Read outside the lock so different collections load in parallel
+        start_time = time.time()
+        value = reader(key)
+        with self._lock:
+            if key not in cache or versions.get(key) != version:
+                if key in cache and cache is not self._derived:
+                    # Source snapshot changed on disk: values built from it are stale
+                    self._derived.clear()
+                cache[key] = value
+                versions[key] = version
+                self.load_times[key] = time.time() - start_time
+            return cache[key]
+
+    def _is_current(self, cache_path):
+        return cache_path in self._frames and self._frame_versions.get(cache_path) == snapshot_version(cache_path)
+
+    def frame(self, cache_path):
+        """Caller's copy of a collection snapshot"""
+        return _view(self._load(self._frames, self._frame_versions, cache_path, read_collection, snapshot_version(cache_path)))
+
+    def grade_facts(self, cache_path):
+        """Caller's copy of the grade fact table (dimension columns dictionary-encoded)"""
+        return _view(self._load(self._facts, self._fact_versions, cache_path, _read_encoded_facts, snapshot_version(cache_path)))
+
+    def collections(self, paths):
+        """
+        Copies of several collections at once, keyed like `paths` (name -> cache path).
+        Collections not loaded yet (or changed on disk) are read in parallel.
+        """
+        missing = [path for path in paths.values() if not self._is_current(path)]
+        if len(missing) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(missing), 6)) as executor:
+                list(executor.map(lambda path: self._load(self._frames, self._frame_versions, path, read_collection, snapshot_version(path)), missing))
+        return {name: self.frame(path) for name, path in paths.items()}
+
+    def derived(self, name, builder, on_grade_change=None, sources=()):
+        """
+        Compute a value from the shared frames once per snapshot version and reuse it.
+
+        `sources` are the cache paths the value is built from; their snapshot
+        versions are part of its key, so it is rebuilt as soon as one of them
+        changes on disk (a save in another process, an export).
+
+        `on_grade_change(value, changes)` makes the value a materialized view of
+        the grades: after a save it receives the FactChange list of the batch
+        (see snapshot_store.replay_fact_deltas) and returns the value with the
+        old rows taken out and the new ones put in, or None to have it rebuilt.
+        It runs under the store lock, so it must not call back into the store.
+        """
+        sources = tuple(sources)
+        with self._lock:
+            self._derived_sources[name] = sources
+            if on_grade_change is not None:
+                self._change_handlers[name] = on_grade_change
+        version = tuple(snapshot_version(path) for path in sources) or None
+        return self._load(self._derived, self._derived_versions, name, lambda _: builder(), version)
+
+    def apply_grade_deltas(self, cache_path, deltas, versions=None):
+        """
+        Patch the shared grades frame and fact table in memory after a save,
+        so nobody has to reload the collection. Derived values registered with
+        a change handler are updated incrementally; the others are dropped.
+
+        `versions` is what snapshot_store.append_grade_deltas returned for the
+        save: (version before, version after). Only copies loaded at the
+        version before are patched and stamped with the one after. Anything
+        else (the disk moved on meanwhile, or `versions` is None) is dropped
+        and reloaded from disk on next use rather than passed off as current.
+        """
+        before, after = versions if versions else (None, None)
+        with self._lock:
+            changes = None
+            if cache_path in self._frames:
+                if versions and self._frame_versions.get(cache_path) == before:
+                    self._frames[cache_path] = apply_grade_deltas(self._frames[cache_path], deltas)
+                    self._frame_versions[cache_path] = after
+                else:
+                    del self._frames[cache_path]
+                    self._frame_versions.pop(cache_path, None)
+            if cache_path in self._facts:
+                if versions and self._fact_versions.get(cache_path) == before:
+                    facts, changes = replay_fact_deltas(self._facts[cache_path], deltas)
+                    self._facts[cache_path] = encode_dimensions(facts)
+                    self._fact_versions[cache_path] = after
+                else:
+                    del self._facts[cache_path]
+                    self._fact_versions.pop(cache_path, None)
+            for name in list(self._derived):
+                sources = self._derived_sources.get(name, ())
+                handler = self._change_handlers.get(name)
+                value = handler(self._derived[name], changes) if handler and changes is not None else None
+                version = self._derived_versions.get(name)
+                if cache_path in sources and version is not None:
+                    # Kept values move to the patched version, if they were at the one before
+                    at = sources.index(cache_path)
+                    if version[at] != before:
+                        value = None
+                    version = version[:at] + (after,) + version[at + 1:]
+                if value is None:
+                    del self._derived[name]
+                    self._derived_versions.pop(name, None)
+                else:
+                    self._derived[name] = value
+                    self._derived_versions[name] = version
+
+    def clear(self):
+        """Drop everything; the next access reloads from disk"""
+        with self._lock:
+            self._frames.clear()
+            self._facts.clear()
+            self._derived.clear()
+            self._frame_versions.clear()
+            self._fact_versions.clear()
+            self._derived_versions.clear()
+            self._derived_sources.clear()
+            self._change_handlers.clear()
+            self.load_times.clear()
+
+
+@st.cache_resource
+def get_data_store():
+    """The single DataStore shared by all sessions of this server process"""
+    return DataStore()
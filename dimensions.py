@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+
+class DimensionTable:
+    """
+    Dense integer surrogate keys for one dimension (students, subjects,
+    semesters, teachers).
+
+    Key k is the k-th distinct natural key (`_id`) of the source frame and
+    every attribute is a NumPy array indexed by k, so attaching names or
+    descriptions to a fact table is an array `take` instead of a merge.
+    Key -1 means "not in this dimension".
+    """
+
+    def __init__(self, frame, key_column="_id"):
+        if frame is None or frame.empty or key_column not in frame.columns:
+            frame = pd.DataFrame({key_column: pd.Series(dtype=object)})
+        frame = frame.drop_duplicates(subset=[key_column], keep="first")
+        self.key_column = key_column
+        self.natural_keys = pd.Index(frame[key_column].to_numpy())
+        self.attributes = {
+            column: frame[column].to_numpy()
+            for column in frame.columns if column != key_column
+        }
+        self.attributes[key_column] = self.natural_keys.to_numpy()
+
+    def __len__(self):
+        return len(self.natural_keys)
+
+    def keys_for(self, natural_values):
+        """Surrogate keys for natural key values (-1 where unknown)"""
+        return self.natural_keys.get_indexer(pd.Index(np.asarray(natural_values)))
+
+    def take(self, column, keys):
+        """Attribute values for surrogate keys; missing keys and columns give None"""
+        keys = np.asarray(keys)
+        values = self.attributes.get(column)
+        if values is None:
+            return np.full(len(keys), None, dtype=object)
+        found = keys >= 0
+        if found.all():
+            return values.take(keys)
+        out = np.full(len(keys), None, dtype=object)
+        out[found] = values.take(keys[found])
+        return out
+
+    def enrich(self, facts, key_column, columns):
+        """
+        Copy of `facts` with dimension attributes attached through the
+        surrogate key column `key_column`. `columns` maps attribute -> output
+        column name (or is a list of attributes kept under their own names).
+        """
+        if not isinstance(columns, dict):
+            columns = {column: column for column in columns}
+        keys = facts[key_column].to_numpy()
+        return facts.assign(**{
+            output: self.take(attribute, keys) for attribute, output in columns.items()
+        })
+
+
+class StudentGradeIndex:
+    """
+    Grade documents sorted by StudentID with each student's row range.
+
+    A student's transcript is one contiguous slice of `grades` (documents in
+    their original order), found through a StudentID -> (start, stop)
+    dictionary instead of comparing every row's StudentID.
+    """
+
+    def __init__(self, grades_df):
+        if grades_df is None or "StudentID" not in grades_df.columns:
+            grades_df = pd.DataFrame({"StudentID": pd.Series(dtype="int64")})
+        order = np.argsort(grades_df["StudentID"].to_numpy(), kind="stable")
+        self.grades = grades_df.take(order)
+        student_ids = self.grades["StudentID"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, student_ids[1:] != student_ids[:-1]]) if len(student_ids) else np.array([], dtype=np.int64)
+        stops = np.r_[starts[1:], len(student_ids)]
+        self._ranges = dict(zip(student_ids[starts].tolist(), zip(starts.tolist(), stops.tolist())))
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def __contains__(self, student_id):
+        return student_id in self._ranges
+
+    def transcript(self, student_id):
+        """All grade documents of one student (empty frame when unknown)"""
+        start, stop = self._ranges.get(student_id, (0, 0))
+        return self.grades.iloc[start:stop]
+
+
+class CurriculumIndex:
+    """
+    Curriculum subjects flattened once and keyed by subject code.
+
+    `subjects` has one row per (curriculum, subject): the curriculum fields
+    (_id, courseCode, curriculumYear, courseName, ...) followed by the
+    subject's own (yearLevel, semester, subjectCode, subjectName, units,
+    prerequisite, ...). lookup() finds a subject's rows through a dictionary
+    instead of exploding the curriculum documents per query.
+    """
+
+    def __init__(self, curriculums_df):
+        records = []
+        if curriculums_df is not None and "subjects" in curriculums_df.columns:
+            for curriculum in curriculums_df.to_dict("records"):
+                subjects = curriculum.pop("subjects")
+                if isinstance(subjects, (list, tuple, np.ndarray)):
+                    records.extend({**curriculum, **subject} for subject in subjects if isinstance(subject, dict))
+        self.subjects = pd.DataFrame(records)
+        self._by_code = (
+            self.subjects.groupby("subjectCode", sort=False).indices
+            if "subjectCode" in self.subjects.columns else {}
+        )
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def lookup(self, subject_code):
+        """Curriculum rows for a subject code (empty frame when it is in no curriculum)"""
+        return self.subjects.take(self._by_code.get(subject_code, np.array([], dtype=np.int64)))
+
+
+def key_facts(facts, dimensions):
+    """
+    Add surrogate key columns to a fact table. `dimensions` maps the fact
+    column holding the natural key to (key column name, DimensionTable),
+    e.g. {"StudentID": ("StudentKey", students)}.
+    """
+    def surrogate_keys(values, dimension):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Look up each dictionary entry once, then map the codes
+            lookup = np.append(dimension.keys_for(values.cat.categories.to_numpy()), -1)
+            return lookup[values.cat.codes.to_numpy()]
+        return dimension.keys_for(values.to_numpy())
+
+    return facts.assign(**{
+        key_column: surrogate_keys(facts[natural_column], dimension).astype("int32")
+        for natural_column, (key_column, dimension) in dimensions.items()
+    })
@@ -2,6 +2,14 @@
 import streamlit as st
 import pandas as pd
 import os
+import functools
+from snapshot_store import snapshot_path, read_collection, read_collection_facts, snapshot_version, encode_dimensions
+from dimensions import DimensionTable, CurriculumIndex, StudentGradeIndex, key_facts
+from data_store import get_data_store
+from analytics.trend import ClassTrend
+from analytics.subject_stats import subject_statistics, SubjectGradeRanks
+from analytics.gpa import semester_gpa
+from analytics.rank import GPARankIndex
 
 students_cache = "pkl/students.pkl"
 grades_cache = "pkl/grades.pkl"
@@ -14,15 +22,53 @@ new_grades_cache = "pkl/new_grades.pkl"
 new_students_cache = "pkl/new_students.pkl"
 new_subjects_cache = "pkl/new_subjects.pkl"
 
-@st.cache_data
-def load_pkl_data(cache_path):
-    """Load data from pickle file if exists, else return empty list"""
-    if os.path.exists(cache_path):
-        return pd.read_pickle(cache_path)
+def snapshot_exists(cache_path):
+    """True if either the columnar snapshot or the legacy pickle is on disk"""
+    return os.path.exists(snapshot_path(cache_path)) or os.path.exists(cache_path)
+
+def snapshot_versions(*cache_paths):
+    """Current versions of the given snapshots, usable as a cache key"""
+    return tuple(snapshot_version(cache_path) for cache_path in cache_paths)
+
+def cache_on_snapshots(*cache_paths, max_entries=128, ttl=None):
+    """
+    st.cache_data keyed on the versions of the snapshots a function reads.
+    Entries are recomputed when one of `cache_paths` changes (export,
+    compaction or a saved grade). They never expire on a timer unless `ttl`
+    is given, which functions that also read MongoDB directly need: writes
+    reaching the database without touching the snapshots change nothing here.
+    """
+    def decorator(func):
+        def versioned(snapshot_versions, *args, **kwargs):
+            return func(*args, **kwargs)
+        # Streamlit keys a cached function on its module and qualified name
+        versioned.__module__ = func.__module__
+        versioned.__name__ = func.__name__
+        versioned.__qualname__ = func.__qualname__
+        cached = st.cache_data(max_entries=max_entries, ttl=ttl)(versioned)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cached(snapshot_versions(*cache_paths), *args, **kwargs)
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+@st.cache_data(max_entries=32)
+def _load_snapshot(cache_path, version):
+    if snapshot_exists(cache_path):
+        return read_collection(cache_path)
     else:
         st.markdown(f"⚠️ Cache file {cache_path} not found.")
         return pd.DataFrame()
 
+def load_pkl_data(cache_path):
+    """
+    Load a collection snapshot: columnar Parquet file if present, else the
+    legacy pickle, plus any pending grade deltas. Cached per snapshot version.
+    """
+    return _load_snapshot(cache_path, snapshot_version(cache_path))
+
 def export_to_excel(df, filename):
     """Export DataFrame to Excel"""
     df.to_excel(filename, index=False)
@@ -40,6 +86,127 @@ def pkl_data_to_df(cache_path):
         st.warning(f"{cache_path} is empty!")
     return pkl_pd_data
 
+@st.cache_data(max_entries=8)
+def _load_grade_facts(cache_path, version):
+    return encode_dimensions(read_collection_facts(cache_path))
+
+def load_grade_facts(cache_path):
+    """
+    Load the flat grade fact table (one row per student/semester/subject grade)
+    built at ingest for a grades snapshot. Falls back to exploding the raw
+    snapshot when the fact file has not been written yet.
+    Teacher, SubjectCode and section come back as shared-dictionary Categoricals.
+    """
+    return _load_grade_facts(cache_path, snapshot_version(cache_path))
+
+@st.cache_resource(max_entries=16)
+def _load_dimension(cache_path, version):
+    return DimensionTable(read_collection(cache_path) if snapshot_exists(cache_path) else None)
+
+def load_dimension(cache_path):
+    """
+    Surrogate-key DimensionTable for a snapshot (students, subjects, semesters).
+    Shared by all sessions and rebuilt only when the snapshot version changes.
+    """
+    return _load_dimension(cache_path, snapshot_version(cache_path))
+
+@st.cache_resource(max_entries=4)
+def _load_curriculum_index(cache_path, version):
+    return CurriculumIndex(read_collection(cache_path) if snapshot_exists(cache_path) else None)
+
+def load_curriculum_index(cache_path=curriculums_cache):
+    """
+    CurriculumIndex (subject code -> curriculum placement) for the curriculums
+    snapshot. Shared by all sessions and rebuilt only when the snapshot changes.
+    """
+    return _load_curriculum_index(cache_path, snapshot_version(cache_path))
+
+@st.cache_resource(max_entries=4)
+def _load_class_trend(grades_path, students_path, semesters_path, versions):
+    semesters_df = read_collection(semesters_path) if snapshot_exists(semesters_path) else pd.DataFrame({"_id": [], "SchoolYear": [], "Semester": []})
+    students = load_dimension(students_path) if students_path is not None else DimensionTable(None)
+    return ClassTrend(_load_grade_facts(grades_path, versions[0]), students, semesters_df)
+
+def load_class_trend(grades_path, students_path=None, semesters_path=semesters_cache):
+    """
+    ClassTrend (class average per semester, overall and per course) for a
+    grades snapshot. Materialized once per snapshot version and shared by
+    every student view. Without a students snapshot only the overall series
+    (series() with no course) has data.
+    """
+    paths = (grades_path, students_path, semesters_path)
+    versions = tuple(snapshot_version(path) if path is not None else None for path in paths)
+    return _load_class_trend(*paths, versions)
+
+@st.cache_resource(max_entries=8)
+def _load_subject_statistics(grades_path, by, version):
+    return subject_statistics(_load_grade_facts(grades_path, version), by)
+
+def load_subject_statistics(grades_path, by=("SubjectCode",)):
+    """
+    Per-subject class statistics (subject_statistics) for a grades snapshot,
+    grouped by `by`, e.g. ("SubjectCode", "section", "SemesterID").
+    Computed once per snapshot version and shared by every student view.
+    """
+    by = (by,) if isinstance(by, str) else tuple(by)
+    return _load_subject_statistics(grades_path, by, snapshot_version(grades_path))
+
+@st.cache_resource(max_entries=8)
+def _load_subject_grade_ranks(grades_path, by, version):
+    return SubjectGradeRanks(_load_grade_facts(grades_path, version), by)
+
+def load_subject_grade_ranks(grades_path, by=("SubjectCode", "section", "SemesterID")):
+    """
+    SubjectGradeRanks (sorted numeric grades per group) for a grades
+    snapshot, grouped like load_subject_statistics(). Built once per snapshot
+    version and shared by every student view.
+    """
+    by = (by,) if isinstance(by, str) else tuple(by)
+    return _load_subject_grade_ranks(grades_path, by, snapshot_version(grades_path))
+
+def load_student_grade_index(cache_path=new_grades_cache):
+    """
+    StudentGradeIndex over a grades snapshot. Built from the process-wide
+    DataStore frame, so it is shared by every session, follows in-memory
+    grade saves and is rebuilt only when the grades change.
+    """
+    store = get_data_store()
+    grades = store.frame(cache_path)
+    return store.derived(f"student_grade_index_{cache_path}", lambda: StudentGradeIndex(grades), sources=(cache_path,))
+
+def load_gpa_rank_index(grades_path=new_grades_cache, students_path=new_students_cache):
+    """
+    GPARankIndex (sorted GPAs per semester, course and year level) for a
+    grades snapshot. Built from the process-wide DataStore, so every student
+    session shares it; rebuilt after grade saves or a snapshot change.
+    """
+    store = get_data_store()
+    facts = store.grade_facts(grades_path)
+    students = store.frame(students_path)
+    return store.derived(
+        f"gpa_rank_index_{grades_path}_{students_path}",
+        lambda: GPARankIndex(semester_gpa(facts), DimensionTable(students)),
+        sources=(grades_path, students_path),
+    )
+
+@st.cache_resource(max_entries=8)
+def _load_keyed_grade_facts(grades_path, students_path, subjects_path, semesters_path, versions):
+    return key_facts(_load_grade_facts(grades_path, versions[0]), {
+        "StudentID": ("StudentKey", load_dimension(students_path)),
+        "SubjectCode": ("SubjectKey", load_dimension(subjects_path)),
+        "SemesterID": ("SemesterKey", load_dimension(semesters_path)),
+    })
+
+def load_keyed_grade_facts(grades_path, students_path, subjects_path, semesters_path=semesters_cache):
+    """
+    Grade fact table with int32 StudentKey / SubjectKey / SemesterKey columns
+    pointing into load_dimension() of the given snapshots (-1 when unmatched).
+    Teacher already carries integer codes through its shared dictionary.
+    """
+    paths = (grades_path, students_path, subjects_path, semesters_path)
+    versions = tuple(snapshot_version(path) for path in paths)
+    return _load_keyed_grade_facts(*paths, versions).copy(deep=False)
+
 def result_records_to_dataframe(results):
     """Convert results to pandas DataFrame"""
     if not results:
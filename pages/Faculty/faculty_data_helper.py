@@ -2,11 +2,12 @@
 import streamlit as st
 import pandas as pd
 from dbconnect import *
-from global_utils import pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache, new_subjects_cache, new_students_cache, new_grades_cache
+from snapshot_store import build_grade_facts, grade_values, decode_dimensions
+from global_utils import pkl_data_to_df, load_grade_facts, load_keyed_grade_facts, load_dimension, load_curriculum_index, cache_on_snapshots, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache, new_subjects_cache, new_students_cache, new_grades_cache
 
 admission_year = 2023
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(semesters_cache)
 def get_semesters_list(new_curriculum):
     """Get list of all semesters"""
     try:
@@ -53,7 +54,7 @@ def get_semesters_list(new_curriculum):
 
 
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(subjects_cache, new_subjects_cache)
 def get_subjects_by_teacher(teacher_name, is_new_curriculum=False):
     """Get subjects taught by a specific teacher"""
     try:
@@ -84,7 +85,7 @@ def get_subjects_by_teacher(teacher_name, is_new_curriculum=False):
 
 
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(grades_cache, new_grades_cache, students_cache, new_students_cache)
 def get_students_from_grades(is_new_curriculum, teacher_name, name=""):
     df = get_dataframe_grades(is_new_curriculum)
     if df.empty:
@@ -122,39 +123,25 @@ def get_students_from_grades(is_new_curriculum, teacher_name, name=""):
     
     
     
-@st.cache_data(ttl=300)
+@cache_on_snapshots(grades_cache, new_grades_cache)
 def get_dataframe_grades(is_new_curriculum):
     """
-    Flatten the 'grades' collection where SubjectCodes, Grades, Teachers are arrays.
+    Grade fact table (built at ingest from the 'grades' collection arrays).
     Returns a DataFrame with columns:
-    StudentID, SubjectCode, Grade, Teacher, SemesterID
+    StudentID, SubjectCode, Grade, Teacher, SemesterID, section
     """
     try:
-        df = pkl_data_to_df(new_grades_cache if is_new_curriculum else grades_cache)
+        df = load_grade_facts(new_grades_cache if is_new_curriculum else grades_cache)
 
         if df is None or df.empty:
             return pd.DataFrame()
 
+        df = decode_dimensions(df)
+        df["Grade"] = grade_values(df)
         if not is_new_curriculum:
             df["section"] = ""
 
-        # Ensure required columns
-        required_cols = {"StudentID", "SubjectCodes", "Grades", "Teachers", "SemesterID"}
-        if not required_cols.issubset(df.columns):
-            st.warning(f"Missing required columns: {required_cols - set(df.columns)}")
-            return pd.DataFrame()
-
-        # Explode arrays into rows
-        df_exploded = df.explode(["SubjectCodes", "Grades", "Teachers"]).reset_index(drop=True)
-
-        # Rename for clarity
-        df_exploded = df_exploded.rename(columns={
-            "SubjectCodes": "SubjectCode",
-            "Grades": "Grade",
-            "Teachers": "Teacher"
-        })
-
-        return df_exploded[["StudentID", "SubjectCode", "Grade", "Teacher", "SemesterID", "section"]]
+        return df[["StudentID", "SubjectCode", "Grade", "Teacher", "SemesterID", "section"]]
 
     except Exception as e:
         st.error(f"Error normalizing grades: {e}")
@@ -163,27 +150,26 @@ def get_dataframe_grades(is_new_curriculum):
 
 def get_distinct_section_per_subject(subjectCode, current_faculty):
     try:
-        # Load cached data
-        grades_df = pkl_data_to_df(new_grades_cache)
-        # Expand arrays
-        grades_expanded = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
+        # Load grade fact table
+        grades_facts = load_grade_facts(new_grades_cache)
 
         # Filter rows for this teacher & valid subject codes
-        grades_expanded = grades_expanded[
-            (grades_expanded["Teachers"] == current_faculty) &
-            (grades_expanded["SubjectCodes"] == subjectCode)
+        grades_facts = grades_facts[
+            (grades_facts["Teacher"] == current_faculty) &
+            (grades_facts["SubjectCode"] == subjectCode)
         ]
 
-        if grades_expanded.empty:
+        if grades_facts.empty:
             return []
 
         # Get distinct sections per subject
         grouped = (
-            grades_expanded[["SubjectCodes", "section"]]
+            grades_facts[["SubjectCode", "section"]]
             .drop_duplicates()
-            .groupby("SubjectCodes")["section"]
+            .groupby("SubjectCode", observed=True)["section"]
             .apply(list)  # sections as list
             .reset_index()
+            .rename(columns={"SubjectCode": "SubjectCodes"})
         )
 
         return grouped.to_dict(orient="records")
@@ -193,17 +179,17 @@ def get_distinct_section_per_subject(subjectCode, current_faculty):
         return []
     
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(grades_cache, students_cache, subjects_cache, semesters_cache)
 def get_student_grades_by_subject_and_semester(current_faculty, semester_id=None, subject_code=None):
     """Retrieve all student grades for subjects taught by a specific teacher in a given semester"""
     try:
         # Load datasets
-        grades_df = pkl_data_to_df(grades_cache)
-        students_df = pkl_data_to_df(students_cache)
-        subjects_df = pkl_data_to_df(subjects_cache)
-        semesters_df = pkl_data_to_df(semesters_cache)
+        grades_facts = load_keyed_grade_facts(grades_cache, students_cache, subjects_cache)
+        students = load_dimension(students_cache)
+        subjects = load_dimension(subjects_cache)
+        semesters = load_dimension(semesters_cache)
 
-        if grades_df.empty:
+        if grades_facts.empty:
             return []
         
         if subject_code is None:
@@ -212,41 +198,43 @@ def get_student_grades_by_subject_and_semester(current_faculty, semester_id=None
         if semester_id is None:
             st.warning(f"Selected Semester Not Found!")
 
-        # Expand SubjectCodes + Grades + Teachers into rows
-        grades_expanded = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
-
         # Filter by teacher
-        grades_expanded = grades_expanded[grades_expanded["Teachers"] == current_faculty]
+        grades_expanded = grades_facts[grades_facts["Teacher"] == current_faculty]
 
         # Optional filters
         if semester_id:
             grades_expanded = grades_expanded[grades_expanded["SemesterID"] == semester_id]
         if subject_code:
-            grades_expanded = grades_expanded[grades_expanded["SubjectCodes"] == subject_code]
+            grades_expanded = grades_expanded[grades_expanded["SubjectCode"] == subject_code]
 
         if grades_expanded.empty:
             st.warning("No grades available")
-        # Join with students, subjects, semesters
-        merged = (
-            grades_expanded
-            .merge(students_df, left_on="StudentID", right_on="_id", suffixes=("", "_student"))
-            .merge(subjects_df, left_on="SubjectCodes", right_on="_id", suffixes=("", "_subject"))
-            .merge(semesters_df, left_on="SemesterID", right_on="_id", suffixes=("", "_semester"))
-        )
+        # Filters above ran on dictionary codes; decode the (small) result for the joins
+        grades_expanded = decode_dimensions(grades_expanded.assign(Grade=grade_values(grades_expanded)))
+        # Attach student, subject and semester attributes by surrogate key
+        # (inner-join semantics: grades with an unknown key are dropped)
+        grades_expanded = grades_expanded[
+            (grades_expanded["StudentKey"] >= 0) &
+            (grades_expanded["SubjectKey"] >= 0) &
+            (grades_expanded["SemesterKey"] >= 0)
+        ]
+        merged = students.enrich(grades_expanded, "StudentKey", ["Name", "YearLevel", "Course"])
+        merged = subjects.enrich(merged, "SubjectKey", ["Description", "Units"])
+        merged = semesters.enrich(merged, "SemesterKey", ["Semester", "SchoolYear"])
         merged["SubjectYearLevel"] = 0
         merged["section"] = ""
         merged["NewCourse"] = ""
         # Select relevant columns
         results = merged[[
-            "Semester", "SchoolYear", "SubjectCodes", "Description", "Units", "Name", "Grades", "YearLevel", "StudentID" , "Course","NewCourse", "SubjectYearLevel","section"
+            "Semester", "SchoolYear", "SubjectCode", "Description", "Units", "Name", "Grade", "YearLevel", "StudentID" , "Course","NewCourse", "SubjectYearLevel","section"
         ]].rename(columns={
             "Semester": "semester",
             "SchoolYear": "schoolYear",
-            "SubjectCodes": "subjectCode",
+            "SubjectCode": "subjectCode",
             "Description": "subjectDescription",
             "Units": "units",
             "Name": "studentName",
-            "Grades": "grade"
+            "Grade": "grade"
         })
 
         # Sort like Mongo pipeline
@@ -261,7 +249,7 @@ def get_student_grades_by_subject_and_semester(current_faculty, semester_id=None
         st.error(f"Error querying grades: {e}")
         return []
     
-@st.cache_data(ttl=300)
+@cache_on_snapshots(new_grades_cache, new_students_cache, new_subjects_cache, semesters_cache, curriculums_cache)
 def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=None, subject_code=None):
     try:
         admission_year = 2022
@@ -269,8 +257,8 @@ def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=
         students_df = pkl_data_to_df(new_students_cache)
         subjects_df = pkl_data_to_df(new_subjects_cache)
         semesters_df = pkl_data_to_df(semesters_cache)
-        curriculums_df = pkl_data_to_df(curriculums_cache)
-        grades_df = pkl_data_to_df(new_grades_cache)
+        curriculum = load_curriculum_index(curriculums_cache)
+        grades_facts = load_grade_facts(new_grades_cache)
         mapping = {
             "FirstSem": 1,
             "SecondSem": 2,
@@ -286,15 +274,8 @@ def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=
     }
 
 
-        if curriculums_df.empty or students_df.empty or subjects_df.empty or semesters_df.empty:
+        if len(curriculum) == 0 or students_df.empty or subjects_df.empty or semesters_df.empty:
             return []
-
-        # --- Step 1: Expand curriculum subjects
-        curriculum_subjects = curriculums_df.explode("subjects").reset_index(drop=True)
-        curriculum_subjects = pd.concat(
-            [curriculum_subjects.drop(columns=["subjects"]), curriculum_subjects["subjects"].apply(pd.Series)],
-            axis=1
-        )
         
         if subject_code is None:
             st.warning(f"Selected Subject Not Found!")
@@ -302,8 +283,8 @@ def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=
         if semester_id is None:
             st.warning(f"Selected Semester Not Found!")
 
-        # Filter curriculum for this subject
-        subject_curriculum = curriculum_subjects[curriculum_subjects["subjectCode"] == subject_code]
+        # --- Step 1: Curriculum rows for this subject (indexed once per curriculum snapshot)
+        subject_curriculum = curriculum.lookup(subject_code)
         if subject_curriculum.empty:
             st.warning(f"Subject {subject_code} not found in curriculum")
             return []
@@ -367,13 +348,9 @@ def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=
 
         
 
-        grades_flat = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
-
-        grades_flat = grades_flat.rename(columns={
-            "StudentID": "StudentID",
-            "SubjectCodes": "subjectCode",
-            "Grades": "Grade",
-            "Teachers": "Teacher"
+        grades_flat = decode_dimensions(grades_facts[grades_facts["SemesterID"] == semester_id])
+        grades_flat = grades_flat.assign(Grade=grade_values(grades_flat)).rename(columns={
+            "SubjectCode": "subjectCode"
         }).reset_index(drop=True)
         
 
@@ -411,28 +388,25 @@ def get_new_student_grades_by_subject_and_semester(current_faculty, semester_id=
         st.error(f"Error querying students: {e}")
         return []
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(grades_cache, students_cache, subjects_cache, semesters_cache)
 def get_student_grades_by_semester(current_faculty, semester_id=None):
     """Retrieve all student grades for subjects taught by a specific teacher in a given semester"""
     try:
         # Load datasets
-        grades_df = pkl_data_to_df(grades_cache)
-        students_df = pkl_data_to_df(students_cache)
-        subjects_df = pkl_data_to_df(subjects_cache)
-        semesters_df = pkl_data_to_df(semesters_cache)
+        grades_facts = load_keyed_grade_facts(grades_cache, students_cache, subjects_cache)
+        students = load_dimension(students_cache)
+        subjects = load_dimension(subjects_cache)
+        semesters = load_dimension(semesters_cache)
 
-        if grades_df.empty:
+        if grades_facts.empty:
             return []
         
         
         if semester_id is None:
             st.warning(f"Selected Semester Not Found!")
 
-        # Expand SubjectCodes + Grades + Teachers into rows
-        grades_expanded = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
-
         # Filter by teacher
-        grades_expanded = grades_expanded[grades_expanded["Teachers"] == current_faculty]
+        grades_expanded = grades_facts[grades_facts["Teacher"] == current_faculty]
 
         # Optional filters
         if semester_id:
@@ -440,25 +414,30 @@ def get_student_grades_by_semester(current_faculty, semester_id=None):
         
         if grades_expanded.empty:
             st.warning("No grades available")
-        # Join with students, subjects, semesters
-        merged = (
-            grades_expanded
-            .merge(students_df, left_on="StudentID", right_on="_id", suffixes=("", "_student"))
-            .merge(subjects_df, left_on="SubjectCodes", right_on="_id", suffixes=("", "_subject"))
-            .merge(semesters_df, left_on="SemesterID", right_on="_id", suffixes=("", "_semester"))
-        )
+        # Filters above ran on dictionary codes; decode the (small) result for the joins
+        grades_expanded = decode_dimensions(grades_expanded.assign(Grade=grade_values(grades_expanded)))
+        # Attach student, subject and semester attributes by surrogate key
+        # (inner-join semantics: grades with an unknown key are dropped)
+        grades_expanded = grades_expanded[
+            (grades_expanded["StudentKey"] >= 0) &
+            (grades_expanded["SubjectKey"] >= 0) &
+            (grades_expanded["SemesterKey"] >= 0)
+        ]
+        merged = students.enrich(grades_expanded, "StudentKey", ["Name", "YearLevel", "Course"])
+        merged = subjects.enrich(merged, "SubjectKey", ["Description", "Units"])
+        merged = semesters.enrich(merged, "SemesterKey", ["Semester", "SchoolYear"])
         merged["section"] = ""
         # Select relevant columns
         results = merged[[
-            "Semester", "SchoolYear", "SubjectCodes", "Description", "Units", "Name", "Grades", "YearLevel", "StudentID" , "Course","section"
+            "Semester", "SchoolYear", "SubjectCode", "Description", "Units", "Name", "Grade", "YearLevel", "StudentID" , "Course","section"
         ]].rename(columns={
             "Semester": "semester",
             "SchoolYear": "schoolYear",
-            "SubjectCodes": "subjectCode",
+            "SubjectCode": "subjectCode",
             "Description": "subjectDescription",
             "Units": "units",
             "Name": "studentName",
-            "Grades": "grade"
+            "Grade": "grade"
         })
 
         # Sort like Mongo pipeline
@@ -473,28 +452,25 @@ def get_student_grades_by_semester(current_faculty, semester_id=None):
         st.error(f"Error querying grades: {e}")
         return []
     
-@st.cache_data(ttl=300)
+@cache_on_snapshots(new_grades_cache, new_students_cache, new_subjects_cache, semesters_cache)
 def get_new_student_grades_by_semester(current_faculty, semester_id=None):
     """Retrieve all student grades for subjects taught by a specific teacher in a given semester"""
     try:
         # Load datasets
-        grades_df = pkl_data_to_df(new_grades_cache)
-        students_df = pkl_data_to_df(new_students_cache)
-        subjects_df = pkl_data_to_df(new_subjects_cache)
-        semesters_df = pkl_data_to_df(semesters_cache)
+        grades_facts = load_keyed_grade_facts(new_grades_cache, new_students_cache, new_subjects_cache)
+        students = load_dimension(new_students_cache)
+        subjects = load_dimension(new_subjects_cache)
+        semesters = load_dimension(semesters_cache)
 
-        if grades_df.empty:
+        if grades_facts.empty:
             return []
         
         
         if semester_id is None:
             st.warning(f"Selected Semester Not Found!")
 
-        # Expand SubjectCodes + Grades + Teachers into rows
-        grades_expanded = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
-
         # Filter by teacher
-        grades_expanded = grades_expanded[grades_expanded["Teachers"] == current_faculty]
+        grades_expanded = grades_facts[grades_facts["Teacher"] == current_faculty]
 
         # Optional filters
         if semester_id:
@@ -502,25 +478,30 @@ def get_new_student_grades_by_semester(current_faculty, semester_id=None):
         
         if grades_expanded.empty:
             st.warning("No grades available")
-        # Join with students, subjects, semesters
-        merged = (
-            grades_expanded
-            .merge(students_df, left_on="StudentID", right_on="_id", suffixes=("", "_student"))
-            .merge(subjects_df, left_on="SubjectCodes", right_on="_id", suffixes=("", "_subject"))
-            .merge(semesters_df, left_on="SemesterID", right_on="_id", suffixes=("", "_semester"))
-        )
+        # Filters above ran on dictionary codes; decode the (small) result for the joins
+        grades_expanded = decode_dimensions(grades_expanded.assign(Grade=grade_values(grades_expanded)))
+        # Attach student, subject and semester attributes by surrogate key
+        # (inner-join semantics: grades with an unknown key are dropped)
+        grades_expanded = grades_expanded[
+            (grades_expanded["StudentKey"] >= 0) &
+            (grades_expanded["SubjectKey"] >= 0) &
+            (grades_expanded["SemesterKey"] >= 0)
+        ]
+        merged = students.enrich(grades_expanded, "StudentKey", ["Name", "YearLevel", "Course"])
+        merged = subjects.enrich(merged, "SubjectKey", ["Description", "Units"])
+        merged = semesters.enrich(merged, "SemesterKey", ["Semester", "SchoolYear"])
         
         # Select relevant columns
         results = merged[[
-            "Semester", "SchoolYear", "SubjectCodes", "Description", "Units", "Name", "Grades", "YearLevel", "StudentID" , "Course","section"
+            "Semester", "SchoolYear", "SubjectCode", "Description", "Units", "Name", "Grade", "YearLevel", "StudentID" , "Course","section"
         ]].rename(columns={
             "Semester": "semester",
             "SchoolYear": "schoolYear",
-            "SubjectCodes": "subjectCode",
+            "SubjectCode": "subjectCode",
             "Description": "subjectDescription",
             "Units": "units",
             "Name": "studentName",
-            "Grades": "grade"
+            "Grade": "grade"
         })
 
         # Sort like Mongo pipeline
@@ -585,7 +566,8 @@ def get_semester(Semester, SchoolYear):
 
 database = db_connect()
 
-@st.cache_data(ttl=300)
+# Reads new_grades from MongoDB, so entries also expire after 5 minutes
+@cache_on_snapshots(new_grades_cache, new_students_cache, new_subjects_cache, semesters_cache, curriculums_cache, ttl=300)
 def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, semester_id=None, subject_code=None):
     try:
         grades_col = database["new_grades"]
@@ -598,7 +580,7 @@ def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, seme
         students_df = pkl_data_to_df(new_students_cache)
         subjects_df = pkl_data_to_df(new_subjects_cache)
         semesters_df = pkl_data_to_df(semesters_cache)
-        curriculums_df = pkl_data_to_df(curriculums_cache)
+        curriculum = load_curriculum_index(curriculums_cache)
         # grades_df = pkl_data_to_df(new_grades_cache)
         mapping = {
             "FirstSem": 1,
@@ -615,15 +597,8 @@ def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, seme
     }
 
 
-        if curriculums_df.empty or students_df.empty or subjects_df.empty or semesters_df.empty:
+        if len(curriculum) == 0 or students_df.empty or subjects_df.empty or semesters_df.empty:
             return []
-
-        # --- Step 1: Expand curriculum subjects
-        curriculum_subjects = curriculums_df.explode("subjects").reset_index(drop=True)
-        curriculum_subjects = pd.concat(
-            [curriculum_subjects.drop(columns=["subjects"]), curriculum_subjects["subjects"].apply(pd.Series)],
-            axis=1
-        )
         
         if subject_code is None:
             st.warning(f"Selected Subject Not Found!")
@@ -631,8 +606,8 @@ def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, seme
         if semester_id is None:
             st.warning(f"Selected Semester Not Found!")
 
-        # Filter curriculum for this subject
-        subject_curriculum = curriculum_subjects[curriculum_subjects["subjectCode"] == subject_code]
+        # --- Step 1: Curriculum rows for this subject (indexed once per curriculum snapshot)
+        subject_curriculum = curriculum.lookup(subject_code)
         if subject_curriculum.empty:
             st.warning(f"Subject {subject_code} not found in curriculum")
             return []
@@ -694,13 +669,9 @@ def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, seme
             columns={"_id_x": "CurriculumID", "_id_y": "StudentID", "yearLevel": "SubjectYearLevel"}
         ).drop(columns=["courseName","_id"])
 
-        grades_flat = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
-
-        grades_flat = grades_flat.rename(columns={
-            "StudentID": "StudentID",
-            "SubjectCodes": "subjectCode",
-            "Grades": "Grade",
-            "Teachers": "Teacher"
+        grades_flat = build_grade_facts(grades_df)
+        grades_flat = grades_flat.assign(Grade=grade_values(grades_flat)).rename(columns={
+            "SubjectCode": "subjectCode"
         }).reset_index(drop=True)
         
         
@@ -738,7 +709,7 @@ def get_new_student_grades_from_db_by_subject_and_semester(current_faculty, seme
         return []
 
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(grades_cache, new_grades_cache, students_cache, new_students_cache, subjects_cache, new_subjects_cache, semesters_cache)
 def compute_student_risk_analysis(
     is_new_curriculum,
     current_faculty,
@@ -750,10 +721,10 @@ def compute_student_risk_analysis(
     subjects_df = pkl_data_to_df(new_subjects_cache if is_new_curriculum else subjects_cache)
     subjects_df = subjects_df[subjects_df["Teacher"] == current_faculty]
     students_df = get_students_from_grades(is_new_curriculum, teacher_name=current_faculty)
-    grades_df = pkl_data_to_df(new_grades_cache if is_new_curriculum else grades_cache)
+    grades_facts = load_grade_facts(new_grades_cache if is_new_curriculum else grades_cache)
     semesters_df = pkl_data_to_df(semesters_cache)
     
-    if grades_df.empty:
+    if grades_facts.empty:
         return pd.DataFrame()
 
     if selected_subject_code is None:
@@ -761,13 +732,18 @@ def compute_student_risk_analysis(
     if selected_semester_id is None:
         st.warning("Selected Semester Not Found!")
 
-    # Expand multi-value columns
-    grades_expanded = grades_df.explode(["SubjectCodes", "Grades", "Teachers"])
+    # One row per subject grade, named like the source arrays used below
+    grades_expanded = grades_facts.rename(columns={
+        "SubjectCode": "SubjectCodes",
+        "Grade": "Grades",
+        "Teacher": "Teachers"
+    })
     
     if selected_semester_id:
         grades_expanded = grades_expanded[grades_expanded["SemesterID"] == selected_semester_id]
     if selected_subject_code:
         grades_expanded = grades_expanded[grades_expanded["SubjectCodes"] == selected_subject_code]
+    grades_expanded = decode_dimensions(grades_expanded)
 
     # Merge data
     merged = (
@@ -807,7 +783,7 @@ def compute_student_risk_analysis(
     ]]
 
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(subjects_cache, new_subjects_cache)
 def compute_subject_failure_rates(df, new_curriculum,current_faculty, passing_grade: int = 75, selected_semester_id = None):
     current_faculty = st.session_state.get('user_data', {}).get('Name', '')
     """
@@ -1,9 +1,12 @@
 import streamlit as st
 import pandas as pd
 import pymongo
-import pickle
 import os
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from dbconnect import db_connect
+from snapshot_store import write_snapshot_stream, export_batch_size, grade_delta, append_grade_deltas, grade_delta_count, compact_grade_deltas_async, delta_compaction_threshold
+from data_store import get_data_store
 from global_utils import students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache, new_subjects_cache, new_students_cache, new_grades_cache
 
 output_folder = "pkl"
@@ -14,20 +17,30 @@ os.makedirs(output_folder, exist_ok=True)
 def reload_pkl_by_specific_collections(collection_name): 
     if collection_name != "":
         collection = db[collection_name]
-        documents = list(collection.find({}))  # Fetch all documents
+        cursor = collection.find({}, batch_size=export_batch_size)  # Stream documents in batches
 
-        # Define pickle file path
-        file_path = os.path.join(output_folder, f"{collection_name}.pkl")
+        # Save as a columnar Parquet snapshot
+        file_path, count = write_snapshot_stream(collection_name, cursor, output_folder)
 
-        # Save to pickle
-        with open(file_path, "wb") as f:
-            pickle.dump(documents, f)
-
-        print(f"Saved {len(documents)} documents from '{collection_name}' to '{file_path}'")
-        print("All collections have been pickled successfully!")
+        print(f"Saved {count} documents from '{collection_name}' to '{file_path}'")
+        print("All collections have been snapshotted successfully!")
     else:
         print("No Collection Name!")
 
+def record_new_grade_changes(deltas):
+    """
+    Reflect saved grades in the new_grades snapshot without re-exporting it:
+    append the deltas, patch the shared in-memory frames, and compact the log
+    on a background thread once it grows (never inside the save request).
+    """
+    versions = append_grade_deltas(new_grades_cache, deltas)
+    get_data_store().apply_grade_deltas(new_grades_cache, deltas, versions)
+    if grade_delta_count(new_grades_cache) >= delta_compaction_threshold:
+        compact_grade_deltas_async(new_grades_cache)
+
+def record_new_grade_change(student_id, subject_code, semester_id, grade, teacher):
+    record_new_grade_changes([grade_delta(student_id, semester_id, subject_code, grade, teacher)])
+
 def save_new_student_grades(student_id, subject_code, semester_id, grade, teacher):
     student_id = int(student_id)
     semester_id = int(semester_id)
@@ -57,7 +70,7 @@ def save_new_student_grades(student_id, subject_code, semester_id, grade, teache
                 "Teachers": [teacher]
             }
             result = new_grades_col.insert_one(new_record)
-            reload_pkl_by_specific_collections(collection_name = "new_grades")
+            record_new_grade_change(student_id, subject_code, semester_id, grade, teacher)
             return {
                 "success": True, 
                 "message": f"New grade record created for Student {student_id}",
@@ -83,7 +96,7 @@ def save_new_student_grades(student_id, subject_code, semester_id, grade, teache
                         }
                     }
                 )
-                reload_pkl_by_specific_collections(collection_name = "new_grades")
+                record_new_grade_change(student_id, subject_code, semester_id, grade, teacher)
                 
                 return {
                     "success": True,
@@ -101,7 +114,7 @@ def save_new_student_grades(student_id, subject_code, semester_id, grade, teache
                         }
                     }
                 )
-                reload_pkl_by_specific_collections(collection_name = "new_grades")
+                record_new_grade_change(student_id, subject_code, semester_id, grade, teacher)
                 return {
                     "success": True,
                     "message": f"Added new subject {subject_code} with grade {grade}",
@@ -113,4 +126,145 @@ def save_new_student_grades(student_id, subject_code, semester_id, grade, teache
             "success": False, 
             "message": f"Error: {str(e)}",
             "action": "error"
-        }
\ No newline at end of file
+        }
+
+def _grade_upsert_operation(student_id, semester_id, subject_code, grade, teacher):
+    """
+    Single-document upsert doing what save_new_student_grades does in three
+    calls: overwrite the subject's grade/teacher if present, else push it.
+    Uses an update pipeline so no find_one is needed beforehand.
+    """
+    position = "$_subjectIndex"
+    found = {"$gte": [position, 0]}
+
+    def replace_or_append(field, value):
+        current = {"$ifNull": [f"${field}", []]}
+        # Grades / Teachers may be shorter than SubjectCodes: pad with nulls
+        # up to the subject's position, like the snapshot delta replay does
+        length = {"$max": [{"$size": current}, {"$add": [position, 1]}]}
+        return {
+            "$cond": [
+                found,
+                {"$map": {
+                    "input": {"$range": [0, length]},
+                    "as": "i",
+                    "in": {"$cond": [
+                        {"$eq": ["$$i", position]},
+                        {"$literal": value},
+                        {"$ifNull": [{"$arrayElemAt": [current, "$$i"]}, None]}
+                    ]}
+                }},
+                {"$concatArrays": [current, [{"$literal": value}]]}
+            ]
+        }
+
+    pipeline = [
+        {"$set": {"_subjectIndex": {"$indexOfArray": [{"$ifNull": ["$SubjectCodes", []]}, subject_code]}}},
+        {"$set": {
+            "SubjectCodes": {"$cond": [found, "$SubjectCodes", {"$concatArrays": [{"$ifNull": ["$SubjectCodes", []]}, [{"$literal": subject_code}]]}]},
+            "Grades": replace_or_append("Grades", grade),
+            "Teachers": replace_or_append("Teachers", teacher)
+        }},
+        {"$unset": "_subjectIndex"}
+    ]
+    return UpdateOne({"StudentID": student_id, "SemesterID": semester_id}, pipeline, upsert=True)
+
+def validate_grade_entries(grades, teacher=None):
+    """
+    Split grade entries (DataFrame or list of dicts with StudentID, SubjectCode,
+    SemesterID, Grade and optionally Teacher) into valid and rejected rows.
+    Same rules as save_new_student_grades, applied column-wise.
+    """
+    entries = grades.copy() if isinstance(grades, pd.DataFrame) else pd.DataFrame(list(grades))
+    missing = [c for c in ["StudentID", "SubjectCode", "SemesterID", "Grade"] if c not in entries.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    if "Teacher" not in entries.columns:
+        entries["Teacher"] = teacher
+    elif teacher:
+        entries["Teacher"] = entries["Teacher"].fillna(teacher)
+
+    entries["StudentID"] = pd.to_numeric(entries["StudentID"], errors="coerce")
+    entries["SemesterID"] = pd.to_numeric(entries["SemesterID"], errors="coerce")
+    entries["Grade"] = pd.to_numeric(entries["Grade"], errors="coerce")
+    subject = entries["SubjectCode"].fillna("").astype(str).str.strip()
+    teacher_name = entries["Teacher"].fillna("").astype(str).str.strip()
+
+    valid = (
+        entries["StudentID"].fillna(0).ne(0)
+        & entries["SemesterID"].fillna(0).ne(0)
+        & subject.ne("")
+        & teacher_name.ne("")
+        & entries["Grade"].between(0, 100)
+    )
+    accepted = entries[valid].astype({"StudentID": "int64", "SemesterID": "int64", "Grade": "float64"})
+    accepted["SubjectCode"] = subject[valid]
+    accepted["Teacher"] = teacher_name[valid]
+    return accepted, entries[~valid]
+
+def _record_grade_rows(rows):
+    """Record (StudentID, SemesterID, SubjectCode, Grade, Teacher) rows written to new_grades"""
+    if rows:
+        record_new_grade_changes([
+            grade_delta(student_id, semester_id, subject_code, grade, teacher_name)
+            for student_id, semester_id, subject_code, grade, teacher_name in rows
+        ])
+
+def save_new_student_grades_bulk(grades, teacher=None):
+    """
+    Save a whole class list of grades in one bulk_write round trip and refresh
+    the new_grades snapshot once. Invalid rows are skipped and returned.
+    """
+    try:
+        accepted, rejected = validate_grade_entries(grades, teacher)
+        if accepted.empty:
+            return {
+                "success": False,
+                "message": "No valid grades to save",
+                "action": "error",
+                "saved": 0,
+                "rejected": rejected
+            }
+
+        rows = list(zip(
+            accepted["StudentID"].tolist(), accepted["SemesterID"].tolist(),
+            accepted["SubjectCode"].tolist(), accepted["Grade"].tolist(), accepted["Teacher"].tolist()
+        ))
+        # Ordered, so repeated (student, semester) entries apply in sequence
+        try:
+            result = db["new_grades"].bulk_write([_grade_upsert_operation(*row) for row in rows], ordered=True)
+        except BulkWriteError as e:
+            # An ordered bulk write stops at the first failing operation; the
+            # ones before it are already in MongoDB, so the snapshot gets them too.
+            # A write concern error alone fails no operation: every row was written.
+            write_errors = e.details.get("writeErrors") or []
+            saved = write_errors[0]["index"] if write_errors else len(rows)
+            _record_grade_rows(rows[:saved])
+            if write_errors:
+                message = f"Error: saved {saved} of {len(rows)} grades, row {saved + 1} failed: {write_errors[0]['errmsg']}"
+            else:
+                concern_errors = "; ".join(error.get("errmsg", "") for error in e.details.get("writeConcernErrors", [])) or str(e)
+                message = f"Error: {saved} grades written but not acknowledged: {concern_errors}"
+            return {
+                "success": False,
+                "message": message,
+                "action": "error",
+                "saved": saved,
+                "rejected": rejected
+            }
+        _record_grade_rows(rows)
+        return {
+            "success": True,
+            "message": f"Saved {len(rows)} grades ({result.upserted_count} new records, {result.modified_count} updated)",
+            "action": "bulk",
+            "saved": len(rows),
+            "rejected": rejected
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Error: {str(e)}",
+            "action": "error",
+            "saved": 0,
+            "rejected": None
+        }
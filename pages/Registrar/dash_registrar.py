@@ -1,13 +1,13 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache, new_students_cache, new_grades_cache, new_subjects_cache
+from data_store import get_data_store, _view
+from snapshot_store import update_ingestion_log
 from pages.Registrar.pdf_helper import generate_pdf
 from pages.Registrar.dash_registrar_old_tab1 import show_registrar_tab1_info
 from pages.Registrar.dash_registrar_old_tab2 import show_registrar_tab2_info
@@ -28,7 +28,6 @@ from pages.Registrar.dash_registrar_new_tab9 import show_registrar_new_tab9_info
 from pages.Registrar.dash_registrar_new_tab10 import show_registrar_new_tab10_info
 from pages.Registrar.dash_registrar_new_tab11 import show_registrar_new_tab11_info
 import time
-import json
 
 # Paths to Pickle Files
 students_cache = "pkl/students.pkl"
@@ -37,125 +36,101 @@ semesters_cache = "pkl/semesters.pkl"
 subjects_cache = "pkl/subjects.pkl"
 teachers_cache = "pkl/teachers.pkl"
 curriculums_cache = "pkl/curriculums.pkl"
+new_teachers_cache = "pkl/new_teachers.pkl"
 
-@st.cache_data(ttl=300)
-def load_all_data():
-    """Load all data with performance optimization"""
-    start_time = time.time()
-    
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Always coerce to DataFrame using pkl_data_to_df to avoid list objects
-        futures = {
-            'students': executor.submit(pkl_data_to_df, students_cache),
-            'grades': executor.submit(pkl_data_to_df, grades_cache),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, subjects_cache),
-            'teachers': executor.submit(pkl_data_to_df, teachers_cache)
-        }
-        
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-        # Ensure YearLevel is scalar in students_df
-        if 'students' in data and not data['students'].empty and 'YearLevel' in data['students'].columns:
-            data['students']["YearLevel"] = data['students']["YearLevel"].apply(lambda x: x[0] if isinstance(x, list) and x else x)
-    
-    load_time = time.time() - start_time
-    st.success(f"📊 Data loaded in {load_time:.2f} seconds")
-    
-    # Log ingestion results
-    log_data = {
+def _log_ingestion(records_loaded, load_time):
+    """Write load statistics to cache/ingestion_log.json"""
+    update_ingestion_log({
         'timestamp': time.time(),
         'load_time_seconds': load_time,
-        'records_loaded': {
-            'students': len(data['students']),
-            'grades': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-    
-    # Save log to cache directory
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-    
-    return data
+        'records_loaded': records_loaded
+    })
 
-# New loader for updated pickle sources (only used by the NEW dashboard)
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
+def load_all_data():
+    """Load all data from the shared process-wide DataStore"""
     start_time = time.time()
+    store = get_data_store()
+    first_load = students_cache not in store.load_times
 
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
+    data = store.collections({
+        'students': students_cache,
+        'grades': grades_cache,
+        'semesters': semesters_cache,
+        'subjects': subjects_cache,
+        'teachers': teachers_cache
+    })
+
+    # Ensure YearLevel is scalar in students_df
+    if not data['students'].empty and 'YearLevel' in data['students'].columns:
+        data['students']["YearLevel"] = data['students']["YearLevel"].apply(lambda x: x[0] if isinstance(x, list) and x else x)
+
+    load_time = time.time() - start_time
+    st.success(f"📊 Data loaded in {load_time:.2f} seconds")
+
+    if first_load:
+        _log_ingestion({key: len(df) for key, df in data.items()}, load_time)
 
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
+    return data
 
-    # Choose teachers source: prefer new_teachers, else old, else infer
+def _infer_teachers(data):
+    """Choose teachers source: prefer new_teachers, else infer from subjects or grades"""
     teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
     if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
+        return teachers_new_df
+
+    # Infer from subjects or grades if possible
+    subjects_df = data.get('subjects', pd.DataFrame())
+    grades_df = data.get('grades', pd.DataFrame())
+    inferred = pd.DataFrame()
+    if 'Teacher' in subjects_df.columns:
+        inferred = pd.DataFrame({
+            'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
+        })
+        inferred['_id'] = inferred['Teacher']
+    elif 'Teachers' in grades_df.columns:
+        # explode teachers from grades
+        tmp = grades_df[['Teachers']].copy()
+        tmp = tmp[tmp['Teachers'].notna()]
+        tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
+        inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
+        inferred['Teacher'] = inferred['_id']
+    return inferred
+
+# New loader for updated snapshot sources (only used by the NEW dashboard)
+def load_all_data_new():
+    """
+    Frames for the new dashboard, served from the process-wide DataStore.
+    Every tab and every registrar session shares one copy of each collection.
+    """
+    start_time = time.time()
+    store = get_data_store()
+    first_load = new_grades_cache not in store.load_times
+
+    data = store.collections({
+        'students': new_students_cache,
+        'grades': new_grades_cache,
+        'semesters': semesters_cache,
+        'subjects': new_subjects_cache,
+        'teachers_new': new_teachers_cache,
+    })
+    data['teachers'] = _view(store.derived(
+        "registrar_teachers",
+        lambda: _infer_teachers(data),
+        sources=(new_teachers_cache, new_subjects_cache, new_grades_cache),
+    ))
+    data['grade_facts'] = store.grade_facts(new_grades_cache)
 
     load_time = time.time() - start_time
     st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
 
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
+    if first_load:
+        _log_ingestion({
             'students_new': len(data['students']),
             'grades_new': len(data['grades']),
             'semesters': len(data['semesters']),
             'subjects_new': len(data['subjects']),
             'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
+        }, load_time)
 
     return data
 
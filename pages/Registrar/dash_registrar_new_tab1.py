@@ -2,13 +2,11 @@ import streamlit as st
 import streamlit.components.v1 as components
 ### Ensure we scroll back to the teacher evaluation section if hash is present
 import pandas as pd
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, snapshot_exists, students_cache, grades_cache, subjects_cache, curriculums_cache, cache_on_snapshots
 from pages.Registrar.pdf_helper import generate_pdf
 from pages.Faculty.faculty_data_helper import get_semesters_list, get_subjects_by_teacher, get_student_grades_by_subject_and_semester, get_new_student_grades_by_subject_and_semester
 from global_utils import result_records_to_dataframe
@@ -22,89 +20,13 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from io import BytesIO
 from datetime import datetime
 import altair as alt
-import time
-import json
-
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
 
-@st.cache_data(ttl=300)
+@cache_on_snapshots(curriculums_cache)
 def load_curriculums_df():
     """Load curriculums from pickle and return a DataFrame with expected columns."""
-    if not os.path.exists(curriculums_cache):
+    if not snapshot_exists(curriculums_cache):
         return pd.DataFrame()
-    data = pd.read_pickle(curriculums_cache)
+    data = load_pkl_data(curriculums_cache)
     df = pd.DataFrame(data) if isinstance(data, list) else data
     for col in ["courseCode", "courseName", "curriculumYear", "subjects"]:
         if col not in df.columns:
@@ -2,12 +2,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
-import time
-import os
-import json
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
-from pages.Registrar.Get_Academic_Helper import get_academic_standing
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
+from pages.Registrar.registrar_data_helper import get_student_activity, semester_ids_for
+from analytics.gpa import first_year_level
+from analytics.retention import retention_status, status_by_year_level
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -18,80 +16,6 @@ from reportlab.lib import colors
 from datetime import datetime
 import io
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
-
 def get_retention_dropout(data, filters):
     """Get retention and dropout rates by year level using academic standing logic"""
     students_df = data['students']
@@ -103,63 +27,22 @@ def get_retention_dropout(data, filters):
 
     # Get latest semester
     latest_sem = semesters_df.sort_values(by=["SchoolYear", "Semester"], ascending=False).iloc[0]
-
-    # Use get_academic_standing to get academic standing data
-    academic_filters = {
-        "Semester": latest_sem["Semester"],
-        "SchoolYear": str(latest_sem["SchoolYear"])
-    }
-    if filters.get("Course") != "All":
-        academic_filters["Course"] = filters["Course"]
-
-    academic_df = get_academic_standing(academic_filters)
+    latest_semester_ids = semester_ids_for(semesters_df, latest_sem["Semester"], str(latest_sem["SchoolYear"]))
 
     # Apply course filter to students
-    filtered_students = students_df.copy()
+    filtered_students = students_df
     if filters.get("Course") != "All":
         filtered_students = filtered_students[filtered_students["Course"] == filters["Course"]]
 
-    # Ensure YearLevel is scalar
-    filtered_students["YearLevel"] = filtered_students["YearLevel"].apply(
-        lambda x: x[0] if isinstance(x, list) and x else x
-    )
-
-    # Merge with academic standing
-    merged = filtered_students.merge(academic_df, left_on="Name", right_on="Name", how="left")
-
-    # Determine status based on academic standing and activity
-    def determine_status(row):
-        status = row.get("Status", "")
-        # Check if student has any grades at all
-        any_grades = grades_df[grades_df["StudentID"] == row["_id"]]
-        if any_grades.empty:
-            return "Dropped"  # No grades ever
-
-        if pd.isna(status) or status == "":
-            # Has grades but no GPA data for latest semester
-            return "Retained"
-        elif status == "Good Standing":
-            return "Retained"
-        else:  # Probation or other
-            return "At Risk"
-
-    merged["Status"] = merged.apply(determine_status, axis=1)
+    # Status for every student from the shared activity index in one pass
+    statuses = retention_status(filtered_students["_id"].to_numpy(), get_student_activity(data), latest_semester_ids)
 
     # Summary by status
-    summary = merged["Status"].value_counts().reset_index()
+    summary = pd.Series(statuses).value_counts().reset_index()
     summary.columns = ["Status", "Count"]
 
-    # Summary by year level
-    year_level_summary = merged.groupby(["YearLevel", "Status"]).size().reset_index(name="Count")
-
-    # Ensure that pivot always has Retained/Dropped/At Risk columns
-    if not year_level_summary.empty:
-        pivot = year_level_summary.pivot(index="YearLevel", columns="Status", values="Count").fillna(0)
-        for col in ["Retained", "Dropped", "At Risk"]:
-            if col not in pivot.columns:
-                pivot[col] = 0
-        year_level_summary = pivot.reset_index().melt(id_vars="YearLevel", value_vars=["Retained", "Dropped", "At Risk"],
-                                                     var_name="Status", value_name="Count")
+    # Summary by year level (always has Retained/Dropped/At Risk)
+    year_level_summary = status_by_year_level(first_year_level(filtered_students["YearLevel"].to_numpy()), statuses)
     return summary, year_level_summary
 
 def create_retention_pdf(summary, year_level_summary, course_filter, total_students, retained_count,
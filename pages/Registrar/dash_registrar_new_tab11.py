@@ -4,12 +4,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-import time
-import os
 import matplotlib.pyplot as plt
-import json
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
+from pages.Registrar.registrar_data_helper import get_gpa_rank_index, get_students_dimension
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -19,79 +16,12 @@ from io import BytesIO
 from reportlab.lib import colors
 from datetime import datetime
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
+def _semester_filter_id(semesters_df, semester):
+    """First _id of the selected Semester label (None for "All" or no match)"""
+    if semester == "All":
+        return None
+    sem_id_arr = semesters_df[semesters_df["Semester"] == semester]["_id"].values
+    return sem_id_arr[0] if len(sem_id_arr) > 0 else None
 
 def get_top_performers(data, filters):
     """Get top performers per program"""
@@ -103,53 +33,68 @@ def get_top_performers(data, filters):
         return pd.DataFrame()
 
     # Apply semester filter
-    if filters.get("Semester") != "All":
-        sem_id_arr = semesters_df[semesters_df["Semester"] == filters["Semester"]]["_id"].values
-        if len(sem_id_arr) > 0:
-            grades_df = grades_df[grades_df["SemesterID"] == sem_id_arr[0]]
-
-    # Calculate GPA for each student
-    gpa_data = {}
-    for _, grade_row in grades_df.iterrows():
-        student_id = grade_row["StudentID"]
-        grades = grade_row.get("Grades", [])
-        
-        if isinstance(grades, list) and grades:
-            # Filter numeric grades
-            numeric_grades = [g for g in grades if isinstance(g, (int, float)) and not pd.isna(g)]
-            if numeric_grades:
-                avg_gpa = sum(numeric_grades) / len(numeric_grades)
-                if student_id in gpa_data:
-                    gpa_data[student_id].append(avg_gpa)
-                else:
-                    gpa_data[student_id] = [avg_gpa]
-
-    # Create results dataframe
-    results = []
-    for student_id, gpa_list in gpa_data.items():
-        student_info = students_df[students_df["_id"] == student_id]
-        if not student_info.empty:
-            student = student_info.iloc[0]
-            final_gpa = sum(gpa_list) / len(gpa_list)
-            year_level = student["YearLevel"]
-            if isinstance(year_level, list):
-                year_level = year_level[0] if year_level else 0
-            results.append({
-                "Name": student["Name"],
-                "Course": student["Course"],
-                "YearLevel": year_level,
-                "GPA": round(final_gpa, 2)
-            })
-
-    if not results:
+    semester_id = _semester_filter_id(semesters_df, filters.get("Semester"))
+
+    # The GPA rank index and the student dimension are built once per
+    # snapshot version and shared by every registrar session
+    rank_index = get_gpa_rank_index(data)
+    students = get_students_dimension(data)
+
+    # Get top 10 per program, read off the head of each course's sorted GPAs
+    top = rank_index.top_per_course(10, semester_id)
+    if top.empty:
         return pd.DataFrame()
 
-    df = pd.DataFrame(results)
-    
-    # Get top 10 per program
-    top_performers = df.sort_values(by="GPA", ascending=False).groupby("Course").head(10)
-    
-    return top_performers
+    keys = students.keys_for(top["StudentID"].to_numpy())
+    return pd.DataFrame({
+        "Name": students.take("Name", keys),
+        "Course": top["Course"].to_numpy(),
+        "YearLevel": top["YearLevel"].to_numpy(),
+        "GPA": top["GPA"].to_numpy(),
+        "Percentile": [
+            round(rank_index.position(student_id, semester_id, by=("Course",))["Percentile"], 1)
+            for student_id in top["StudentID"]
+        ],
+    })
+
+def show_student_standing(data, semester_id):
+    """Rank and percentile of one student within their program, year level and the whole school"""
+    student_id = st.text_input("Student ID", key="top_student_lookup_tab11").strip()
+    if not student_id:
+        return
+    if not student_id.isdigit():
+        st.warning("Enter a numeric Student ID.")
+        return
+
+    rank_index = get_gpa_rank_index(data)
+    overall = rank_index.position(int(student_id), semester_id, by=())
+    if overall is None:
+        st.warning("No GPA found for this student in the selected semester.")
+        return
+
+    students = get_students_dimension(data)
+    key = students.keys_for([int(student_id)])
+    st.markdown(f"**{students.take('Name', key)[0]}** — GPA {overall['GPA']:.2f}")
+
+    cohorts = [
+        ("Program", ("Course",)),
+        ("Program & Year Level", ("Course", "YearLevel")),
+        ("All Students", ()),
+    ]
+    columns = st.columns(len(cohorts))
+    for column, (label, by) in zip(columns, cohorts):
+        position = rank_index.position(int(student_id), semester_id, by=by)
+        with column:
+            if position is None:
+                # No Course / YearLevel on record, so no cohort to rank in
+                st.metric(f"Rank in {label}", "N/A")
+                continue
+            st.metric(
+                f"Rank in {label}",
+                f"{position['Rank']:,} / {position['CohortSize']:,}",
+                f"{position['Percentile']:.1f} percentile",
+                delta_color="off",
+            )
 
 def create_top_performers_pdf(df, semester_filter, total_performers, avg_gpa, max_gpa, unique_courses):
     """Generate PDF report for top performers"""
@@ -430,8 +375,8 @@ def show_registrar_new_tab11_info(data, students_df, semesters_df):
                     for course in df_ranked["Course"].unique():
                         course_data = df_ranked[df_ranked["Course"] == course].head(10)
                         st.subheader(f"📚 {course}")
-                        display_data = course_data[["Rank", "Name", "YearLevel", "GPA"]].copy()
-                        display_data.columns = ["Rank", "Student Name", "Year Level", "GPA"]
+                        display_data = course_data[["Rank", "Name", "YearLevel", "GPA", "Percentile"]].copy()
+                        display_data.columns = ["Rank", "Student Name", "Year Level", "GPA", "Percentile"]
                         st.dataframe(display_data, use_container_width=True, hide_index=True)
                     
                     # === Charts ===
@@ -482,3 +427,8 @@ def show_registrar_new_tab11_info(data, students_df, semesters_df):
                     st.warning("No top performers data available")
         else:
             st.info("👆 Click 'Load Top Performers' to view top performing students")
+
+        # === Student standing lookup ===
+        st.subheader("🔎 Student Standing")
+        st.markdown("Where one student's GPA ranks within their program, year level and the whole school")
+        show_student_standing(data, _semester_filter_id(semesters_df, top_semester))
@@ -1,16 +1,14 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
 from pages.Registrar.pdf_helper import generate_pdf
-import time
-import json
+from pages.Registrar.registrar_data_helper import get_semester_standing, semester_ids_for
+from analytics.standing import filter_standing
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
@@ -21,161 +19,38 @@ from reportlab.graphics.charts.barcharts import VerticalBarChart
 from io import BytesIO
 from datetime import datetime
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
-
 def get_academic_standing(data, filters):
     """Get academic standing data based on filters with proper GPA calculation"""
     students_df = data['students']
     grades_df = data['grades']
     semesters_df = data['semesters']
-    subjects_df = data['subjects']
 
     if students_df.empty or grades_df.empty:
         return pd.DataFrame()
 
-    # Merge grades with students to get course information
-    merged = grades_df.merge(students_df, left_on="StudentID", right_on="_id", how="left")
+    # Standing for every student/semester is computed once per snapshot and
+    # shared with the PDF export and the retention tab; filters only slice it
+    standing = get_semester_standing(data)
 
-    # Apply filters
-    if filters.get("Semester") != "All":
-        sem_id_arr = semesters_df[semesters_df["Semester"] == filters["Semester"]]["_id"].values
-        if len(sem_id_arr) > 0:
-            sem_id_val = str(sem_id_arr[0])
-            merged = merged[merged["SemesterID"].astype(str) == sem_id_val]
-
-    if filters.get("SchoolYear") != "All":
-        try:
-            school_year_value = int(filters["SchoolYear"]) if isinstance(filters["SchoolYear"], str) else filters["SchoolYear"]
-            sem_ids_by_year = semesters_df[semesters_df["SchoolYear"] == school_year_value]["_id"].astype(str).tolist()
-            if sem_ids_by_year:
-                merged = merged[merged["SemesterID"].astype(str).isin(sem_ids_by_year)]
-        except (ValueError, TypeError):
-            sem_ids_by_year = semesters_df[semesters_df["SchoolYear"].astype(str) == str(filters["SchoolYear"])]["_id"].astype(str).tolist()
-            if sem_ids_by_year:
-                merged = merged[merged["SemesterID"].astype(str).isin(sem_ids_by_year)]
+    semester_ids = semester_ids_for(semesters_df, filters.get("Semester", "All"), filters.get("SchoolYear", "All"))
+    if semester_ids is not None:
+        standing = filter_standing(standing, semester_ids=semester_ids)
 
     # Filter by Course
-    if filters.get("Course") != "All" and not merged.empty:
-        merged = merged[merged["Course"] == filters["Course"]]
+    if filters.get("Course", "All") != "All":
+        standing = standing[standing["Course"] == filters["Course"]]
 
-    # Aggregate grades per student per semester to avoid duplicates
-    if merged.empty:
+    if standing.empty:
         return pd.DataFrame()
 
-    # Define function to calculate GPA and total units per student per semester
-    def calculate_gpa_and_units(group):
-        grades = group["Grades"].tolist()
-        # Flatten grades if nested lists
-        flat_grades = []
-        for g in grades:
-            if isinstance(g, list):
-                flat_grades.extend([x for x in g if isinstance(x, (int, float)) and not pd.isna(x)])
-            elif isinstance(g, (int, float)) and not pd.isna(g):
-                flat_grades.append(g)
-        gpa = sum(flat_grades) / len(flat_grades) if flat_grades else 0
-        total_units = len(flat_grades)
-        return pd.Series({"GPA": gpa, "TotalUnits": total_units})
-
-    agg = merged.groupby(["StudentID", "SemesterID"]).apply(calculate_gpa_and_units).reset_index()
-
-    # Merge aggregated GPA and units back with student info
-    student_info = students_df[["_id", "Name", "Course"]]
-    agg = agg.merge(student_info, left_on="StudentID", right_on="_id", how="left")
-
     # Add semester and school year info
-    semesters_dict = dict(zip(semesters_df["_id"], semesters_df["Semester"]))
-    years_dict = dict(zip(semesters_df["_id"], semesters_df["SchoolYear"]))
-    agg["Semester"] = agg["SemesterID"].map(semesters_dict)
-    agg["SchoolYear"] = agg["SemesterID"].map(years_dict)
-
-    # Determine academic status with proper thresholds
-    def get_academic_status(gpa: float) -> str:
-        if gpa >= 90:
-            return "Dean's List"
-        elif gpa >= 75:
-            return "Good Standing"
-        else:
-            return "Probation"
-
-    agg["Status"] = agg["GPA"].apply(get_academic_status)
+    semesters = semesters_df.drop_duplicates(subset=["_id"], keep="last").set_index("_id")
+    result = standing[["StudentID", "Name", "Course", "GPA", "TotalUnits", "Status"]].reset_index(drop=True)
+    result["Semester"] = standing["SemesterID"].map(semesters["Semester"]).to_numpy()
+    result["SchoolYear"] = standing["SemesterID"].map(semesters["SchoolYear"]).to_numpy()
 
     # Add Subject column as empty or placeholder since aggregation loses subject details
-    agg["Subject"] = ""
-
-    # Select and order columns
-    result = agg[["StudentID", "Name", "Course", "GPA", "TotalUnits", "Status", "Semester", "SchoolYear", "Subject"]]
+    result["Subject"] = ""
 
     return result
 
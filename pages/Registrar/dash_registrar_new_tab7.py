@@ -1,17 +1,15 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
-import os
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 import matplotlib.pyplot as plt
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
 from pages.Registrar.pdf_helper import generate_pdf
-import time
-import json
+from pages.Registrar.registrar_data_helper import get_grade_cube, semester_ids_for
+from analytics.pass_fail import PASSING_GRADE, subject_pass_fail
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -22,83 +20,8 @@ from reportlab.lib import colors
 from datetime import datetime
 import textwrap
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
-
-def get_pass_fail_distribution(data, filters):
-    """Get pass/fail distribution by subject"""
-    students_df = data['students']
+def get_pass_fail_distribution(data, filters, passing_grade=PASSING_GRADE):
+    """Get pass/fail distribution by subject (Subject, Fail, Pass, Total, Pass Rate (%), Fail Rate (%))"""
     grades_df = data['grades']
     semesters_df = data['semesters']
     subjects_df = data['subjects']
@@ -106,69 +29,25 @@ def get_pass_fail_distribution(data, filters):
     if grades_df.empty:
         return pd.DataFrame()
 
-    # Merge with students for course filtering
-    merged = grades_df.merge(students_df, left_on="StudentID", right_on="_id", how="left")
-
-    # Apply filters
-    if filters.get("Semester") != "All":
-        sem_id_arr = semesters_df[semesters_df["Semester"] == filters["Semester"]]["_id"].values
-        if len(sem_id_arr) > 0:
-            merged = merged[merged["SemesterID"] == sem_id_arr[0]]
-
-    if filters.get("SchoolYear") != "All":
-        try:
-            school_year_value = int(filters["SchoolYear"])
-            sem_ids_by_year = semesters_df[semesters_df["SchoolYear"] == school_year_value]["_id"].tolist()
-            if sem_ids_by_year:
-                merged = merged[merged["SemesterID"].isin(sem_ids_by_year)]
-        except (ValueError, TypeError):
-            pass
-
-    if filters.get("Course") != "All" and not merged.empty:
-        merged = merged[merged["Course"] == filters["Course"]]
-
-    # Calculate pass/fail for each grade entry
-    def process_grades(grades, subject_codes):
-        results = []
-        if isinstance(grades, list) and isinstance(subject_codes, list):
-            for i, grade in enumerate(grades):
-                if i < len(subject_codes) and isinstance(grade, (int, float)) and not pd.isna(grade):
-                    subject_code = subject_codes[i] if i < len(subject_codes) else "Unknown"
-                    status = "Pass" if grade >= 75 else "Fail"
-                    results.append({
-                        'SubjectCode': subject_code,
-                        'Grade': grade,
-                        'Status': status
-                    })
-        return results
-
-    # Expand grades into individual records
-    expanded_data = []
-    for _, row in merged.iterrows():
-        grade_results = process_grades(row['Grades'], row['SubjectCodes'])
-        for result in grade_results:
-            expanded_data.append({
-                'StudentID': row['StudentID'],
-                'StudentName': row['Name'],
-                'Course': row['Course'],
-                'SubjectCode': result['SubjectCode'],
-                'Grade': result['Grade'],
-                'Status': result['Status']
-            })
-
-    if not expanded_data:
+    # Pass/fail counts per subject for this slice of the shared grade cube
+    semester_ids = semester_ids_for(semesters_df, filters.get("Semester", "All"), filters.get("SchoolYear", "All"))
+    course = None if filters.get("Course", "All") == "All" else filters["Course"]
+    counts = get_grade_cube(data, passing_grade).query(
+        by="SubjectCode",
+        where={"SemesterID": semester_ids, "Course": course},
+        measures=["Fail", "Pass"],
+    )
+
+    if counts.empty:
         return pd.DataFrame()
 
-    df = pd.DataFrame(expanded_data)
-    
     # Map subject codes to descriptions
+    subject_names = None
     if not subjects_df.empty:
-        subjects_dict = dict(zip(subjects_df["_id"], subjects_df["Description"]))
-        df['Subject'] = df['SubjectCode'].map(subjects_dict).fillna(df['SubjectCode'])
-    else:
-        df['Subject'] = df['SubjectCode']
+        subject_names = dict(zip(subjects_df["_id"], subjects_df["Description"]))
+
+    return subject_pass_fail(counts, subject_names)
 
-    return df
 def create_pass_fail_distribution_pdf(
     subject_summary_df,
     total_records,
@@ -394,29 +273,25 @@ def show_registrar_new_tab7_info(data, students_df, semesters_df):
 
         if st.button("Apply Filters", key="passfail_apply"):
             with st.spinner("Loading pass/fail distribution data..."):
-                df = get_pass_fail_distribution(data, {"Semester": semester, "Course": course, "SchoolYear": year})
+                subject_summary = get_pass_fail_distribution(data, {"Semester": semester, "Course": course, "SchoolYear": year})
 
-                if not df.empty:
+                if not subject_summary.empty:
                     # === Summary statistics ===
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
-                        total_records = len(df)
+                        total_records = int(subject_summary["Total"].sum())
                         st.metric("Total Records", f"{total_records:,}")
                     with col2:
-                        pass_count = len(df[df["Status"] == "Pass"])
+                        pass_count = int(subject_summary["Pass"].sum())
                         st.metric("Pass Count", f"{pass_count:,}")
                     with col3:
-                        fail_count = len(df[df["Status"] == "Fail"])
+                        fail_count = int(subject_summary["Fail"].sum())
                         st.metric("Fail Count", f"{fail_count:,}")
                     with col4:
                         pass_rate = (pass_count / total_records * 100) if total_records > 0 else 0
                         st.metric("Pass Rate", f"{pass_rate:.1f}%")
 
-                    # === Pass/Fail distribution by subject (calculated summary) ===
-                    subject_summary = df.groupby(["Subject", "Status"]).size().unstack(fill_value=0).reset_index()
-                    subject_summary["Total"] = subject_summary["Pass"] + subject_summary["Fail"]
-                    subject_summary["Pass Rate (%)"] = (subject_summary["Pass"] / subject_summary["Total"] * 100).round(2)
-                    subject_summary["Fail Rate (%)"] = (subject_summary["Fail"] / subject_summary["Total"] * 100).round(2)
+                    # === Pass/Fail distribution by subject ===
                     summary_table = subject_summary[["Subject", "Pass Rate (%)", "Fail Rate (%)"]]
 
                     # === Pass/Fail Rate Table ===
@@ -440,7 +315,8 @@ def show_registrar_new_tab7_info(data, students_df, semesters_df):
                     st.plotly_chart(fig_bar, use_container_width=True)
 
                     # === Pie Chart ===
-                    status_counts = df["Status"].value_counts()
+                    status_counts = pd.Series({"Pass": pass_count, "Fail": fail_count})
+                    status_counts = status_counts[status_counts > 0].sort_values(ascending=False)
                     fig_pie = px.pie(
                         values=status_counts.values,
                         names=status_counts.index,
@@ -4,14 +4,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-import os
-import time
-import json
 import matplotlib.pyplot as plt
 from reportlab.platypus import Image
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
+from pages.Registrar.registrar_data_helper import get_enrollment_cube
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -21,103 +18,18 @@ from io import BytesIO
 from reportlab.lib import colors
 from datetime import datetime
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
-
 def get_enrollment_trends(data, filters):
     """Get enrollment trends by semester and course"""
-    students_df = data['students']
     grades_df = data['grades']
     semesters_df = data['semesters']
 
     if grades_df.empty or semesters_df.empty:
         return pd.DataFrame()
 
-    # Merge grades with students and semesters
-    merged = grades_df.merge(students_df, left_on="StudentID", right_on="_id", how="left")
-    merged = merged.merge(semesters_df, left_on="SemesterID", right_on="_id", how="left")
-
-    # Apply course filter
-    if filters.get("Course") != "All":
-        merged = merged[merged["Course"] == filters["Course"]]
-
-    # Drop duplicates to ensure unique students per semester
-    merged = merged.drop_duplicates(subset=['StudentID', 'SemesterID'])
-
-    # Count students per semester and course
-    enrollment = merged.groupby(['Semester', 'SchoolYear', 'Course']).size().reset_index(name='Count')
-    enrollment = enrollment.sort_values(['SchoolYear', 'Semester'])
+    # Distinct students per semester and course, rolled up from the shared enrollment cube
+    course = None if filters.get("Course") == "All" else filters.get("Course")
+    enrollment = get_enrollment_cube(data).rollup(['Semester', 'SchoolYear', 'Course'], course)
+    enrollment = enrollment.sort_values(['SchoolYear', 'Semester'], kind="stable")
 
     return enrollment
 
@@ -444,27 +356,9 @@ def show_registrar_new_tab8_info(data, students_df, semesters_df):
     if st.button("Apply Filters", key="enrollment_apply"):
         with st.spinner("Loading enrollment trends data..."):
             # Get enrollment trends data
-            students_df_local = data['students']
-            grades_df_local = data['grades']
-            semesters_df_local = data['semesters']
-
-            if grades_df_local.empty or semesters_df_local.empty:
-                df = pd.DataFrame()
-            else:
-                # Merge grades with students and semesters
-                merged = grades_df_local.merge(students_df_local, left_on="StudentID", right_on="_id", how="left")
-                merged = merged.merge(semesters_df_local, left_on="SemesterID", right_on="_id", how="left")
-
-                # Apply course filter
-                if course != "All":
-                    merged = merged[merged["Course"] == course]
-
-                # Count students per semester and course
-                df = merged.groupby(['Semester', 'SchoolYear', 'Course']).size().reset_index(name='Count')
-                df = df.sort_values(['SchoolYear', 'Semester'])
-
-                # Get unique students count
-                unique_students = merged.drop_duplicates('StudentID').shape[0]
+            df = get_enrollment_trends(data, {"Course": course})
+            if not df.empty:
+                unique_students = get_enrollment_cube(data).distinct_students(None if course == "All" else course)
 
             if not df.empty:
                 # === Summary statistics ===
@@ -500,7 +394,7 @@ def show_registrar_new_tab8_info(data, students_df, semesters_df):
                     st.plotly_chart(fig_line, use_container_width=True)
                 else:
                     # Overall enrollment trend
-                    overall_enrollment = df.groupby("Semester")["Count"].sum().reset_index()
+                    overall_enrollment = get_enrollment_cube(data).rollup("Semester", None if course == "All" else course)
                     overall_enrollment = overall_enrollment.sort_values("Semester")
 
                     # Data table
@@ -541,7 +435,7 @@ def show_registrar_new_tab8_info(data, students_df, semesters_df):
 
                 # Course breakdown
                 if course == "All":
-                    course_breakdown = df.groupby("Course")["Count"].sum().reset_index().sort_values("Count", ascending=False)
+                    course_breakdown = get_enrollment_cube(data).rollup("Course").sort_values("Count", ascending=False)
 
                     st.subheader("Enrollment by Course")
                     st.dataframe(course_breakdown, use_container_width=True)
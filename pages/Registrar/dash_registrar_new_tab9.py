@@ -5,11 +5,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
-import time
-import os
-import json
-from concurrent.futures import ThreadPoolExecutor
-from global_utils import load_pkl_data, pkl_data_to_df, students_cache, grades_cache, semesters_cache, subjects_cache, curriculums_cache
+from global_utils import load_pkl_data, students_cache, grades_cache, subjects_cache, curriculums_cache
+from pages.Registrar.registrar_data_helper import get_incomplete_grade_index, get_students_dimension, get_grade_cube, get_teacher_names
+from analytics.pass_fail import teacher_display_names
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -124,7 +122,7 @@ def create_incomplete_grades_pdf(df, semester_filter, faculty_filter, total_inco
         elements.append(Spacer(1, 6))
 
         # Prepare data for table
-        display_df = df[["StudentID", "Name", "SubjectCodes", "Grades", "TeacherName", "SemesterName", "GradeType"]].copy()
+        display_df = df[["StudentID", "Name", "SubjectCode", "Grade", "TeacherName", "SemesterName", "GradeType"]].copy()
         table_data = [display_df.columns.tolist()] + display_df.values.tolist()
 
         # Create table with word wrapping
@@ -258,127 +256,75 @@ def add_incomplete_grades_pdf_print_button(df, semester_filter, faculty_filter,
     except Exception as e:
         st.error(f"Error generating PDF for print: {str(e)}")
 
-@st.cache_data(ttl=300)
-def load_all_data_new():
-    """Load all data using the new pickle files for students, grades, and subjects."""
-    start_time = time.time()
-
-    new_students_path = "pkl/new_students.pkl"
-    new_grades_path = "pkl/new_grades.pkl"
-    new_subjects_path = "pkl/new_subjects.pkl"
-    new_teachers_path = "pkl/new_teachers.pkl"
-
-    with ThreadPoolExecutor(max_workers=6) as executor:
-        futures = {
-            'students': executor.submit(pkl_data_to_df, new_students_path),
-            'grades': executor.submit(pkl_data_to_df, new_grades_path),
-            'semesters': executor.submit(pkl_data_to_df, semesters_cache),
-            'subjects': executor.submit(pkl_data_to_df, new_subjects_path),
-            'teachers_new': executor.submit(pkl_data_to_df, new_teachers_path),
-        }
-
-        data = {}
-        for key, future in futures.items():
-            data[key] = future.result()
-
-    # Choose teachers source: prefer new_teachers, else old, else infer
-    teachers_new_df = data.get('teachers_new') if isinstance(data.get('teachers_new'), pd.DataFrame) else pd.DataFrame()
-    teachers_old_df = data.get('teachers_old') if isinstance(data.get('teachers_old'), pd.DataFrame) else pd.DataFrame()
-    teachers_df = pd.DataFrame()
-    if not teachers_new_df.empty:
-        teachers_df = teachers_new_df
-    elif not teachers_old_df.empty:
-        teachers_df = teachers_old_df
-    else:
-        # Infer from subjects or grades if possible
-        subjects_df = data.get('subjects', pd.DataFrame())
-        grades_df = data.get('grades', pd.DataFrame())
-        inferred = pd.DataFrame()
-        if 'Teacher' in subjects_df.columns:
-            inferred = pd.DataFrame({
-                'Teacher': subjects_df['Teacher'].dropna().unique().tolist()
-            })
-            inferred['_id'] = inferred['Teacher']
-        elif 'Teachers' in grades_df.columns:
-            # explode teachers from grades
-            tmp = grades_df[['Teachers']].copy()
-            tmp = tmp[tmp['Teachers'].notna()]
-            tmp = tmp.explode('Teachers') if tmp['Teachers'].apply(lambda x: isinstance(x, list)).any() else tmp
-            inferred = pd.DataFrame({'_id': tmp['Teachers'].dropna().astype(str).unique().tolist()})
-            inferred['Teacher'] = inferred['_id']
-        teachers_df = inferred
-
-    data['teachers'] = teachers_df
-
-    load_time = time.time() - start_time
-    st.success(f"📊 Data (new) loaded in {load_time:.2f} seconds")
-
-    # Log ingestion results
-    log_data = {
-        'timestamp': time.time(),
-        'load_time_seconds': load_time,
-        'records_loaded': {
-            'students_new': len(data['students']),
-            'grades_new': len(data['grades']),
-            'semesters': len(data['semesters']),
-            'subjects_new': len(data['subjects']),
-            'teachers': len(data['teachers'])
-        }
-    }
-
-    os.makedirs('cache', exist_ok=True)
-    with open('cache/ingestion_log.json', 'w') as f:
-        json.dump(log_data, f, indent=2)
-
-    return data
+def _semester_id(semesters_df, semester):
+    """_id of the first semester with this label (None for "All" or no match)"""
+    if semester == "All":
+        return None
+    sem_id_arr = semesters_df[semesters_df["Semester"] == semester]["_id"].values
+    return sem_id_arr[0] if len(sem_id_arr) > 0 else None
+
+def _teacher_id(teachers_df, faculty):
+    """_id of the teacher with this name (None for "All" or no match)"""
+    if faculty == "All" or teachers_df.empty:
+        return None
+    teacher_id = teachers_df[teachers_df["Teacher"] == faculty]["_id"].values
+    return teacher_id[0] if len(teacher_id) > 0 else None
+
+def _faculty_labels(teachers, teacher_names):
+    """
+    Faculty names shown by this tab, for teacher ids or the cube's display
+    names alike: a name from the teachers list, anything else is "Unknown"
+    """
+    known = set(teacher_names.values())
+    return np.array([name if name in known else "Unknown" for name in teacher_display_names(teachers, teacher_names)], dtype=object)
 
 def get_incomplete_grades(data, filters):
-    """Get students with incomplete grades (INC, Dropped, null)"""
-    students_df = data['students']
-    grades_df = data['grades']
+    """Get incomplete grades (INC, Dropped, null), one row per subject grade"""
     semesters_df = data['semesters']
     teachers_df = data['teachers']
 
-    if grades_df.empty:
+    if data['grades'].empty:
         return pd.DataFrame()
 
-    # Apply semester filter
-    if filters.get("Semester") != "All":
-        sem_id_arr = semesters_df[semesters_df["Semester"] == filters["Semester"]]["_id"].values
-        if len(sem_id_arr) > 0:
-            grades_df = grades_df[grades_df["SemesterID"] == sem_id_arr[0]]
-
-    # Apply faculty filter
-    if filters.get("Faculty") != "All":
-        teacher_id = teachers_df[teachers_df["Teacher"] == filters["Faculty"]]["_id"].values
-        if len(teacher_id) > 0:
-            grades_df = grades_df[grades_df["Teachers"].apply(lambda x: teacher_id[0] in x if isinstance(x, list) else x == teacher_id[0])]
-
-    # Find incomplete grades
-    def has_incomplete_grade(grades):
-        if isinstance(grades, list):
-            return any(g in ["INC", "Dropped", None] or pd.isna(g) for g in grades)
-        return grades in ["INC", "Dropped", None] or pd.isna(grades)
-
-    incomplete_df = grades_df[grades_df["Grades"].apply(has_incomplete_grade)].copy()
+    # Semester and faculty filters are lookups in the shared incomplete-grade index
+    index = get_incomplete_grade_index(data)
+    incomplete_df = index.lookup(
+        teacher=_teacher_id(teachers_df, filters.get("Faculty", "All")),
+        semester_id=_semester_id(semesters_df, filters.get("Semester", "All")),
+    )
 
     if incomplete_df.empty:
         return pd.DataFrame()
 
-    # Merge with students and other data
-    result = incomplete_df.merge(students_df, left_on="StudentID", right_on="_id", how="left")
-    
-    # Add semester info
+    students = get_students_dimension(data)
     semesters_dict = dict(zip(semesters_df["_id"], semesters_df["Semester"]))
-    result["SemesterName"] = result["SemesterID"].map(semesters_dict)
-    
-    # Add teacher info
-    teachers_dict = dict(zip(teachers_df["_id"], teachers_df["Teacher"]))
-    result["TeacherName"] = result["Teachers"].apply(
-        lambda x: teachers_dict.get(x[0] if isinstance(x, list) and x else x, "Unknown")
-    )
-
-    return result[["StudentID", "Name", "SubjectCodes", "Grades", "TeacherName", "SemesterName"]]
+    return pd.DataFrame({
+        "StudentID": incomplete_df["StudentID"].to_numpy(),
+        "Name": students.take("Name", students.keys_for(incomplete_df["StudentID"].to_numpy())),
+        "SubjectCode": incomplete_df["SubjectCode"].to_numpy(),
+        "Grade": incomplete_df["Grade"].to_numpy(),
+        "TeacherName": _faculty_labels(incomplete_df["Teacher"], get_teacher_names(data)),
+        "SemesterName": incomplete_df["SemesterID"].map(semesters_dict).to_numpy(),
+        "GradeType": incomplete_df["GradeType"].to_numpy(),
+    })
+
+def get_incomplete_counts_by_faculty(data, filters):
+    """Incomplete grades per faculty for the semester and faculty filters, from the shared grade cube"""
+    teacher_names = get_teacher_names(data)
+    teacher_id = _teacher_id(data['teachers'], filters.get("Faculty", "All"))
+    counts = get_grade_cube(data).query(
+        by="Teacher",
+        where={
+            "SemesterID": _semester_id(data['semesters'], filters.get("Semester", "All")),
+            # The cube's Teacher dimension holds display names
+            "Teacher": None if teacher_id is None else teacher_display_names([teacher_id], teacher_names)[0],
+        },
+        measures=["Incomplete"],
+    ).set_index("Teacher")["Incomplete"]
+    # Same labels as the table: unmapped teachers are grouped under "Unknown"
+    counts.index = _faculty_labels(counts.index, teacher_names)
+    counts = counts.groupby(level=0, sort=False).sum()
+    return counts[counts > 0].sort_values(ascending=False, kind="stable")
 
 def show_registrar_new_tab9_info(data, students_df, semesters_df, teachers_df):
         st.subheader("⚠️ Incomplete Grades Report")
@@ -406,7 +352,7 @@ def show_registrar_new_tab9_info(data, students_df, semesters_df, teachers_df):
                     unique_students = df["StudentID"].nunique() if not df.empty else 0
                     st.metric("Affected Students", f"{unique_students:,}")
                 with col3:
-                    unique_subjects = df["SubjectCodes"].nunique() if not df.empty else 0
+                    unique_subjects = df["SubjectCode"].nunique() if not df.empty else 0
                     st.metric("Affected Subjects", unique_subjects)
                 with col4:
                     unique_teachers = df["TeacherName"].nunique() if not df.empty else 0
@@ -414,16 +360,6 @@ def show_registrar_new_tab9_info(data, students_df, semesters_df, teachers_df):
 
                 if not df.empty:
                     # Incomplete grades by type
-                    def categorize_grade(grade):
-                        if isinstance(grade, list):
-                            for g in grade:
-                                if g in ["INC", "Dropped", None] or pd.isna(g):
-                                    return "Incomplete" if g == "INC" else "Dropped" if g == "Dropped" else "Missing"
-                        elif grade in ["INC", "Dropped", None] or pd.isna(grade):
-                            return "Incomplete" if grade == "INC" else "Dropped" if grade == "Dropped" else "Missing"
-                        return "Other"
-
-                    df["GradeType"] = df["Grades"].apply(categorize_grade)
                     grade_type_counts = df["GradeType"].value_counts()
 
                     # Pie chart for incomplete grade types
@@ -440,7 +376,7 @@ def show_registrar_new_tab9_info(data, students_df, semesters_df, teachers_df):
                     st.plotly_chart(fig_pie, use_container_width=True)
 
                     # Bar chart by faculty
-                    faculty_counts = df["TeacherName"].value_counts().head(10)
+                    faculty_counts = get_incomplete_counts_by_faculty(data, {"Semester": semester, "Faculty": faculty}).head(10)
                     fig_bar = px.bar(
                         x=faculty_counts.index,
                         y=faculty_counts.values,
@@ -452,7 +388,7 @@ def show_registrar_new_tab9_info(data, students_df, semesters_df, teachers_df):
 
                     # Detailed data table
                     st.subheader("Detailed Incomplete Grades Report")
-                    display_df = df[["StudentID", "Name", "SubjectCodes", "Grades", "TeacherName", "SemesterName", "GradeType"]].copy()
+                    display_df = df[["StudentID", "Name", "SubjectCode", "Grade", "TeacherName", "SemesterName", "GradeType"]].copy()
                     st.dataframe(display_df, use_container_width=True)
 
                 else:
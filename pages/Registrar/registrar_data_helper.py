@@ -0,0 +1,141 @@
+import numpy as np
+from data_store import get_data_store
+from dimensions import DimensionTable
+from snapshot_store import build_grade_facts
+from analytics.standing import semester_standing, update_semester_standing, standing_semester_gpa
+from analytics.retention import student_activity
+from analytics.pass_fail import PASSING_GRADE, teacher_grade_histogram, update_teacher_grade_histogram
+from analytics.incomplete import IncompleteGradeIndex
+from analytics.enrollment import EnrollmentCube
+from analytics.cube import GradeCube
+from analytics.rank import GPARankIndex
+
+# Values derived from the registrar's shared frames. Each one is built once per
+# snapshot version in the process-wide DataStore and reused by every tab,
+# PDF export and session. Views passed an on_grade_change handler are kept
+# up to date through faculty grade saves; the rest are rebuilt on next use.
+
+
+def _unchanged(value, changes):
+    return value
+
+
+def _unless_new_document(value, changes):
+    # Only a grade for a new (student, semester) document changes enrollment
+    return None if any(change.new_document for change in changes) else value
+
+
+def get_grade_facts(data):
+    """Grade fact table for the registrar data (the loader's shared one when present)"""
+    return data['grade_facts'] if 'grade_facts' in data else build_grade_facts(data['grades'])
+
+
+def get_students_dimension(data):
+    return get_data_store().derived("registrar_students_dimension", lambda: DimensionTable(data['students']), _unchanged)
+
+
+def get_semester_gpa(data):
+    """GPA per student per semester, read off the (incrementally maintained) standing table"""
+    return get_data_store().derived("registrar_semester_gpa", lambda: standing_semester_gpa(get_semester_standing(data)))
+
+
+def get_gpa_rank_index(data):
+    """Sorted GPA arrays per semester, course and year level (rank / percentile / top-N lookups)"""
+    return get_data_store().derived(
+        "registrar_gpa_rank_index",
+        lambda: GPARankIndex(get_semester_gpa(data), get_students_dimension(data)),
+    )
+
+
+def get_semester_standing(data):
+    """Academic standing per student per semester with the student's Name and Course attached"""
+    students = get_students_dimension(data)
+
+    def with_students(standing):
+        keys = students.keys_for(standing["StudentID"].to_numpy())
+        return standing.assign(Name=students.take("Name", keys), Course=students.take("Course", keys))
+
+    return get_data_store().derived(
+        "registrar_semester_standing",
+        lambda: with_students(semester_standing(get_grade_facts(data))),
+        lambda standing, changes: with_students(update_semester_standing(standing, changes)),
+    )
+
+
+def get_student_activity(data):
+    """Per-student activity index (first/last active semester, semesters enrolled, latest standing)"""
+    return get_data_store().derived(
+        "registrar_student_activity",
+        lambda: student_activity(data['grades'], data['semesters'], get_semester_standing(data)),
+    )
+
+
+def get_teacher_names(data):
+    """Teacher id -> display name"""
+    teachers_df = data['teachers']
+    return dict(zip(teachers_df["_id"], teachers_df["Teacher"])) if not teachers_df.empty else {}
+
+
+def get_grade_cube(data, passing_grade=PASSING_GRADE):
+    """
+    Aggregate cube behind the registrar's grade analytics: every count, sum,
+    pass/fail and incomplete figure is a GradeCube.query instead of a scan
+    of the grades.
+    """
+    return get_data_store().derived(
+        f"registrar_grade_cube_{passing_grade}",
+        lambda: GradeCube(get_grade_facts(data), get_students_dimension(data), data['semesters'], get_teacher_names(data), passing_grade),
+        lambda cube, changes: cube.updated(changes),
+    )
+
+
+def get_teacher_grade_histogram(data):
+    """Numeric grades per teacher (display name) and rounded grade"""
+    teacher_names = get_teacher_names(data)
+    return get_data_store().derived(
+        "registrar_teacher_grade_histogram",
+        lambda: teacher_grade_histogram(get_grade_facts(data), teacher_names),
+        lambda histogram, changes: update_teacher_grade_histogram(histogram, changes, teacher_names),
+    )
+
+
+def get_incomplete_grade_index(data):
+    """Incomplete grades (INC, Dropped, missing) keyed by teacher and semester"""
+    return get_data_store().derived(
+        "registrar_incomplete_grade_index",
+        lambda: IncompleteGradeIndex(get_grade_facts(data)),
+        lambda index, changes: index.updated(changes),
+    )
+
+
+def get_enrollment_cube(data):
+    """Distinct students per school year, semester, course and year level"""
+    return get_data_store().derived(
+        "registrar_enrollment_cube",
+        lambda: EnrollmentCube(data['grades'], get_students_dimension(data), data['semesters']),
+        _unless_new_document,
+    )
+
+
+def semester_ids_for(semesters_df, semester="All", school_year="All"):
+    """
+    Semester _ids selected by the registrar's Semester / SchoolYear filters,
+    or None when they select everything. A Semester label picks its first
+    matching _id; filters that match nothing are ignored.
+    """
+    semester_ids = None
+    if semester != "All":
+        matches = semesters_df.loc[semesters_df["Semester"] == semester, "_id"].to_numpy()
+        if len(matches) > 0:
+            semester_ids = matches[:1]
+
+    if school_year != "All":
+        try:
+            school_year_value = int(school_year) if isinstance(school_year, str) else school_year
+            matches = semesters_df.loc[semesters_df["SchoolYear"] == school_year_value, "_id"].to_numpy()
+        except (ValueError, TypeError):
+            matches = semesters_df.loc[semesters_df["SchoolYear"].astype(str) == str(school_year), "_id"].to_numpy()
+        if len(matches) > 0:
+            semester_ids = matches if semester_ids is None else semester_ids[np.isin(semester_ids, matches)]
+
+    return semester_ids
@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import os
 import io
 import matplotlib.pyplot as plt
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
@@ -13,6 +12,8 @@ from reportlab.lib.units import inch
 from reportlab.platypus import Paragraph
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_LEFT
+from global_utils import load_pkl_data, load_student_grade_index, load_subject_statistics, load_subject_grade_ranks, load_gpa_rank_index, snapshot_exists, new_grades_cache
+from pages.student.student_context import get_student_context
 
 
 # ------------------ Paths to Pickle Files ------------------ #
@@ -24,39 +25,33 @@ subjects_cache = "pkl/subjects.pkl"
 
 # ------------------ Helper Functions (minimal) ------------------ #
 def get_student_info(student_name):
-    if not os.path.exists(student_cache):
+    if not snapshot_exists(student_cache):
         st.error("Student cache file not found.")
         st.stop()
-    students = pd.read_pickle(student_cache)
+    students = load_pkl_data(student_cache)
     students_df = pd.DataFrame(students) if isinstance(students, list) else students
     match = students_df[students_df["Name"] == student_name]
     return match.iloc[0].to_dict() if not match.empty else None
 
 def get_student_grades(student_id):
-    if not os.path.exists(grades_cache) or not os.path.exists(semesters_cache):
+    if not snapshot_exists(grades_cache) or not snapshot_exists(semesters_cache):
         st.error("Grades or semesters cache file not found.")
         st.stop()
-    grades = pd.read_pickle(grades_cache)
-    semesters = pd.read_pickle(semesters_cache)
-    grades_df = pd.DataFrame(grades) if isinstance(grades, list) else grades
+    semesters = load_pkl_data(semesters_cache)
     sem_df = pd.DataFrame(semesters) if isinstance(semesters, list) else semesters
-    student_grades = grades_df[grades_df["StudentID"] == student_id].copy()
+    student_grades = load_student_grade_index(grades_cache).transcript(student_id).copy()
     if not student_grades.empty:
-        student_grades["Semester"] = ""
-        student_grades["SchoolYear"] = ""
-        for idx, row in student_grades.iterrows():
-            sem_id = row.get("SemesterID")
-            match = sem_df[sem_df["_id"] == sem_id]
-            if not match.empty:
-                student_grades.at[idx, "Semester"] = match.iloc[0].get("Semester", "")
-                student_grades.at[idx, "SchoolYear"] = match.iloc[0].get("SchoolYear", "")
+        semester_info = sem_df.drop_duplicates(subset=["_id"], keep="first").set_index("_id")
+        for column in ["Semester", "SchoolYear"]:
+            values = student_grades["SemesterID"].map(semester_info[column]) if column in semester_info.columns else pd.Series(index=student_grades.index, dtype=object)
+            student_grades[column] = values.astype(object).fillna("")
     return student_grades.to_dict(orient="records")
 
 def get_subjects():
-    if not os.path.exists(subjects_cache):
+    if not snapshot_exists(subjects_cache):
         st.error("Subjects cache file not found.")
         st.stop()
-    subjects = pd.read_pickle(subjects_cache)
+    subjects = load_pkl_data(subjects_cache)
     subjects_df = pd.DataFrame(subjects) if isinstance(subjects, list) else subjects
     return subjects_df[["_id", "Description"]].drop_duplicates()
 
@@ -91,7 +86,7 @@ def show_student_dashboard_old():
             semester_avgs = []
             if "Semester" in df.columns and "SchoolYear" in df.columns:
                 grouped = df.groupby(["SchoolYear", "Semester"]) 
-                subjects_df = pd.read_pickle(subjects_cache)
+                subjects_df = load_pkl_data(subjects_cache)
                 subjects_df = pd.DataFrame(subjects_df) if isinstance(subjects_df, list) else subjects_df
                 subjects_df = subjects_df[["_id", "Description", "Units"]].drop_duplicates()
                 for (sy, sem), sem_df in grouped:
@@ -633,34 +628,14 @@ def show_student_dashboard_new():
         logged_in_name = user_data.get("Name", "Unknown User")
 
         try:
-            # --- Load grades ---
-            new_grades = pd.read_pickle("pkl/new_grades.pkl")
-            grades_df = pd.DataFrame(new_grades)
+            # ✅ Everything about the logged-in student, built once per login
+            context = get_student_context(user_data)
+            grades_df = context.semester_grades
+            subjects_df = context.curriculum_subjects
 
-            # ✅ Filter for logged-in student
-            if logged_in_refid.isdigit():
-                grades_df = grades_df[grades_df["StudentID"] == int(logged_in_refid)]
-            else:
-                grades_df = pd.DataFrame()  # no valid student
-
-            # --- Load student info ---
-            course = "N/A"
-            try:
-                students = pd.read_pickle("pkl/new_students.pkl")
-                students_df = pd.DataFrame(students)
-                student_info = students_df[students_df["_id"] == int(logged_in_refid)]
-
-                if not student_info.empty:
-                    course = student_info.iloc[0].get("Course", "N/A")
-            except Exception:
-                course = user_data.get("Course", "N/A")
-
-            # --- Compute total average ---
-            total_avg = None
-            if not grades_df.empty:
-                all_grades = grades_df["Grades"].explode()
-                all_grades = pd.to_numeric(all_grades, errors="coerce").dropna()
-                total_avg = all_grades.mean() if not all_grades.empty else None
+            # --- Student info and total average ---
+            course = context.course
+            total_avg = context.total_average
 
             # --- 🎯 Display header (always visible) ---
             st.markdown("### 🧑 Student Information")
@@ -671,49 +646,30 @@ def show_student_dashboard_new():
             else:
                 st.write("**Total Average:** N/A")
 
+            # --- Class standing (shared GPA rank index, no GPA recomputation) ---
+            if context.student_id is not None:
+                rank_index = load_gpa_rank_index()
+                for label, by in (("Course", ("Course",)), ("Course & Year Level", ("Course", "YearLevel"))):
+                    standing = rank_index.position(context.student_id, by=by)
+                    if standing is not None:
+                        st.write(
+                            f"**Rank in {label}:** {standing['Rank']} of {standing['CohortSize']} "
+                            f"({standing['Percentile']:.1f} percentile)"
+                        )
+                if rank_index.is_top(context.student_id, 10, by=("Course",)):
+                    st.success(f"🏅 Top 10 in {course}")
+
             # --- Proceed only if grades exist ---
             if grades_df.empty:
                 st.info("No grades found for this student.")
             else:
-                # --- Load semester table ---
-                semesters = pd.read_pickle("pkl/semesters.pkl")
-                semesters_df = pd.DataFrame(semesters)
-
-                # ✅ Merge semester info (SemesterID ↔ _id)
-                grades_df = grades_df.merge(
-                    semesters_df,
-                    left_on="SemesterID",
-                    right_on="_id",
-                    how="left"
-                )
-
-                # Drop unused columns
-                grades_df = grades_df.drop(columns=["_id", "StudentID"], errors="ignore")
-
-                # --- Load curriculum subjects ---
-                curriculums = pd.read_pickle("pkl/curriculums.pkl")
-                if isinstance(curriculums, pd.DataFrame):
-                    curriculums = curriculums.to_dict(orient="records")
-
-                # Flatten all subjects from curriculum into one DataFrame
-                all_subjects = []
-                for curriculum in curriculums:
-                    for subj in curriculum.get("subjects", []):
-                        all_subjects.append(subj)
-                subjects_df = (
-                    pd.DataFrame(all_subjects)
-                    if all_subjects
-                    else pd.DataFrame(columns=["subjectCode", "subjectName", "units"])
-                )
-
                 transcript_data = {}
-                semester_avgs = []
+                semester_avgs = context.semester_averages
 
 
                 # --- 🔹 General Grade Summary ---
                 st.subheader("📊 General Grade Summary")
-                all_grades = grades_df["Grades"].explode()  # flatten list of grades
-                all_grades = pd.to_numeric(all_grades, errors="coerce").dropna()
+                all_grades = context.all_grades
 
                 if not all_grades.empty:
                     summary_df = pd.DataFrame([{
@@ -741,34 +697,15 @@ def show_student_dashboard_new():
                     st.subheader("📊 My Grades by Semester")
 
                 # --- Group by SchoolYear + Semester ---
+                # (subject grades already carry the curriculum subjectName + units)
                 if "SchoolYear" in grades_df.columns and "Semester" in grades_df.columns:
-                    grouped = grades_df.groupby(["SchoolYear", "Semester"])
+                    grouped = context.subject_grades.groupby(["SchoolYear", "Semester"])
 
                     for (sy, sem), sem_df in grouped:
                         st.subheader(f"📚 {sy} - {sem}")
 
-                        # Handle expanded grades
-                        if sem_df["SubjectCodes"].apply(lambda x: isinstance(x, list)).any():
-                            expanded = pd.DataFrame({
-                                "SubjectCode": sem_df["SubjectCodes"].explode().values,
-                                "Teacher": sem_df["Teachers"].explode().values,
-                                "Grade": sem_df["Grades"].explode().values
-                            })
-                        else:
-                            expanded = sem_df[["SubjectCodes", "Teachers", "Grades"]].rename(
-                                columns={"SubjectCodes": "SubjectCode", "Teachers": "Teacher", "Grades": "Grade"}
-                            )
-
-                        # ✅ Merge with curriculum subjects to get subjectName + units
-                        expanded = expanded.merge(
-                            subjects_df[["subjectCode", "subjectName", "units"]],
-                            left_on="SubjectCode",
-                            right_on="subjectCode",
-                            how="left"
-                        ).drop(columns=["subjectCode"])
-
                         # ✅ Reorder columns
-                        expanded = expanded[["SubjectCode", "subjectName", "units", "Teacher", "Grade"]]
+                        expanded = sem_df[["SubjectCode", "subjectName", "units", "Teacher", "Grade"]].reset_index(drop=True)
 
                         # ✅ Add STATUS column
                         expanded["Status"] = expanded["Grade"].apply(
@@ -794,7 +731,6 @@ def show_student_dashboard_new():
                         if not valid_grades.empty:
                             avg = valid_grades.mean()
                             st.write(f"**Semester Average: {avg:.2f}**")
-                            semester_avgs.append((f"{sy} - {sem}", avg))
                         else:
                             st.write("**Semester Average: N/A**")
 
@@ -840,16 +776,12 @@ def show_student_dashboard_new():
                     styles = getSampleStyleSheet()
                     elements = []
 
-                   # --- Load student info ---
-                    students = pd.read_pickle("pkl/new_students.pkl")
-                    students_df = pd.DataFrame(students)
-
-                    # Match logged-in student
-                    student_info = students_df[students_df["_id"] == int(logged_in_refid)]
+                   # --- Student info (from the session's StudentContext) ---
+                    student_info = context.student_info
 
-                    if not student_info.empty:
-                        course = student_info.iloc[0].get("Course", "N/A")
-                        year_level = student_info.iloc[0].get("YearLevel", "N/A")
+                    if student_info:
+                        course = student_info.get("Course", "N/A")
+                        year_level = student_info.get("YearLevel", "N/A")
                     else:
                         course = user_data.get("Course", "N/A")
                         year_level = user_data.get("YearLevel", "N/A")
@@ -973,102 +905,28 @@ def show_student_dashboard_new():
         except Exception as e:
             st.error(f"❌ Error loading grades: {e}")
     with tab2:
-        failed_subjects = []  # collect all failed rows
-
-        # --- Load all grades for student counting ---
-        all_grades_df = pd.read_pickle("pkl/new_grades.pkl")
-        all_grades_df = pd.DataFrame(all_grades_df)
-
-        # --- Group by SchoolYear + Semester ---
-        if "SchoolYear" in grades_df.columns and "Semester" in grades_df.columns:
-            grouped = grades_df.groupby(["SchoolYear", "Semester"])
-
-            for (sy, sem), sem_df in grouped:
-                # Handle expanded grades
-                if sem_df["SubjectCodes"].apply(lambda x: isinstance(x, list)).any():
-                    expanded = pd.DataFrame({
-                        "SubjectCode": sem_df["SubjectCodes"].explode().values,
-                        "Teacher": sem_df["Teachers"].explode().values,
-                        "Grade": sem_df["Grades"].explode().values,
-                        "SemesterID": sem_df["SemesterID"].iloc[0],
-                        "section": sem_df["section"].iloc[0] if "section" in sem_df.columns else None,
-                        "StudentID": sem_df["StudentID"].iloc[0] if "StudentID" in sem_df.columns else None
-                    })
-                else:
-                    expanded = sem_df[["SubjectCodes", "Teachers", "Grades", "SemesterID", "section", "StudentID"]].rename(
-                        columns={"SubjectCodes": "SubjectCode", "Teachers": "Teacher", "Grades": "Grade"}
-                    )
-
-                # Merge with curriculum subjects
-                expanded = expanded.merge(
-                    subjects_df[["subjectCode", "subjectName", "units"]],
-                    left_on="SubjectCode",
-                    right_on="subjectCode",
-                    how="left"
-                ).drop(columns=["subjectCode"])
-
-                # Add semester info
-                expanded["SchoolYear"] = sy
-                expanded["Semester"] = sem
-
-                # Add status (temporary before replacing with LOW/MEDIUM/HIGH)
-                expanded["Status"] = expanded["Grade"].apply(
-                    lambda x: "PASSED" if pd.to_numeric(x, errors="coerce") >= 75 else "FAILED"
-                )
+        # --- Class size and failures per subject + section + SemesterID (shared statistics table) ---
+        class_stats_df = load_subject_statistics(new_grades_cache, ("SubjectCode", "section", "SemesterID"))
 
-                # Collect failed rows
-                failed_rows = expanded[expanded["Status"] == "FAILED"].copy()
-                if not failed_rows.empty:
-                    # --- Add total student count + fail percentage ---
-                    for idx, row in failed_rows.iterrows():
-                        subject_code = row["SubjectCode"]
-                        semester_id = row["SemesterID"]
-                        section = row["section"]
-
-                        # --- Get all students for that subject ---
-                        subject_students = all_grades_df[
-                            (all_grades_df["SemesterID"] == semester_id) &
-                            (all_grades_df["section"] == section) &
-                            (all_grades_df["SubjectCodes"].apply(
-                                lambda sc: subject_code in sc if isinstance(sc, list) else sc == subject_code
-                            ))
-                        ]
-
-                        total_students = subject_students["StudentID"].nunique()
-
-                        # --- Count how many failed (<75) ---
-                        failed_count = 0
-                        if not subject_students.empty:
-                            expanded_subject = pd.DataFrame({
-                                "StudentID": subject_students["StudentID"].repeat(
-                                    subject_students["Grades"].str.len()
-                                    if subject_students["Grades"].dtype == "O" else 1
-                                ).values,
-                                "SubjectCode": subject_students["SubjectCodes"].explode().values,
-                                "Grade": subject_students["Grades"].explode().values
-                            })
-                            failed_count = expanded_subject[
-                                (expanded_subject["SubjectCode"] == subject_code) &
-                                (pd.to_numeric(expanded_subject["Grade"], errors="coerce") < 75)
-                            ]["StudentID"].nunique()
-
-                        # --- Save to row ---
-                        failed_rows.loc[idx, "TotalStudents"] = int(total_students)
-                        failed_rows.loc[idx, "FailedStudents"] = int(failed_count)  # ensure no decimals
-                        failed_rows.loc[idx, "FailedPercentage"] = (
-                            round((failed_count / total_students) * 100, 2) if total_students > 0 else 0
-                        )
-
-                    failed_subjects.append(failed_rows)
+        # --- The student's subject grades (StudentContext), failed = not a numeric grade >= 75 ---
+        subject_rows = context.subject_grades.sort_values(["SchoolYear", "Semester"], kind="stable", ignore_index=True)
+        failed_df = subject_rows[~(pd.to_numeric(subject_rows["Grade"], errors="coerce") >= 75)]
 
         # ✅ Combine all failed into one table
-        if failed_subjects:
-            failed_df = pd.concat(failed_subjects, ignore_index=True)
+        if not failed_df.empty:
+            failed_df = failed_df.merge(
+                class_stats_df[["SubjectCode", "section", "SemesterID", "Students", "Failed"]],
+                on=["SubjectCode", "section", "SemesterID"],
+                how="left"
+            )
 
             # ✅ Make sure numeric columns are correct
-            failed_df["TotalStudents"] = failed_df["TotalStudents"].astype(int)
-            failed_df["FailedStudents"] = failed_df["FailedStudents"].astype(int)   # 👈 force integer
-            failed_df["FailedPercentage"] = failed_df["FailedPercentage"].astype(float)
+            failed_df["TotalStudents"] = failed_df["Students"].fillna(0).astype(int)
+            failed_df["FailedStudents"] = failed_df["Failed"].fillna(0).astype(int)   # 👈 force integer
+            failed_df["FailedPercentage"] = (
+                (failed_df["FailedStudents"] / failed_df["TotalStudents"].where(failed_df["TotalStudents"] > 0) * 100)
+                .round(2).fillna(0).astype(float)
+            )
 
             # --- Replace STATUS with LOW / MEDIUM / HIGH ---
             def categorize_status(pct):
@@ -1114,16 +972,12 @@ def show_student_dashboard_new():
                 styles = getSampleStyleSheet()
                 elements = []
 
-                # --- Load student info ---
-                students = pd.read_pickle("pkl/new_students.pkl")
-                students_df = pd.DataFrame(students)
+                # --- Student info (from the session's StudentContext) ---
+                student_info = context.student_info
 
-                # Match logged-in student
-                student_info = students_df[students_df["_id"] == int(logged_in_refid)]
-
-                if not student_info.empty:
-                    course = student_info.iloc[0].get("Course", "N/A")
-                    year_level = student_info.iloc[0].get("YearLevel", "N/A")
+                if student_info:
+                    course = student_info.get("Course", "N/A")
+                    year_level = student_info.get("YearLevel", "N/A")
                 else:
                     course = user_data.get("Course", "N/A")
                     year_level = user_data.get("YearLevel", "N/A")
@@ -1215,91 +1069,23 @@ def show_student_dashboard_new():
         logged_in_name = user_data.get("Name", "Unknown User")
 
         try:
-            # --- Load all grades ---
-            new_grades = pd.read_pickle("pkl/new_grades.pkl")
-            grades_df = pd.DataFrame(new_grades)
-
-            # ✅ Total number of unique students
-            total_students = grades_df["StudentID"].nunique()
-
-            # ✅ Expand SubjectCodes/Grades into rows
-            all_subject_grades = []
-            for _, row in grades_df.iterrows():
-                if isinstance(row["SubjectCodes"], list):
-                    for subj, grade in zip(row["SubjectCodes"], row["Grades"]):
-                        all_subject_grades.append({
-                            "StudentID": row["StudentID"],
-                            "SubjectCode": subj,
-                            "Grade": grade,
-                            "section": row.get("section", "N/A"),
-                            "SemesterID": row.get("SemesterID", None)
-                        })
-                else:
-                    all_subject_grades.append({
-                        "StudentID": row["StudentID"],
-                        "SubjectCode": row["SubjectCodes"],
-                        "Grade": row["Grades"],
-                        "section": row.get("section", "N/A"),
-                        "SemesterID": row.get("SemesterID", None)
-                    })
-
-            all_subject_grades_df = pd.DataFrame(all_subject_grades)
-            all_subject_grades_df["Grade"] = pd.to_numeric(all_subject_grades_df["Grade"], errors="coerce")
-
-            # ✅ Class average per subject + section + SemesterID
-            subject_avg_df = (
-                all_subject_grades_df.groupby(["SubjectCode", "section", "SemesterID"])["Grade"]
-                .mean()
-                .reset_index()
-                .rename(columns={"Grade": "ClassAverage"})
-            )
+            # ✅ Class average and total students per subject + section + SemesterID
+            # (shared statistics table, computed once per grades snapshot)
+            subject_stats_df = load_subject_statistics(new_grades_cache, ("SubjectCode", "section", "SemesterID"))
+            subject_avg_df = subject_stats_df[["SubjectCode", "section", "SemesterID", "Mean"]].rename(columns={"Mean": "ClassAverage"})
             subject_avg_df["ClassAverage"] = subject_avg_df["ClassAverage"].round(2)
+            subject_count_df = subject_stats_df[["SubjectCode", "section", "SemesterID", "Students"]].rename(columns={"Students": "TotalStudent"})
 
-            # ✅ Total student count per subject + section + SemesterID
-            subject_count_df = (
-                all_subject_grades_df.groupby(["SubjectCode", "section", "SemesterID"])
-                .size()
-                .reset_index(name="TotalStudent")
-            )
-
-            # ✅ Student rank per subject + section + SemesterID
-            all_subject_grades_df["Rank"] = (
-                all_subject_grades_df.groupby(["SubjectCode", "section", "SemesterID"])["Grade"]
-                .rank(method="min", ascending=False)
-            )
+            # ✅ Sorted class grades per subject + section + SemesterID, to rank the student's own grades
+            subject_grade_ranks = load_subject_grade_ranks(new_grades_cache, ("SubjectCode", "section", "SemesterID"))
 
-            # ✅ Filter for logged-in student only
-            student_grades_df = grades_df[grades_df["StudentID"] == int(logged_in_refid)]
+            # ✅ Logged-in student's subject grades with semester and curriculum info
+            context = get_student_context(user_data)
+            student_grades_df = context.subject_grades
 
             if student_grades_df.empty:
                 st.info("No grades found for this student.")
             else:
-                # --- Load semester table ---
-                semesters = pd.read_pickle("pkl/semesters.pkl")
-                semesters_df = pd.DataFrame(semesters)
-
-                # ✅ Merge semester info
-                student_grades_df = student_grades_df.merge(
-                    semesters_df,
-                    left_on="SemesterID",
-                    right_on="_id",
-                    how="left"
-                ).drop(columns=["_id", "StudentID"], errors="ignore")
-
-                # --- Load curriculum subjects ---
-                curriculums = pd.read_pickle("pkl/curriculums.pkl")
-                if isinstance(curriculums, pd.DataFrame):
-                    curriculums = curriculums.to_dict(orient="records")
-
-                all_subjects = []
-                for curriculum in curriculums:
-                    for subj in curriculum.get("subjects", []):
-                        all_subjects.append(subj)
-                subjects_df = (
-                    pd.DataFrame(all_subjects)
-                    if all_subjects
-                    else pd.DataFrame(columns=["subjectCode", "subjectName", "units"])
-                )
 
                 # ✅ Store semester-wise tables for PDF later
                 semester_comparison = {}
@@ -1311,29 +1097,8 @@ def show_student_dashboard_new():
                     for (sy, sem, student_section, sem_id), sem_df in grouped:
                         st.subheader(f"📚 {sy} - {sem} (section {student_section})")
 
-                        # Handle expanded grades
-                        if sem_df["SubjectCodes"].apply(lambda x: isinstance(x, list)).any():
-                            expanded = pd.DataFrame({
-                                "SubjectCode": sem_df["SubjectCodes"].explode().values,
-                                "Teacher": sem_df["Teachers"].explode().values,
-                                "Grade": sem_df["Grades"].explode().values
-                            })
-                        else:
-                            expanded = sem_df[["SubjectCodes", "Teachers", "Grades"]].rename(
-                                columns={"SubjectCodes": "SubjectCode", "Teachers": "Teacher", "Grades": "Grade"}
-                            )
-
-                        # ✅ Merge with curriculum subjects
-                        expanded = expanded.merge(
-                            subjects_df[["subjectCode", "subjectName", "units"]],
-                            left_on="SubjectCode",
-                            right_on="subjectCode",
-                            how="left"
-                        ).drop(columns=["subjectCode"])
-
-                        # ✅ Add Section + SemesterID
-                        expanded["section"] = student_section
-                        expanded["SemesterID"] = sem_id
+                        # ✅ The semester's subject rows with curriculum name and units (StudentContext)
+                        expanded = sem_df[["SubjectCode", "subjectName", "units", "Teacher", "Grade", "section", "SemesterID"]].reset_index(drop=True)
 
                         # ✅ Merge with total student count
                         expanded = expanded.merge(
@@ -1349,16 +1114,9 @@ def show_student_dashboard_new():
                             how="left"
                         )
 
-                        # ✅ Merge with student rank
-                        expanded = expanded.merge(
-                            all_subject_grades_df[["SubjectCode", "section", "SemesterID", "StudentID", "Rank"]],
-                            left_on=["SubjectCode", "section", "SemesterID"],
-                            right_on=["SubjectCode", "section", "SemesterID"],
-                            how="left"
-                        )
-
-                        # ✅ Keep only the logged-in student's rank
-                        expanded = expanded[expanded["Rank"].notna()].drop_duplicates(subset=["SubjectCode"])
+                        # ✅ Logged-in student's rank in each class (no rank for a non-numeric grade)
+                        expanded["Rank"] = subject_grade_ranks.ranks(expanded)
+                        expanded = expanded[expanded["Rank"].notna()]
 
                         # ✅ Add comparison column
                         expanded["Comparison"] = expanded.apply(
@@ -1395,16 +1153,12 @@ def show_student_dashboard_new():
                     styles = getSampleStyleSheet()
                     elements = []
 
-                    # --- Load student info ---
-                    students = pd.read_pickle("pkl/new_students.pkl")
-                    students_df = pd.DataFrame(students)
-
-                    # Match logged-in student
-                    student_info = students_df[students_df["_id"] == int(logged_in_refid)]
+                    # --- Student info (from the session's StudentContext) ---
+                    student_info = context.student_info
 
-                    if not student_info.empty:
-                        course = student_info.iloc[0].get("Course", "N/A")
-                        year_level = student_info.iloc[0].get("YearLevel", "N/A")
+                    if student_info:
+                        course = student_info.get("Course", "N/A")
+                        year_level = student_info.get("YearLevel", "N/A")
                     else:
                         course = user_data.get("Course", "N/A")
                         year_level = user_data.get("YearLevel", "N/A")
@@ -1502,46 +1256,14 @@ def show_student_dashboard_new():
         logged_in_name = user_data.get("Name", "Unknown User")
 
         try:
-            # --- Load grades ---
-            new_grades = pd.read_pickle("pkl/new_grades.pkl")
-            grades_df = pd.DataFrame(new_grades)
-
-            # ✅ Filter for logged-in student
-            grades_df = grades_df[grades_df["StudentID"] == int(logged_in_refid)]
+            # ✅ Logged-in student's grades with semester info, and curriculum subjects
+            context = get_student_context(user_data)
+            grades_df = context.semester_grades
+            subjects_df = context.curriculum_subjects
 
             if grades_df.empty:
                 st.info("No grades found for this student.")
             else:
-                # --- Load semester table ---
-                semesters = pd.read_pickle("pkl/semesters.pkl")
-                semesters_df = pd.DataFrame(semesters)
-
-                # ✅ Merge semester info (SemesterID ↔ _id)
-                grades_df = grades_df.merge(
-                    semesters_df,
-                    left_on="SemesterID",
-                    right_on="_id",
-                    how="left"
-                )
-
-                # Drop unused columns
-                grades_df = grades_df.drop(columns=["_id", "StudentID"], errors="ignore")
-
-                # --- Load curriculum subjects ---
-                curriculums = pd.read_pickle("pkl/curriculums.pkl")
-                if isinstance(curriculums, pd.DataFrame):
-                    curriculums = curriculums.to_dict(orient="records")
-
-                # Flatten all subjects from curriculum into one DataFrame
-                all_subjects = []
-                for curriculum in curriculums:
-                    for subj in curriculum.get("subjects", []):
-                        all_subjects.append(subj)
-                subjects_df = (
-                    pd.DataFrame(all_subjects)
-                    if all_subjects
-                    else pd.DataFrame(columns=["subjectCode", "subjectName", "units"])
-                )
 
                 # ✅ Subject Completion Overview
                 expanded_grades = pd.DataFrame({
@@ -1673,13 +1395,11 @@ def show_student_dashboard_new():
                         elements = []
 
                         # --- Student Info ---
-                        students = pd.read_pickle("pkl/new_students.pkl")
-                        students_df = pd.DataFrame(students)
-                        student_info = students_df[students_df["_id"] == int(logged_in_refid)]
+                        student_info = context.student_info
 
-                        if not student_info.empty:
-                            course = student_info.iloc[0].get("Course", "N/A")
-                            year_level = student_info.iloc[0].get("YearLevel", "N/A")
+                        if student_info:
+                            course = student_info.get("Course", "N/A")
+                            year_level = student_info.get("YearLevel", "N/A")
                         else:
                             course = user_data.get("Course", "N/A")
                             year_level = user_data.get("YearLevel", "N/A")
@@ -1795,18 +1515,10 @@ def show_student_dashboard_new():
             logged_in_name = user_data.get("Name", "Unknown User")
             logged_in_refid = int(user_data.get("_id", 0))  # ensure int
 
-            # ✅ Load curriculum
-            curriculums = pd.read_pickle("pkl/curriculums.pkl")
-            if isinstance(curriculums, pd.DataFrame):
-                curriculums = curriculums.to_dict(orient="records")
-
-            # ✅ Load new_grades
-            new_grades_df = pd.read_pickle("pkl/new_grades.pkl")
-            if not isinstance(new_grades_df, pd.DataFrame):
-                new_grades_df = pd.DataFrame(new_grades_df)
-
-            # ✅ Filter for the logged-in student
-            student_grades = new_grades_df[new_grades_df['StudentID'] == logged_in_refid].copy()
+            # ✅ Curriculums and the logged-in student's grades
+            context = get_student_context(user_data)
+            curriculums = context.curriculums
+            student_grades = context.grades.copy()
 
             # Expand SubjectCodes if they are lists
             if "SubjectCodes" in student_grades.columns and student_grades["SubjectCodes"].apply(lambda x: isinstance(x, list)).any():
@@ -1839,12 +1551,9 @@ def show_student_dashboard_new():
 
                 if not student_grades.empty and "section" in student_grades.columns:
                     section = student_grades.iloc[0]["section"]
-                    sem = student_grades.iloc[0]["SemesterID"]
 
-                    classmates = new_grades_df[
-                        (new_grades_df["SemesterID"] == sem) &
-                        (new_grades_df["section"] == section)
-                    ].copy()
+                    # Documents of the same SemesterID + section
+                    classmates = context.section_classmates
 
                     if not classmates.empty:
                         avg_list = []
@@ -1922,13 +1631,11 @@ def show_student_dashboard_new():
                 styles = getSampleStyleSheet()
                 elements = []
 
-                students = pd.read_pickle("pkl/new_students.pkl")
-                students_df = pd.DataFrame(students)
-                student_info_pdf = students_df[students_df["_id"] == logged_in_refid]
+                student_info_pdf = context.student_info
 
-                if not student_info_pdf.empty:
-                    course = student_info_pdf.iloc[0].get("Course", "N/A")
-                    year_level = student_info_pdf.iloc[0].get("YearLevel", "N/A")
+                if student_info_pdf:
+                    course = student_info_pdf.get("Course", "N/A")
+                    year_level = student_info_pdf.get("YearLevel", "N/A")
                 else:
                     course = user_data.get("Course", "N/A")
                     year_level = user_data.get("YearLevel", "N/A")
@@ -2031,9 +1738,9 @@ def show_student_dashboard_new():
 
 # ------------------ Version Trigger Helpers ------------------ #
 def is_in_pickle_by_name(pkl_path, student_name):
-    if not os.path.exists(pkl_path):
+    if not snapshot_exists(pkl_path):
         return False
-    data = pd.read_pickle(pkl_path)
+    data = load_pkl_data(pkl_path)
     df = pd.DataFrame(data) if isinstance(data, list) else data
     if "Name" not in df.columns:
         return False
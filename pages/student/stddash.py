@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import os
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
@@ -8,6 +7,7 @@ from reportlab.lib.styles import getSampleStyleSheet
 import io
 import matplotlib.pyplot as plt
 from reportlab.platypus import Image
+from global_utils import load_pkl_data, load_student_grade_index, load_class_trend, load_subject_statistics, snapshot_exists, new_grades_cache
 # ------------------ Paths to Pickle Files ------------------ #
 student_cache = "pkl/students.pkl"
 grades_cache = "pkl/grades.pkl"
@@ -17,40 +17,33 @@ subjects_cache = "pkl/subjects.pkl"
 # ------------------ Helper Functions ------------------ #
 def get_student_info(student_name):
     """Fetch student info from pickle by student name"""
-    if not os.path.exists(student_cache):
+    if not snapshot_exists(student_cache):
         st.error("Student cache file not found.")
         st.stop()
 
-    students = pd.read_pickle(student_cache)
+    students = load_pkl_data(student_cache)
     students_df = pd.DataFrame(students) if isinstance(students, list) else students
     match = students_df[students_df["Name"] == student_name]
     return match.iloc[0].to_dict() if not match.empty else None
 
 def get_student_grades(student_id):
     """Fetch grades of a student by their student_id and join with semesters"""
-    if not os.path.exists(grades_cache) or not os.path.exists(semesters_cache):
+    if not snapshot_exists(grades_cache) or not snapshot_exists(semesters_cache):
         st.error("Grades or semesters cache file not found.")
         st.stop()
 
-    grades = pd.read_pickle(grades_cache)
-    semesters = pd.read_pickle(semesters_cache)
-
-    grades_df = pd.DataFrame(grades) if isinstance(grades, list) else grades
+    semesters = load_pkl_data(semesters_cache)
     sem_df = pd.DataFrame(semesters) if isinstance(semesters, list) else semesters
 
-    student_grades = grades_df[grades_df["StudentID"] == student_id].copy()
+    # One slice of the shared per-student index instead of a scan of every grade
+    student_grades = load_student_grade_index(grades_cache).transcript(student_id).copy()
 
     # Attach Semester + SchoolYear from semesters
     if not student_grades.empty:
-        student_grades["Semester"] = ""
-        student_grades["SchoolYear"] = ""
-
-        for idx, row in student_grades.iterrows():
-            sem_id = row.get("SemesterID")
-            match = sem_df[sem_df["_id"] == sem_id]
-            if not match.empty:
-                student_grades.at[idx, "Semester"] = match.iloc[0].get("Semester", "")
-                student_grades.at[idx, "SchoolYear"] = match.iloc[0].get("SchoolYear", "")
+        semester_info = sem_df.drop_duplicates(subset=["_id"], keep="first").set_index("_id")
+        for column in ["Semester", "SchoolYear"]:
+            values = student_grades["SemesterID"].map(semester_info[column]) if column in semester_info.columns else pd.Series(index=student_grades.index, dtype=object)
+            student_grades[column] = values.astype(object).fillna("")
     return student_grades.to_dict(orient="records")
 
 # ------------------ Self-Assessment: Data Helpers ------------------ #
@@ -110,50 +103,22 @@ def _compute_student_trend(grades_records):
     return trend
 def get_subjects():
     """Fetch subjects (with descriptions) from pickle."""
-    if not os.path.exists(subjects_cache):
+    if not snapshot_exists(subjects_cache):
         st.error("Subjects cache file not found.")
         st.stop()
 
-    subjects = pd.read_pickle(subjects_cache)
+    subjects = load_pkl_data(subjects_cache)
     subjects_df = pd.DataFrame(subjects) if isinstance(subjects, list) else subjects
     return subjects_df[["_id", "Description"]].drop_duplicates()
 def _compute_class_trend():
-    """Compute class average per semester across all students."""
-    if not os.path.exists(grades_cache) or not os.path.exists(semesters_cache):
-        return pd.DataFrame([])
-
-    all_grades = pd.read_pickle(grades_cache)
-    semesters = pd.read_pickle(semesters_cache)
-
-    grades_df = pd.DataFrame(all_grades) if isinstance(all_grades, list) else all_grades
-    sem_df = pd.DataFrame(semesters) if isinstance(semesters, list) else semesters
-
-    if grades_df.empty:
+    """Class average per semester across all students, from the shared ClassTrend."""
+    if not snapshot_exists(grades_cache) or not snapshot_exists(semesters_cache):
         return pd.DataFrame([])
 
-    # Join semester label
-    merged = grades_df.copy()
-    merged["Semester"] = ""
-    merged["SchoolYear"] = ""
-    for idx, row in merged.iterrows():
-        sem_id = row.get("SemesterID")
-        match = sem_df[sem_df["_id"] == sem_id]
-        if not match.empty:
-            merged.at[idx, "Semester"] = match.iloc[0].get("Semester", "")
-            merged.at[idx, "SchoolYear"] = match.iloc[0].get("SchoolYear", "")
-
-    merged_records = merged.to_dict(orient="records")
-    exp = _expand_subject_rows(merged_records)
-    if exp.empty:
+    # grades.pkl has no matching students snapshot, so there is no course split
+    class_trend = load_class_trend(grades_cache, semesters_path=semesters_cache).series()
+    if class_trend.empty:
         return pd.DataFrame([])
-
-    class_trend = (
-        exp.dropna(subset=["NumericGrade"]) 
-           .groupby(["SemesterID", "SemesterLabel"], dropna=False)["NumericGrade"]
-           .mean()
-           .reset_index()
-           .rename(columns={"NumericGrade": "ClassAverage"})
-    )
     return class_trend
 
 def _compute_pass_fail_summary(grades_records, pass_threshold=75):
@@ -182,26 +147,15 @@ def _compute_subject_vs_class(grades_records):
                  .rename(columns={"NumericGrade": "StudentAvg"})
     )
 
-    # Class per-subject average (across all semesters)
-    if not os.path.exists(grades_cache):
-        return stu
-
-    all_grades = pd.read_pickle(grades_cache)
-    grades_df = pd.DataFrame(all_grades) if isinstance(all_grades, list) else all_grades
-    if grades_df.empty:
+    # Class per-subject average (across all semesters), from the shared statistics table
+    if not snapshot_exists(grades_cache):
         return stu
 
-    exp_all = _expand_subject_rows(grades_df.to_dict(orient="records"))
-    if exp_all.empty:
+    cls = load_subject_statistics(grades_cache)
+    cls = cls.loc[cls["Count"] > 0, ["SubjectCode", "Mean"]].rename(columns={"Mean": "ClassAvg"})
+    if cls.empty:
         return stu
 
-    cls = (
-        exp_all.dropna(subset=["NumericGrade"]) 
-              .groupby("SubjectCode")["NumericGrade"].mean()
-              .reset_index()
-              .rename(columns={"NumericGrade": "ClassAvg"})
-    )
-
     out = pd.merge(stu, cls, on="SubjectCode", how="left")
     return out
 
@@ -256,7 +210,7 @@ def show_student_dashboard_old():
                 grouped = df.groupby(["SchoolYear", "Semester"])
                 
                 # 🔑 Load subjects with Description + Units
-                subjects_df = pd.read_pickle(subjects_cache)
+                subjects_df = load_pkl_data(subjects_cache)
                 subjects_df = pd.DataFrame(subjects_df) if isinstance(subjects_df, list) else subjects_df
                 subjects_df = subjects_df[["_id", "Description", "Units"]].drop_duplicates()
 
@@ -634,7 +588,7 @@ def show_student_dashboard_old():
 
             try:
                 # Load curriculum
-                curriculums = pd.read_pickle("pkl/curriculums.pkl")
+                curriculums = load_pkl_data("pkl/curriculums.pkl")
                 if isinstance(curriculums, pd.DataFrame):
                     curriculums = curriculums.to_dict(orient="records")
 
@@ -746,17 +700,14 @@ def show_student_dashboard_new():
 
         try:
             # --- Load grades ---
-            new_grades = pd.read_pickle("pkl/new_grades.pkl")
-            grades_df = pd.DataFrame(new_grades)
-
-            # ✅ Filter for logged-in student
-            grades_df = grades_df[grades_df["StudentID"] == int(logged_in_refid)]
+            # ✅ Logged-in student's grades (one slice of the shared per-student index)
+            grades_df = load_student_grade_index(new_grades_cache).transcript(int(logged_in_refid))
 
             if grades_df.empty:
                 st.info("No grades found for this student.")
             else:
                 # --- Load semester table ---
-                semesters = pd.read_pickle("pkl/semesters.pkl")
+                semesters = load_pkl_data("pkl/semesters.pkl")
                 semesters_df = pd.DataFrame(semesters)
 
                 # ✅ Merge semester info (SemesterID ↔ _id)
@@ -771,7 +722,7 @@ def show_student_dashboard_new():
                 grades_df = grades_df.drop(columns=["_id", "StudentID"], errors="ignore")
 
                 # --- Load curriculum subjects ---
-                curriculums = pd.read_pickle("pkl/curriculums.pkl")
+                curriculums = load_pkl_data("pkl/curriculums.pkl")
                 if isinstance(curriculums, pd.DataFrame):
                     curriculums = curriculums.to_dict(orient="records")
 
@@ -1056,17 +1007,12 @@ def show_student_dashboard_new():
             logged_in_refid = str(user_data.get("_id", "N/A"))
 
             # ✅ Load curriculum
-            curriculums = pd.read_pickle("pkl/curriculums.pkl")
+            curriculums = load_pkl_data("pkl/curriculums.pkl")
             if isinstance(curriculums, pd.DataFrame):
                 curriculums = curriculums.to_dict(orient="records")
 
-            # ✅ Load new_grades
-            new_grades_df = pd.read_pickle("pkl/new_grades.pkl")
-            if not isinstance(new_grades_df, pd.DataFrame):
-                new_grades_df = pd.DataFrame(new_grades_df)
-
-            # Optional: filter for the logged-in student
-            student_grades = new_grades_df[new_grades_df['StudentID'] == int(logged_in_refid)].copy()
+            # ✅ Logged-in student's grades (one slice of the shared per-student index)
+            student_grades = load_student_grade_index(new_grades_cache).transcript(int(logged_in_refid)).copy()
 
             # Expand SubjectCodes if they are lists
             if "SubjectCodes" in student_grades.columns and student_grades["SubjectCodes"].apply(lambda x: isinstance(x, list)).any():
@@ -0,0 +1,119 @@
+import pandas as pd
+import streamlit as st
+from data_store import get_data_store
+from global_utils import load_student_grade_index, snapshot_versions, new_grades_cache, new_students_cache, semesters_cache, curriculums_cache
+
+_SESSION_KEY = "student_context"
+
+
+def _student_id(user_data):
+    """Logged-in student's numeric id (None when the session has no valid one)"""
+    try:
+        return int(user_data.get("_id"))
+    except (TypeError, ValueError):
+        return None
+
+
+class StudentContext:
+    """
+    Everything the student dashboard shows about one student, built once per
+    login from the shared DataStore frames.
+
+    `grades` is the student's slice of the shared StudentGradeIndex,
+    `semester_grades` the same documents with the semester row attached
+    (SchoolYear, Semester, ...) and `subject_grades` one row per subject grade
+    with the curriculum subjectName / units. The tabs and their PDF
+    generators read these instead of unpickling the collections themselves.
+    """
+
+    def __init__(self, user_data):
+        store = get_data_store()
+        self.student_id = _student_id(user_data)
+        self.name = user_data.get("Name", "Unknown User")
+
+        # --- Student record ---
+        students = store.frame(new_students_cache)
+        match = students[students["_id"] == self.student_id] if "_id" in students.columns else students.iloc[0:0]
+        self.student_info = match.iloc[0].to_dict() if not match.empty else {}
+
+        # --- Transcript with semester info (SemesterID <-> _id) ---
+        grade_index = load_student_grade_index(new_grades_cache)
+        self.grades = grade_index.transcript(self.student_id) if self.student_id is not None else pd.DataFrame()
+        self.semesters = store.frame(semesters_cache)
+        self.semester_grades = (
+            self.grades.merge(self.semesters, left_on="SemesterID", right_on="_id", how="left")
+            .drop(columns=["_id", "StudentID"], errors="ignore")
+            if not self.grades.empty else self.grades
+        )
+
+        # --- Curriculum subjects, flattened across curriculums ---
+        self.curriculums = store.frame(curriculums_cache).to_dict(orient="records")
+        all_subjects = [subj for curriculum in self.curriculums for subj in curriculum.get("subjects", [])]
+        self.curriculum_subjects = (
+            pd.DataFrame(all_subjects)
+            if all_subjects
+            else pd.DataFrame(columns=["subjectCode", "subjectName", "units"])
+        )
+
+        # --- One row per subject grade, with curriculum name and units ---
+        if "SchoolYear" in self.semester_grades.columns and "Semester" in self.semester_grades.columns:
+            exploded = self.semester_grades.explode(["SubjectCodes", "Teachers", "Grades"], ignore_index=True)
+            self.subject_grades = pd.DataFrame({
+                "SchoolYear": exploded["SchoolYear"],
+                "Semester": exploded["Semester"],
+                "SemesterID": exploded["SemesterID"],
+                "section": exploded["section"] if "section" in exploded.columns else None,
+                "SubjectCode": exploded["SubjectCodes"],
+                "Teacher": exploded["Teachers"],
+                "Grade": exploded["Grades"],
+            }).merge(
+                self.curriculum_subjects[["subjectCode", "subjectName", "units"]],
+                left_on="SubjectCode",
+                right_on="subjectCode",
+                how="left"
+            ).drop(columns=["subjectCode"])
+        else:
+            self.subject_grades = pd.DataFrame(columns=["SchoolYear", "Semester", "SemesterID", "section", "SubjectCode", "Teacher", "Grade", "subjectName", "units"])
+
+        # --- Averages ---
+        all_grades = self.grades["Grades"].explode() if "Grades" in self.grades.columns else pd.Series(dtype=float)
+        self.all_grades = pd.to_numeric(all_grades, errors="coerce").dropna()
+        self.total_average = self.all_grades.mean() if not self.all_grades.empty else None
+
+        # (SchoolYear, Semester) in display order and "<SchoolYear> - <Semester>" averages
+        self.semester_order = []
+        self.semester_averages = []
+        for (sy, sem), sem_df in self.subject_grades.groupby(["SchoolYear", "Semester"]):
+            self.semester_order.append((sy, sem))
+            valid_grades = pd.to_numeric(sem_df["Grade"], errors="coerce").dropna()
+            if not valid_grades.empty:
+                self.semester_averages.append((f"{sy} - {sem}", valid_grades.mean()))
+
+        # --- Documents of the student's section in their first listed semester ---
+        if not self.grades.empty and "section" in self.grades.columns:
+            first = self.grades.iloc[0]
+            shared = grade_index.grades
+            self.section_classmates = shared[(shared["SemesterID"] == first["SemesterID"]) & (shared["section"] == first["section"])]
+        else:
+            self.section_classmates = pd.DataFrame()
+
+    @property
+    def course(self):
+        return self.student_info.get("Course", "N/A")
+
+    @property
+    def year_level(self):
+        return self.student_info.get("YearLevel", "N/A")
+
+
+def get_student_context(user_data):
+    """
+    StudentContext of the logged-in student, kept in the session and rebuilt
+    only for another student or when one of its snapshots changes.
+    """
+    key = (_student_id(user_data), user_data.get("Name"), snapshot_versions(new_grades_cache, new_students_cache, semesters_cache, curriculums_cache))
+    cached = st.session_state.get(_SESSION_KEY)
+    if cached is None or cached[0] != key:
+        cached = (key, StudentContext(user_data))
+        st.session_state[_SESSION_KEY] = cached
+    return cached[1]
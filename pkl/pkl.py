@@ -1,6 +1,12 @@
 import pymongo
-import pickle
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Allow running as `python pkl/pkl.py` from the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from snapshot_store import write_snapshot_stream, migrate_pickle, export_batch_size, snapshot_size, update_ingestion_log
 
 # MongoDB credentials
 MONGO_USERNAME = "smsgaldones"
@@ -15,7 +21,7 @@ MONGO_URI = f"mongodb+srv://{MONGO_USERNAME}:{MONGO_PASSWORD}@{MONGO_CLUSTER}.{M
 client = pymongo.MongoClient(MONGO_URI)
 db = client[DB_NAME]
 
-# Create a folder to store pickle files
+# Create a folder to store snapshot files
 output_folder = "pkl"
 os.makedirs(output_folder, exist_ok=True)
 
@@ -25,37 +31,94 @@ def run_all_collections():
 
     for collection_name in collections:
         collection = db[collection_name]
-        documents = list(collection.find({}))  # Fetch all documents
-
-        # Define pickle file path
-        file_path = os.path.join(output_folder, f"{collection_name}.pkl")
+        cursor = collection.find({}, batch_size=export_batch_size)  # Stream documents in batches
 
-        # Save to pickle
-        with open(file_path, "wb") as f:
-            pickle.dump(documents, f)
+        # Save as a columnar Parquet snapshot
+        file_path, count = write_snapshot_stream(collection_name, cursor, output_folder)
 
-        print(f"Saved {len(documents)} documents from '{collection_name}' to '{file_path}'")
+        print(f"Saved {count} documents from '{collection_name}' to '{file_path}'")
 
-    print("\n🎉 All collections have been pickled successfully!")
+    print("\n🎉 All collections have been snapshotted successfully!")
 
-def run_specific_collections(collection_name): 
+def run_specific_collections(collection_name):
     if collection_name != "":
         collection = db[collection_name]
-        documents = list(collection.find({}))  # Fetch all documents
-
-        # Define pickle file path
-        file_path = os.path.join(output_folder, f"{collection_name}.pkl")
+        cursor = collection.find({}, batch_size=export_batch_size)  # Stream documents in batches
 
-        # Save to pickle
-        with open(file_path, "wb") as f:
-            pickle.dump(documents, f)
+        # Save as a columnar Parquet snapshot
+        file_path, count = write_snapshot_stream(collection_name, cursor, output_folder)
 
-        print(f"Saved {len(documents)} documents from '{collection_name}' to '{file_path}'")
-        print("All collections have been pickled successfully!")
+        print(f"Saved {count} documents from '{collection_name}' to '{file_path}'")
+        print("All collections have been snapshotted successfully!")
     else:
         print("No Collection Name!")
 
+# Collections refreshed by the nightly full export
+nightly_collections = ["new_grades", "new_students", "new_subjects", "curriculums", "teachers", "semesters"]
+
+def export_collection(collection_name):
+    """Stream one collection to its snapshot and return its export statistics"""
+    start_time = time.time()
+    cursor = db[collection_name].find({}, batch_size=export_batch_size)
+    file_path, count = write_snapshot_stream(collection_name, cursor, output_folder)
+    return {
+        "documents": count,
+        "bytes": snapshot_size(file_path),
+        "seconds": round(time.time() - start_time, 3),
+        "file": file_path,
+    }
+
+def run_collections_parallel(collection_names=None, max_workers=4):
+    """
+    Export several collections concurrently (all of them by default) through a
+    bounded thread pool. Workers spend most of their time waiting on MongoDB or
+    in Arrow/Parquet code, so the total is close to the slowest collection.
+    Per-collection counts, bytes and timings go to cache/ingestion_log.json.
+    """
+    if collection_names is None:
+        collection_names = db.list_collection_names()
+
+    start_time = time.time()
+    stats, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(collection_names)))) as executor:
+        futures = {executor.submit(export_collection, name): name for name in collection_names}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                stats[name] = future.result()
+            except Exception as e:
+                failed[name] = str(e)
+                print(f"[{done}/{len(futures)}] Failed '{name}': {e}")
+                continue
+            result = stats[name]
+            print(f"[{done}/{len(futures)}] Saved {result['documents']} documents from '{name}' "
+                  f"to '{result['file']}' ({result['bytes']:,} bytes, {result['seconds']:.2f}s)")
+
+    total_time = time.time() - start_time
+    update_ingestion_log({
+        "export": {
+            "timestamp": time.time(),
+            "export_time_seconds": total_time,
+            "max_workers": max_workers,
+            "collections": stats,
+            "failed": failed,
+        }
+    })
+    print(f"\nExported {len(stats)} collections in {total_time:.2f}s" + (f", {len(failed)} failed" if failed else ""))
+    return stats
+
+def convert_existing_pickles():
+    """Convert legacy pkl/*.pkl files into Parquet snapshots without querying MongoDB"""
+    for file_name in sorted(os.listdir(output_folder)):
+        if not file_name.endswith(".pkl"):
+            continue
+        cache_path = os.path.join(output_folder, file_name)
+        file_path = migrate_pickle(cache_path)
+        print(f"Converted '{cache_path}' to '{file_path}'")
+
 
 if __name__ == "__main__":
     # run_all_collections()
-    run_specific_collections(collection_name = "new_grades")
\ No newline at end of file
+    # run_collections_parallel(nightly_collections)
+    # convert_existing_pickles()
+    run_specific_collections(collection_name = "new_grades")
@@ -0,0 +1,866 @@
+import os
+import json
+import time
+import logging
+import shutil
+import threading
+from collections import namedtuple
+from itertools import chain, islice
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Columnar snapshots live next to the legacy pickles: pkl/<collection>.parquet
+snapshot_folder = "pkl"
+snapshot_extension = ".parquet"
+
+# Schema metadata key listing columns that had to be stored as JSON text
+JSON_COLUMNS_KEY = b"dapas.json_columns"
+
+# Collections holding per-student/per-semester grade documents with parallel
+# SubjectCodes / Grades / Teachers arrays. Each gets a flat fact table at ingest.
+GRADE_COLLECTIONS = ("grades", "new_grades")
+facts_suffix = "_facts"
+
+# One row per (student, semester, subject) grade
+FACT_COLUMNS = ["StudentID", "SemesterID", "SubjectCode", "Grade", "GradeRemark", "Teacher", "section", "Position"]
+FACT_SCHEMA = pa.schema([
+    ("StudentID", pa.int64()),
+    ("SemesterID", pa.int64()),
+    ("SubjectCode", pa.string()),
+    ("Grade", pa.float64()),
+    ("GradeRemark", pa.string()),
+    ("Teacher", pa.string()),
+    ("section", pa.string()),
+    ("Position", pa.int32()),
+])
+
+# What one grade delta did to the fact table (see replay_fact_deltas)
+FactChange = namedtuple("FactChange", ["old", "new", "new_document"])
+
+# Documents converted per batch when streaming an export
+export_batch_size = 5000
+
+# Load/export statistics shared by the exporter and the dashboards
+ingestion_log_path = os.path.join("cache", "ingestion_log.json")
+
+
+def snapshot_path(cache_path):
+    """Map a legacy cache path (pkl/<name>.pkl) to its columnar snapshot path"""
+    root, _ = os.path.splitext(cache_path)
+    return root + snapshot_extension
+
+
+def collection_snapshot_path(collection_name, folder=snapshot_folder):
+    """Snapshot path for a MongoDB collection name"""
+    return os.path.join(folder, f"{collection_name}{snapshot_extension}")
+
+
+def facts_snapshot_path(cache_path):
+    """Map a grades cache path (pkl/new_grades.pkl) to its fact table (pkl/new_grades_facts.parquet)"""
+    root, _ = os.path.splitext(cache_path)
+    return root + facts_suffix + snapshot_extension
+
+
+def _normalize_value(value):
+    """Turn Mongo-only types (ObjectId, etc.) into plain Python values"""
+    if isinstance(value, list):
+        return [_normalize_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in value.items()}
+    if type(value).__name__ == "ObjectId":
+        return str(value)
+    return value
+
+
+def _column_to_arrow(values):
+    """
+    Build a typed Arrow array for one column.
+    Columns whose values cannot share one Arrow type (e.g. grade lists mixing
+    numbers and "INC") fall back to JSON text so they round-trip unchanged.
+    """
+    try:
+        return pa.array(values), False
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, OverflowError):
+        encoded = [None if v is None else json.dumps(v, default=str) for v in values]
+        return pa.array(encoded, type=pa.string()), True
+
+
+def documents_to_table(documents):
+    """Convert a list of Mongo documents into a typed Arrow table"""
+    columns = {}
+    for doc in documents:
+        for key in doc.keys():
+            columns.setdefault(key, None)
+
+    arrays, names, json_columns = [], [], []
+    for name in columns:
+        values = [_normalize_value(doc.get(name)) for doc in documents]
+        array, is_json = _column_to_arrow(values)
+        arrays.append(array)
+        names.append(name)
+        if is_json:
+            json_columns.append(name)
+
+    table = pa.Table.from_arrays(arrays, names=names) if names else pa.table({})
+    return table.replace_schema_metadata({JSON_COLUMNS_KEY: json.dumps(json_columns).encode()})
+
+
+def write_table(table, file_path):
+    """Write an Arrow table to disk atomically (temp file + rename)"""
+    folder = os.path.dirname(file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def write_snapshot(collection_name, documents, folder=snapshot_folder, keep_deltas=False):
+    """
+    Write a collection snapshot as Parquet and return the file path.
+    Grade collections also get their exploded fact table written next to it;
+    a full export supersedes any pending delta log unless keep_deltas is set.
+    """
+    file_path, _ = write_snapshot_stream(collection_name, documents, folder, keep_deltas=keep_deltas)
+    return file_path
+
+
+def _json_columns(schema):
+    return set(json.loads((schema.metadata or {}).get(JSON_COLUMNS_KEY, b"[]")))
+
+
+def _unified_schema(schemas):
+    """
+    Final schema for batches converted independently. Types are promoted where
+    Arrow can (int64 + double -> double); a column whose batches disagree
+    otherwise, or that needed JSON in any batch, is stored as JSON text.
+    """
+    names, types, json_columns = [], {}, set()
+    for schema in schemas:
+        json_columns |= _json_columns(schema)
+        for field in schema:
+            if field.name not in types:
+                names.append(field.name)
+                types[field.name] = []
+            types[field.name].append(field.type)
+
+    fields = []
+    for name in names:
+        if name in json_columns:
+            fields.append(pa.field(name, pa.string()))
+            continue
+        try:
+            merged = pa.unify_schemas(
+                [pa.schema([pa.field(name, t)]) for t in types[name]],
+                promote_options="permissive",
+            )
+            fields.append(merged.field(name))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            json_columns.add(name)
+            fields.append(pa.field(name, pa.string()))
+
+    metadata = {JSON_COLUMNS_KEY: json.dumps([n for n in names if n in json_columns]).encode()}
+    return pa.schema(fields, metadata=metadata)
+
+
+def _conform_table(table, schema):
+    """Cast one batch table to the unified schema, adding missing columns as nulls"""
+    batch_json = _json_columns(table.schema)
+    target_json = _json_columns(schema)
+    arrays = []
+    for field in schema:
+        if field.name not in table.column_names:
+            arrays.append(pa.nulls(table.num_rows, type=field.type))
+            continue
+        column = table.column(field.name)
+        if field.name in target_json and field.name not in batch_json:
+            encoded = [None if v is None else json.dumps(v, default=str) for v in column.to_pylist()]
+            arrays.append(pa.array(encoded, type=pa.string()))
+        else:
+            arrays.append(column.cast(field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _batches(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_snapshot_stream(collection_name, documents, folder=snapshot_folder, batch_size=export_batch_size, keep_deltas=False):
+    """
+    Write a snapshot from any iterable of documents (e.g. a Mongo cursor)
+    holding at most one batch in memory. Each batch is converted to Arrow and
+    spilled to a part file; the parts are then cast to one schema and streamed
+    into the final Parquet file, which replaces the old one atomically.
+    Returns (file_path, documents_written).
+    """
+    file_path = collection_snapshot_path(collection_name, folder)
+    parts_folder = os.path.join(folder, f".{collection_name}.parts")
+    shutil.rmtree(parts_folder, ignore_errors=True)
+    os.makedirs(parts_folder)
+
+    try:
+        part_paths, schemas, written = [], [], 0
+        for batch in _batches(documents, batch_size):
+            table = documents_to_table(batch)
+            part_path = os.path.join(parts_folder, f"{len(part_paths):06d}{snapshot_extension}")
+            pq.write_table(table, part_path)
+            part_paths.append(part_path)
+            schemas.append(table.schema)
+            written += len(batch)
+
+        tmp_path = file_path + ".tmp"
+        if not part_paths:
+            pq.write_table(documents_to_table([]), tmp_path, compression="zstd")
+        else:
+            schema = _unified_schema(schemas)
+            with pq.ParquetWriter(tmp_path, schema, compression="zstd") as writer:
+                for part_path in part_paths:
+                    writer.write_table(_conform_table(pq.read_table(part_path), schema))
+        os.replace(tmp_path, file_path)
+    finally:
+        shutil.rmtree(parts_folder, ignore_errors=True)
+
+    if collection_name in GRADE_COLLECTIONS:
+        write_grade_facts_stream(file_path, facts_snapshot_path(file_path), batch_size)
+        if not keep_deltas and os.path.exists(delta_log_path(file_path)):
+            os.remove(delta_log_path(file_path))
+    return file_path, written
+
+
+def snapshot_size(file_path):
+    """Bytes on disk for a snapshot, including its fact table if it has one"""
+    size = os.path.getsize(file_path)
+    facts_path = facts_snapshot_path(file_path)
+    if os.path.exists(facts_path):
+        size += os.path.getsize(facts_path)
+    return size
+
+
+def update_ingestion_log(entries, log_path=ingestion_log_path):
+    """Merge `entries` into the ingestion log, keeping keys written by others"""
+    log_data = {}
+    if os.path.exists(log_path):
+        try:
+            with open(log_path) as f:
+                log_data = json.load(f)
+        except (OSError, ValueError):
+            log_data = {}
+    log_data.update(entries)
+
+    folder = os.path.dirname(log_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    tmp_path = log_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(log_data, f, indent=2)
+    os.replace(tmp_path, log_path)
+    return log_data
+
+
+def table_to_dataframe(table):
+    """
+    Convert a snapshot table into a DataFrame.
+    Scalar columns keep their Arrow types; list/struct columns come back as
+    Python lists/dicts so existing code that checks isinstance(x, list) keeps working.
+    """
+    metadata = table.schema.metadata or {}
+    json_columns = json.loads(metadata.get(JSON_COLUMNS_KEY, b"[]"))
+    nested_columns = [
+        field.name for field in table.schema
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type) or pa.types.is_struct(field.type)
+    ]
+
+    df = table.drop_columns(nested_columns).to_pandas()
+    for name in nested_columns:
+        df[name] = table.column(name).to_pylist()
+    for name in json_columns:
+        df[name] = df[name].map(json.loads, na_action="ignore")
+
+    # Keep the original document column order
+    return df[table.column_names]
+
+
+def read_snapshot(file_path, columns=None):
+    """Read a Parquet snapshot into a DataFrame"""
+    table = pq.read_table(file_path, columns=columns)
+    return table_to_dataframe(table)
+
+
+def migrate_pickle(cache_path):
+    """Convert an existing legacy pickle (list of documents) into a Parquet snapshot"""
+    documents = pd.read_pickle(cache_path)
+    if isinstance(documents, pd.DataFrame):
+        documents = documents.to_dict("records")
+    collection_name = os.path.splitext(os.path.basename(cache_path))[0]
+    return write_snapshot(collection_name, documents, os.path.dirname(cache_path))
+
+
+# ------------------ Grade fact table ------------------ #
+def _as_list(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return list(value)
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [value]
+
+
+def build_grade_facts(grades_df):
+    """
+    Explode the parallel SubjectCodes / Grades / Teachers arrays of a grades
+    DataFrame into one row per subject grade.
+
+    Grade holds the numeric grade (NaN when missing or non-numeric) and
+    GradeRemark keeps non-numeric entries such as "INC" or "Dropped".
+    Position is the index of the subject inside the source document arrays.
+    """
+    if grades_df is None or grades_df.empty or "SubjectCodes" not in grades_df.columns:
+        return pd.DataFrame({
+            "StudentID": pd.Series(dtype="int64"),
+            "SemesterID": pd.Series(dtype="int64"),
+            "SubjectCode": pd.Series(dtype=object),
+            "Grade": pd.Series(dtype="float64"),
+            "GradeRemark": pd.Series(dtype=object),
+            "Teacher": pd.Series(dtype=object),
+            "section": pd.Series(dtype=object),
+            "Position": pd.Series(dtype="int32"),
+        })
+
+    subject_lists = [_as_list(v) for v in grades_df["SubjectCodes"]]
+    lengths = np.fromiter((len(v) for v in subject_lists), dtype=np.int64, count=len(subject_lists))
+    total = int(lengths.sum())
+
+    def aligned(column):
+        # Pad/truncate each document's array to its SubjectCodes length
+        if column not in grades_df.columns:
+            return [None] * total
+        out = []
+        for values, n in zip(grades_df[column], lengths):
+            values = _as_list(values)[:n]
+            out.extend(values + [None] * (n - len(values)))
+        return out
+
+    parent = np.repeat(np.arange(len(grades_df)), lengths)
+    offsets = np.cumsum(lengths) - lengths
+    position = (np.arange(total) - np.repeat(offsets, lengths)).astype("int32")
+
+    raw_grades = pd.Series(aligned("Grades"), dtype=object)
+    numeric = pd.to_numeric(raw_grades, errors="coerce").astype("float64")
+    remark = raw_grades.where(numeric.isna() & raw_grades.notna()).map(str, na_action="ignore")
+
+    def per_document(column, default):
+        if column not in grades_df.columns:
+            return np.full(total, default, dtype=object)
+        return grades_df[column].to_numpy()[parent]
+
+    section = per_document("section", "")
+    section = np.where(pd.isna(section), "", section)
+
+    facts = pd.DataFrame({
+        "StudentID": pd.to_numeric(per_document("StudentID", None), errors="coerce"),
+        "SemesterID": pd.to_numeric(per_document("SemesterID", None), errors="coerce"),
+        "SubjectCode": pd.Series(list(chain.from_iterable(subject_lists)), dtype=object),
+        "Grade": numeric,
+        "GradeRemark": remark.astype(object),
+        "Teacher": pd.Series(aligned("Teachers"), dtype=object),
+        "section": section.astype(object),
+        "Position": position,
+    })
+    return facts[FACT_COLUMNS]
+
+
+def _facts_to_table(facts):
+    facts = facts.copy()
+    for column in ("SubjectCode", "GradeRemark", "Teacher", "section"):
+        facts[column] = facts[column].map(str, na_action="ignore").astype(object)
+    return pa.Table.from_pandas(facts, schema=FACT_SCHEMA, preserve_index=False)
+
+
+def write_grade_facts_stream(snapshot_file, file_path, batch_size=export_batch_size):
+    """Build the fact table from a grades snapshot one record batch at a time"""
+    parquet_file = pq.ParquetFile(snapshot_file)
+    schema = parquet_file.schema_arrow
+    tmp_path = file_path + ".tmp"
+    with pq.ParquetWriter(tmp_path, FACT_SCHEMA, compression="zstd") as writer:
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            table = pa.Table.from_batches([batch]).replace_schema_metadata(schema.metadata)
+            writer.write_table(_facts_to_table(build_grade_facts(table_to_dataframe(table))))
+    os.replace(tmp_path, file_path)
+    return file_path
+
+
+def read_grade_facts(file_path):
+    """Read a persisted grade fact table"""
+    return pq.read_table(file_path).to_pandas()
+
+
+def grade_values(facts):
+    """
+    Rebuild the original grade values (int/float or remark text) from the
+    typed Grade / GradeRemark columns, for views that display raw grades.
+    """
+    numeric = facts["Grade"]
+    values = numeric.astype(object)
+    integral = numeric.notna() & (numeric % 1 == 0)
+    values[integral] = numeric[integral].astype("int64").astype(object)
+    has_remark = facts["GradeRemark"].notna()
+    values[has_remark] = facts.loc[has_remark, "GradeRemark"]
+    return values
+
+
+def read_collection(cache_path):
+    """
+    Read a collection by its cache path without any Streamlit caching:
+    Parquet snapshot if present, else the legacy pickle, else an empty frame.
+    """
+    parquet_path = snapshot_path(cache_path)
+    if os.path.exists(parquet_path):
+        df = read_snapshot(parquet_path)
+    elif os.path.exists(cache_path):
+        data = pd.read_pickle(cache_path)
+        df = pd.DataFrame(data) if isinstance(data, list) else data
+    else:
+        df = pd.DataFrame()
+    if is_grade_collection(cache_path):
+        df = apply_grade_deltas(df, read_grade_deltas(cache_path))
+    return df
+
+
+def read_collection_facts(cache_path):
+    """Grade fact table for a grades cache path, built on the fly if not persisted"""
+    facts_path = facts_snapshot_path(cache_path)
+    if os.path.exists(facts_path):
+        return apply_fact_deltas(read_grade_facts(facts_path), read_grade_deltas(cache_path))
+    return build_grade_facts(read_collection(cache_path))
+
+
+# ------------------ Shared dictionaries ------------------ #
+# Dimension columns are dictionary-encoded as pandas Categoricals. Every frame
+# encoding the same dimension uses one process-wide dictionary, so equal
+# values have equal codes across frames and filters/groupbys compare ints.
+DIMENSIONS = {
+    "Teacher": "teacher",
+    "SubjectCode": "subject",
+    "section": "section",
+    "Course": "course",
+    "Semester": "semester",
+}
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+
+def dimension_dtype(dimension, values=()):
+    """
+    CategoricalDtype of a shared dictionary, grown to include `values`.
+    New values are appended, so codes already handed out never change.
+    """
+    with _dictionaries_lock:
+        dtype = _dictionaries.get(dimension)
+        known = dtype.categories if dtype is not None else pd.Index([], dtype=object)
+        new_values = pd.Index(pd.unique(pd.Series(values, dtype=object).dropna())).difference(known, sort=False)
+        if dtype is None or len(new_values):
+            dtype = pd.CategoricalDtype(known.append(new_values.astype(object)), ordered=False)
+            _dictionaries[dimension] = dtype
+        return dtype
+
+
+def encode_dimensions(df, columns=None):
+    """Dictionary-encode the dimension columns of a frame with the shared dictionaries"""
+    columns = [c for c in (columns or DIMENSIONS) if c in df.columns and c in DIMENSIONS]
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for column in columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        if values.dtype == object:
+            if values.map(lambda v: isinstance(v, (list, dict, np.ndarray))).any():
+                continue
+            values = values.map(str, na_action="ignore")
+        df[column] = values.astype(dimension_dtype(DIMENSIONS[column], values.unique()))
+    return df
+
+
+def decode_dimensions(df):
+    """
+    Turn Categorical columns back into plain strings. Used where frames leave
+    the encoded paths for code that concatenates, sorts lexically or groups
+    without observed=True.
+    """
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    df = df.copy(deep=False)
+    for column in categorical:
+        df[column] = df[column].astype(object)
+    return df
+
+
+def _version_paths(cache_path):
+    log_path = delta_log_path(cache_path)
+    return (
+        snapshot_path(cache_path),
+        facts_snapshot_path(cache_path),
+        log_path,
+        log_path + compacting_suffix,
+        cache_path,
+    )
+
+
+def snapshot_version(cache_path):
+    """
+    Version of a collection snapshot: the (mtime_ns, size) signature of every
+    file backing it (Parquet base, fact table, delta logs, legacy pickle).
+    Writes are atomic replaces or appends, so the version changes exactly
+    when the snapshot content does.
+    """
+    version = []
+    for path in _version_paths(cache_path):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+def is_grade_collection(cache_path):
+    return os.path.splitext(os.path.basename(cache_path))[0] in GRADE_COLLECTIONS
+
+
+# ------------------ Incremental grade updates ------------------ #
+# Grade saves append one JSON line to pkl/<collection>.delta.jsonl instead of
+# re-exporting the whole collection. Readers replay the log on top of the
+# Parquet snapshot and compact_grade_deltas() folds it back in.
+delta_log_suffix = ".delta.jsonl"
+compacting_suffix = ".compacting"
+compaction_lock_suffix = ".lock"
+delta_compaction_threshold = 200
+# Seconds after which a leftover compaction lock file is considered stale
+compaction_lock_timeout = 600
+_compaction_lock = threading.Lock()
+
+
+def delta_log_path(cache_path):
+    """Delta log for a grades cache path (pkl/new_grades.pkl -> pkl/new_grades.delta.jsonl)"""
+    root, _ = os.path.splitext(cache_path)
+    return root + delta_log_suffix
+
+
+def grade_delta(student_id, semester_id, subject_code, grade, teacher):
+    """A single grade upsert, mirroring save_new_student_grades"""
+    return {
+        "StudentID": student_id,
+        "SemesterID": semester_id,
+        "SubjectCode": subject_code,
+        "Grade": grade,
+        "Teacher": teacher,
+        "timestamp": time.time(),
+    }
+
+
+def append_grade_delta(cache_path, delta):
+    """Append one delta to the log (O(1), no snapshot rewrite); see append_grade_deltas"""
+    return append_grade_deltas(cache_path, [delta])
+
+
+def append_grade_deltas(cache_path, deltas):
+    """
+    Append a batch of deltas to the log with a single write.
+
+    Returns (version before, version after) of the snapshot when this write
+    was its only change, so in-memory copies at the first version can be
+    patched to the second. Returns None when nothing was written or another
+    writer / a compaction changed the snapshot meanwhile.
+    """
+    if not deltas:
+        return None
+    log_path = delta_log_path(cache_path)
+    folder = os.path.dirname(log_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    payload = "".join(json.dumps(delta, default=str) + "\n" for delta in deltas).encode("utf-8")
+    before = snapshot_version(cache_path)
+    with open(log_path, "ab") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    after = snapshot_version(cache_path)
+
+    # Only the delta log may have changed, and by exactly this payload
+    log = _version_paths(cache_path).index(log_path)
+    log_before, log_after = before[log], after[log]
+    only_this_write = (
+        before[:log] + before[log + 1:] == after[:log] + after[log + 1:]
+        and log_after is not None
+        and log_after[1] == (log_before[1] if log_before else 0) + len(payload)
+    )
+    return (before, after) if only_this_write else None
+
+
+def _read_delta_file(path):
+    if not os.path.exists(path):
+        return []
+    deltas = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                deltas.append(json.loads(line))
+    return deltas
+
+
+def read_grade_deltas(cache_path):
+    """Pending deltas in write order (a log being compacted comes first)"""
+    log_path = delta_log_path(cache_path)
+    return _read_delta_file(log_path + compacting_suffix) + _read_delta_file(log_path)
+
+
+def grade_delta_count(cache_path):
+    """Number of deltas waiting in the active log"""
+    log_path = delta_log_path(cache_path)
+    if not os.path.exists(log_path):
+        return 0
+    with open(log_path, encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _upsert_subject(codes, grades, teachers, delta):
+    """Same rules as the Mongo update: overwrite the subject if present, else push it"""
+    subject_code = delta["SubjectCode"]
+    if subject_code in codes:
+        index = codes.index(subject_code)
+        while len(grades) <= index:
+            grades.append(None)
+        while len(teachers) <= index:
+            teachers.append(None)
+        grades[index] = delta["Grade"]
+        teachers[index] = delta["Teacher"]
+    else:
+        codes.append(subject_code)
+        grades.append(delta["Grade"])
+        teachers.append(delta["Teacher"])
+
+
+def apply_grade_deltas(grades_df, deltas):
+    """Replay grade deltas on a raw grades frame (one document per student/semester)"""
+    if not deltas:
+        return grades_df
+
+    docs = grades_df.copy()
+    for column in ("StudentID", "SemesterID", "SubjectCodes", "Grades", "Teachers"):
+        if column not in docs.columns:
+            docs[column] = pd.Series([None] * len(docs), dtype=object)
+
+    student_ids = docs["StudentID"].to_numpy()
+    semester_ids = docs["SemesterID"].to_numpy()
+    arrays = {
+        column: docs[column].to_numpy(dtype=object, copy=True)
+        for column in ("SubjectCodes", "Grades", "Teachers")
+    }
+    new_docs = {}
+
+    for delta in deltas:
+        key = (delta["StudentID"], delta["SemesterID"])
+        rows = np.flatnonzero((student_ids == key[0]) & (semester_ids == key[1]))
+        if len(rows):
+            row = rows[0]
+            codes, grades, teachers = (_as_list(arrays[column][row]) for column in ("SubjectCodes", "Grades", "Teachers"))
+            _upsert_subject(codes, grades, teachers, delta)
+            arrays["SubjectCodes"][row], arrays["Grades"][row], arrays["Teachers"][row] = codes, grades, teachers
+        else:
+            doc = new_docs.setdefault(key, {
+                "StudentID": key[0], "SemesterID": key[1],
+                "SubjectCodes": [], "Grades": [], "Teachers": [],
+            })
+            _upsert_subject(doc["SubjectCodes"], doc["Grades"], doc["Teachers"], delta)
+
+    for column, values in arrays.items():
+        docs[column] = values
+    if new_docs:
+        docs = pd.concat([docs, pd.DataFrame(list(new_docs.values()))], ignore_index=True)
+    return docs
+
+
+def apply_fact_deltas(facts, deltas):
+    """Replay grade deltas on a grade fact table"""
+    return replay_fact_deltas(facts, deltas)[0]
+
+
+def replay_fact_deltas(facts, deltas):
+    """
+    Replay grade deltas on a grade fact table and report what each one did.
+
+    Returns (patched facts, changes): one FactChange per delta, in order.
+    `old` is the fact row the delta overwrote (None when it added a subject),
+    `new` the row it wrote; both are dicts keyed by FACT_COLUMNS.
+    `new_document` is True when the delta opened a (student, semester)
+    document the table had no rows for.
+    """
+    if not deltas:
+        return facts, []
+
+    facts = facts.copy()
+    student_ids = facts["StudentID"].to_numpy()
+    semester_ids = facts["SemesterID"].to_numpy()
+    subject_codes = facts["SubjectCode"].to_numpy()
+    grade = facts["Grade"].to_numpy(dtype="float64", copy=True)
+    remark = facts["GradeRemark"].to_numpy(dtype=object, copy=True)
+    teacher = facts["Teacher"].to_numpy(dtype=object, copy=True)
+    section = facts["section"].to_numpy(dtype=object)
+    position = facts["Position"].to_numpy()
+    new_rows = {}
+    changes = []
+
+    def existing_row(row):
+        return {
+            "StudentID": student_ids[row],
+            "SemesterID": semester_ids[row],
+            "SubjectCode": subject_codes[row],
+            "Grade": grade[row],
+            "GradeRemark": remark[row],
+            "Teacher": teacher[row],
+            "section": section[row],
+            "Position": position[row],
+        }
+
+    for delta in deltas:
+        numeric = pd.to_numeric(pd.Series([delta["Grade"]], dtype=object), errors="coerce").iloc[0]
+        grade_remark = None if pd.notna(numeric) or delta["Grade"] is None else str(delta["Grade"])
+        key = (delta["StudentID"], delta["SemesterID"], delta["SubjectCode"])
+
+        doc_mask = (student_ids == key[0]) & (semester_ids == key[1])
+        rows = np.flatnonzero(doc_mask & (subject_codes == key[2]))
+        if len(rows):
+            old = existing_row(rows[0])
+            grade[rows[0]] = numeric
+            remark[rows[0]] = grade_remark
+            teacher[rows[0]] = delta["Teacher"]
+            changes.append(FactChange(old, existing_row(rows[0]), False))
+        elif key in new_rows:
+            old = dict(new_rows[key])
+            new_rows[key].update({"Grade": numeric, "GradeRemark": grade_remark, "Teacher": delta["Teacher"]})
+            changes.append(FactChange(old, dict(new_rows[key]), False))
+        else:
+            doc_rows = np.flatnonzero(doc_mask)
+            pending = sum(1 for k in new_rows if k[:2] == key[:2])
+            new_rows[key] = {
+                "StudentID": key[0],
+                "SemesterID": key[1],
+                "SubjectCode": key[2],
+                "Grade": numeric,
+                "GradeRemark": grade_remark,
+                "Teacher": delta["Teacher"],
+                "section": section[doc_rows[0]] if len(doc_rows) else "",
+                "Position": len(doc_rows) + pending,
+            }
+            changes.append(FactChange(None, dict(new_rows[key]), not len(doc_rows) and not pending))
+
+    facts["Grade"] = grade
+    facts["GradeRemark"] = remark
+    facts["Teacher"] = teacher
+    if new_rows:
+        added = pd.DataFrame(list(new_rows.values()))[FACT_COLUMNS].astype({"Grade": "float64", "Position": "int32"})
+        facts = pd.concat([facts, added], ignore_index=True)
+    return facts, changes
+
+
+def _clean_document(doc):
+    # DataFrame rows carry NaN for fields a document did not have
+    return {k: v for k, v in doc.items() if not (isinstance(v, float) and np.isnan(v))}
+
+
+def _acquire_compaction_lock(lock_path):
+    """
+    Take the cross-process compaction lock file (created with O_EXCL).
+    A lock file older than compaction_lock_timeout belongs to a compaction
+    that died and is taken over. False when another compaction holds it.
+    """
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < compaction_lock_timeout:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def compact_grade_deltas(cache_path):
+    """
+    Fold the delta log into the Parquet snapshot (and fact table) and drop it.
+    The active log is renamed first so saves arriving meanwhile start a new log.
+    Only one compaction runs at a time (a thread lock within the process, a
+    lock file next to the log across processes); a call that finds one
+    running returns 0 and leaves the work to it.
+    """
+    log_path = delta_log_path(cache_path)
+    compacting_path = log_path + compacting_suffix
+    lock_path = log_path + compaction_lock_suffix
+    if not _compaction_lock.acquire(blocking=False):
+        return 0
+    try:
+        if not _acquire_compaction_lock(lock_path):
+            return 0
+        try:
+            if os.path.exists(log_path) and not os.path.exists(compacting_path):
+                os.replace(log_path, compacting_path)
+            if not os.path.exists(compacting_path):
+                return 0
+            deltas = _read_delta_file(compacting_path)
+
+            base = read_snapshot(snapshot_path(cache_path)) if os.path.exists(snapshot_path(cache_path)) else pd.DataFrame()
+            patched = apply_grade_deltas(base, deltas)
+            collection_name = os.path.splitext(os.path.basename(cache_path))[0]
+            documents = [_clean_document(doc) for doc in patched.to_dict("records")]
+            write_snapshot(collection_name, documents, os.path.dirname(cache_path), keep_deltas=True)
+            try:
+                os.remove(compacting_path)
+            except FileNotFoundError:
+                # Already folded in (e.g. by a full export in the meantime)
+                pass
+            return len(deltas)
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    finally:
+        _compaction_lock.release()
+
+
+def _compact_in_background(cache_path):
+    try:
+        compacted = compact_grade_deltas(cache_path)
+        if compacted:
+            logger.info("Compacted %d grade deltas into '%s'", compacted, snapshot_path(cache_path))
+    except Exception:
+        logger.exception("Grade delta compaction failed for '%s'", cache_path)
+
+
+def compact_grade_deltas_async(cache_path):
+    """
+    Start compact_grade_deltas() on a background thread, so the save that
+    crossed delta_compaction_threshold does not pay for rewriting the
+    collection. Does nothing while a compaction is already running.
+    """
+    if _compaction_lock.locked():
+        return None
+    thread = threading.Thread(target=_compact_in_background, args=(cache_path,), name="grade-delta-compaction", daemon=True)
+    thread.start()
+    return thread
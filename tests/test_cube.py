@@ -0,0 +1,99 @@
+import unittest
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from analytics.cube import CELL_GRAIN, GradeCube
+from dimensions import DimensionTable
+from snapshot_store import build_grade_facts, replay_fact_deltas, grade_delta
+from tests.test_grade_deltas import grade_documents, grade_changes
+
+# Student 3 (added by grade_changes) is not in the students dimension
+STUDENTS = DimensionTable(pd.DataFrame([
+    {"_id": 1, "Course": "BSCS", "YearLevel": [2]},
+    {"_id": 2, "Course": "BSIT", "YearLevel": 1},
+]))
+SEMESTERS = pd.DataFrame([
+    {"_id": 10, "SchoolYear": 2023, "Semester": "FirstSem"},
+    {"_id": 11, "SchoolYear": 2023, "Semester": "SecondSem"},
+])
+TEACHER_NAMES = {"T1": "Ada", "T2": "Grace"}
+
+
+def cube(facts, passing_grade=80):
+    return GradeCube(facts, STUDENTS, SEMESTERS, TEACHER_NAMES, passing_grade)
+
+
+def cell(cube, **where):
+    """The single cube cell matching `where`, as a dict"""
+    cells = cube.slice(where)
+    assert len(cells) == 1, cells
+    return cells.iloc[0].to_dict()
+
+
+def sorted_cells(cube):
+    cells = cube.cells.astype({"SemesterID": "int64"})
+    cells["YearLevel"] = pd.to_numeric(cells["YearLevel"]).astype("float64")
+    for column in ("Course", "SubjectCode", "Teacher", "section"):
+        cells[column] = cells[column].astype(object).where(cells[column].notna(), None)
+    return cells.sort_values(CELL_GRAIN, key=lambda column: column.astype(str), ignore_index=True)
+
+
+class GradeCubeTest(unittest.TestCase):
+    def setUp(self):
+        self.facts = build_grade_facts(grade_documents())
+
+    def test_cells(self):
+        grades = cube(self.facts)
+        measures = ["Records", "Count", "Sum", "Pass", "Fail", "Incomplete"]
+        bscs = cell(grades, SemesterID=10, SubjectCode="MATH1", Course="BSCS")
+        self.assertEqual([bscs[m] for m in measures], [1, 1, 85, 1, 0, 0])
+        self.assertEqual((bscs["Teacher"], bscs["YearLevel"], bscs["Semester"]), ("Ada", 2, "FirstSem"))
+        bsit = cell(grades, SemesterID=10, SubjectCode="MATH1", Course="BSIT")
+        self.assertEqual([bsit[m] for m in measures], [1, 0, 0, 0, 0, 1])
+        self.assertEqual(cell(grades, SemesterID=11, SubjectCode="SCI1")["Teacher"], "T3")
+        self.assertEqual(cell(grades, SemesterID=11, SubjectCode="SCI1")["Incomplete"], 1)
+        self.assertEqual(cell(grades, SemesterID=11, SubjectCode="MATH2")["Fail"], 1)
+
+    def test_query_matches_the_facts(self):
+        by_semester = cube(self.facts).query(by="SemesterID").set_index("SemesterID")
+        graded = self.facts[self.facts["Grade"].notna()]
+        for semester_id, grades in graded.groupby("SemesterID")["Grade"]:
+            with self.subTest(semester_id=semester_id):
+                self.assertEqual(by_semester.loc[semester_id, "Count"], len(grades))
+                self.assertAlmostEqual(by_semester.loc[semester_id, "Mean"], grades.mean())
+                self.assertAlmostEqual(by_semester.loc[semester_id, "Std"], grades.std(ddof=0))
+
+        total = cube(self.facts).query(where={"Course": ["BSCS", "BSIT"]}, measures=["Records", "Incomplete"])
+        self.assertEqual(total[["Records", "Incomplete"]].iloc[0].tolist(), [6, 2])
+
+    def test_updated_matches_a_rebuild(self):
+        facts, changes = replay_fact_deltas(self.facts, grade_changes())
+        assert_frame_equal(sorted_cells(cube(self.facts).updated(changes)), sorted_cells(cube(facts)))
+
+    def test_updates_in_batches_match_a_rebuild(self):
+        deltas = grade_changes() + [
+            grade_delta(1, 11, "MATH2", 90, "T2"),       # moves the grade to another teacher's cell
+            grade_delta(2, 10, "MATH1", "Dropped", "T1"),
+        ]
+        facts, updated = self.facts, cube(self.facts)
+        for start in range(0, len(deltas), 3):
+            facts, changes = replay_fact_deltas(facts, deltas[start:start + 3])
+            updated = updated.updated(changes)
+        assert_frame_equal(sorted_cells(updated), sorted_cells(cube(facts)))
+        self.assertEqual(updated.query(by="Teacher", where={"Teacher": "Grace"})["Pass"].tolist(), [2])
+
+    def test_updated_drops_empty_cells_and_keeps_the_original(self):
+        original = cube(self.facts)
+        cells = original.cells.copy()
+        _, changes = replay_fact_deltas(self.facts, [grade_delta(2, 10, "MATH1", 80, "T5")])
+        updated = original.updated(changes)
+
+        assert_frame_equal(original.cells, cells)
+        teachers = updated.slice({"SemesterID": 10, "SubjectCode": "MATH1", "Course": "BSIT"})["Teacher"]
+        self.assertEqual(teachers.tolist(), ["T5"])
+        self.assertEqual(len(updated), len(original))
+        self.assertTrue(np.isnan(cube(self.facts.iloc[:0]).query()["Mean"].iloc[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from analytics.enrollment import ENROLLMENT_DIMENSIONS, EnrollmentCube
+from dimensions import DimensionTable
+from pages.Registrar.registrar_data_helper import _unless_new_document
+from snapshot_store import apply_grade_deltas, build_grade_facts, replay_fact_deltas, grade_delta
+from tests.test_grade_deltas import grade_documents, grade_changes
+
+STUDENTS = DimensionTable(pd.DataFrame([
+    {"_id": 1, "Course": "BSCS", "YearLevel": [2]},
+    {"_id": 2, "Course": "BSIT", "YearLevel": 1},
+    {"_id": 3, "Course": "BSCS", "YearLevel": 1},
+    {"_id": 4, "Course": None, "YearLevel": 1},
+]))
+SEMESTERS = pd.DataFrame([
+    {"_id": 10, "SchoolYear": 2023, "Semester": "FirstSem"},
+    {"_id": 11, "SchoolYear": 2023, "Semester": "SecondSem"},
+])
+
+
+def enrollment(documents):
+    return EnrollmentCube(documents, STUDENTS, SEMESTERS)
+
+
+def expected_counts(documents, by):
+    """Distinct (student, semester) enrollments per `by`, counted the slow way"""
+    rows = []
+    for student_id, semester_id in documents[["StudentID", "SemesterID"]].drop_duplicates().itertuples(index=False):
+        student = STUDENTS.keys_for([student_id])
+        semester = SEMESTERS[SEMESTERS["_id"] == semester_id]
+        course = STUDENTS.take("Course", student)[0]
+        if semester.empty or pd.isna(course):
+            continue
+        year_level = STUDENTS.take("YearLevel", student)[0]
+        rows.append({
+            "SchoolYear": semester["SchoolYear"].iloc[0],
+            "Semester": semester["Semester"].iloc[0],
+            "Course": course,
+            "YearLevel": year_level[0] if isinstance(year_level, list) else year_level,
+        })
+    return pd.DataFrame(rows).groupby(by).size().rename("Count").to_dict()
+
+
+class EnrollmentCubeTest(unittest.TestCase):
+    def setUp(self):
+        extra = pd.DataFrame([
+            {"StudentID": 1, "SemesterID": 11, "section": "B", "SubjectCodes": ["X"], "Grades": [90], "Teachers": ["T1"]},  # same student-semester twice
+            {"StudentID": 4, "SemesterID": 10, "section": "A", "SubjectCodes": ["X"], "Grades": [90], "Teachers": ["T1"]},  # no course
+            {"StudentID": 2, "SemesterID": 12, "section": "A", "SubjectCodes": ["X"], "Grades": [90], "Teachers": ["T1"]},  # unknown semester
+        ])
+        self.documents = pd.concat([grade_documents(), extra], ignore_index=True)
+
+    def test_rollups_match_a_direct_count(self):
+        cube = enrollment(self.documents)
+        for by in (["Semester"], ["Course"], ["SchoolYear", "Semester", "Course"], ENROLLMENT_DIMENSIONS):
+            with self.subTest(by=by):
+                rollup = cube.rollup(by)
+                counts = dict(zip(rollup[by].itertuples(index=False, name=None), rollup["Count"]))
+                expected = {key if isinstance(key, tuple) else (key,): count for key, count in expected_counts(self.documents, by).items()}
+                self.assertEqual(counts, expected)
+        self.assertEqual(cube.rollup("Semester", course="BSIT")["Count"].tolist(), [1])
+
+    def test_distinct_students(self):
+        cube = enrollment(self.documents)
+        self.assertEqual(cube.distinct_students(), 3)
+        self.assertEqual(cube.distinct_students("BSCS"), 1)
+        self.assertEqual(cube.distinct_students("BSIT"), 1)
+        self.assertEqual(cube.distinct_students("BSN"), 0)
+
+    def test_kept_through_saves_that_open_no_document(self):
+        cube = enrollment(self.documents)
+        deltas = [grade_delta(1, 10, "MATH1", 88, "T1"), grade_delta(2, 10, "PE1", "INC", "T4")]
+        _, changes = replay_fact_deltas(build_grade_facts(self.documents), deltas)
+        self.assertIs(_unless_new_document(cube, changes), cube)
+        assert_frame_equal(cube.cells, enrollment(apply_grade_deltas(self.documents, deltas)).cells)
+
+    def test_rebuilt_after_a_save_that_opens_a_document(self):
+        cube = enrollment(self.documents)
+        _, changes = replay_fact_deltas(build_grade_facts(self.documents), grade_changes())
+        self.assertIsNone(_unless_new_document(cube, changes))
+        rebuilt = enrollment(apply_grade_deltas(self.documents, grade_changes()))
+        self.assertEqual(rebuilt.distinct_students("BSCS"), 2)
+        self.assertEqual(rebuilt.rollup("Semester")["Count"].sum(), cube.rollup("Semester")["Count"].sum() + 1)
+
+    def test_no_grades(self):
+        cube = enrollment(self.documents.iloc[:0])
+        self.assertTrue(cube.cells.empty)
+        self.assertEqual(cube.distinct_students(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
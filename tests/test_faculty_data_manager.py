@@ -0,0 +1,191 @@
+import copy
+import unittest
+from unittest import mock
+import pandas as pd
+from pymongo.errors import BulkWriteError
+import pages.Faculty.faculty_data_manager as faculty_data_manager
+from snapshot_store import apply_grade_deltas, grade_delta
+
+MISSING = object()
+
+
+def evaluate(expression, doc, variables):
+    """The aggregation operators used by _grade_upsert_operation, with MongoDB semantics"""
+    if isinstance(expression, str) and expression.startswith("$$"):
+        return variables[expression[2:]]
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:], MISSING)
+    if isinstance(expression, list):
+        return [evaluate(item, doc, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+
+    (operator, args), = expression.items()
+    if operator == "$literal":
+        return args
+    if operator == "$map":
+        values = evaluate(args["input"], doc, variables)
+        out = [evaluate(args["in"], doc, {**variables, args["as"]: value}) for value in values]
+        return [None if value is MISSING else value for value in out]
+
+    values = evaluate(args, doc, variables)
+    if operator == "$ifNull":
+        return values[1] if values[0] is None or values[0] is MISSING else values[0]
+    if operator == "$indexOfArray":
+        return values[0].index(values[1]) if values[1] in values[0] else -1
+    if operator == "$cond":
+        return values[1] if values[0] else values[2]
+    if operator == "$size":
+        return len(values)
+    if operator == "$arrayElemAt":
+        return values[0][values[1]] if 0 <= values[1] < len(values[0]) else MISSING
+    operators = {
+        "$gte": lambda a, b: a >= b,
+        "$eq": lambda a, b: a == b,
+        "$max": lambda *v: max(v),
+        "$add": lambda *v: sum(v),
+        "$range": lambda start, end: list(range(start, end)),
+        "$concatArrays": lambda *arrays: [value for array in arrays for value in array],
+    }
+    return operators[operator](*values)
+
+
+def run_upsert(documents, operation):
+    """Apply an upsert UpdateOne with a pipeline to a list of documents"""
+    match = next((doc for doc in documents if all(doc.get(k) == v for k, v in operation._filter.items())), None)
+    if match is None:
+        match = dict(operation._filter)
+        documents.append(match)
+    for stage in operation._doc:
+        if "$set" in stage:
+            match.update({field: evaluate(expression, match, {}) for field, expression in stage["$set"].items()})
+        else:
+            match.pop(stage["$unset"], None)
+    return documents
+
+
+class FakeCollection:
+    def __init__(self, documents=(), fail_at=None, write_concern_error=False):
+        self.documents = copy.deepcopy(list(documents))
+        self.fail_at = fail_at
+        self.write_concern_error = write_concern_error
+
+    def bulk_write(self, operations, ordered):
+        for index, operation in enumerate(operations):
+            if index == self.fail_at:
+                raise BulkWriteError({"writeErrors": [{"index": index, "errmsg": "boom"}], "writeConcernErrors": []})
+            run_upsert(self.documents, operation)
+        if self.write_concern_error:
+            raise BulkWriteError({"writeErrors": [], "writeConcernErrors": [{"errmsg": "waiting for replication timed out"}]})
+        return mock.Mock(upserted_count=0, modified_count=len(operations))
+
+
+STORED = [
+    {"StudentID": 1, "SemesterID": 10, "SubjectCodes": ["MATH1", "ENG1", "SCI1"], "Grades": [85], "Teachers": ["T1", "T2"]},
+    {"StudentID": 2, "SemesterID": 10, "SubjectCodes": ["MATH1"], "Grades": [70], "Teachers": ["T1"]},
+]
+
+ENTRIES = [
+    {"StudentID": 1, "SemesterID": 10, "SubjectCode": " SCI1 ", "Grade": 91, "Teacher": " T3 "},   # past the end of Grades
+    {"StudentID": 2, "SemesterID": 10, "SubjectCode": "MATH1", "Grade": 78, "Teacher": "T1"},
+    {"StudentID": 3, "SemesterID": 10, "SubjectCode": "ENG1", "Grade": 88, "Teacher": "T2"},       # new document
+    {"StudentID": 1, "SemesterID": 10, "SubjectCode": "PE1", "Grade": 95, "Teacher": "T4"},        # new subject
+    {"StudentID": 0, "SemesterID": 10, "SubjectCode": "MATH1", "Grade": 80, "Teacher": "T1"},      # rejected
+    {"StudentID": 2, "SemesterID": 10, "SubjectCode": "ENG1", "Grade": 120, "Teacher": "T2"},      # rejected
+]
+
+
+def by_key(documents):
+    return {(doc["StudentID"], doc["SemesterID"]): {field: doc[field] for field in ("SubjectCodes", "Grades", "Teachers")} for doc in documents}
+
+
+class GradeUpsertOperationTest(unittest.TestCase):
+    def test_matches_the_snapshot_delta_replay(self):
+        deltas = [
+            grade_delta(1, 10, "SCI1", 91, "T3"),   # subject past the end of Grades / Teachers
+            grade_delta(1, 10, "ENG1", 80, "T2"),   # subject past the end of Grades only
+            grade_delta(1, 10, "MATH1", 86, "T1"),
+            grade_delta(1, 10, "PE1", 95, "T4"),
+            grade_delta(3, 10, "ENG1", 88, "T2"),
+        ]
+        documents = copy.deepcopy(STORED)
+        for delta in deltas:
+            run_upsert(documents, faculty_data_manager._grade_upsert_operation(
+                delta["StudentID"], delta["SemesterID"], delta["SubjectCode"], delta["Grade"], delta["Teacher"]
+            ))
+        replayed = apply_grade_deltas(pd.DataFrame(copy.deepcopy(STORED)), deltas).to_dict("records")
+
+        self.assertEqual(by_key(documents), by_key(replayed))
+        self.assertEqual(by_key(documents)[(1, 10)], {
+            "SubjectCodes": ["MATH1", "ENG1", "SCI1", "PE1"],
+            "Grades": [86, 80, 91, 95],
+            "Teachers": ["T1", "T2", "T3", "T4"],
+        })
+
+    def test_pads_with_nulls_up_to_the_subject(self):
+        documents = [{"StudentID": 1, "SemesterID": 10, "SubjectCodes": ["A", "B", "C"], "Grades": [], "Teachers": None}]
+        run_upsert(documents, faculty_data_manager._grade_upsert_operation(1, 10, "C", 90, "T1"))
+        self.assertEqual(documents[0]["Grades"], [None, None, 90])
+        self.assertEqual(documents[0]["Teachers"], [None, None, "T1"])
+        self.assertNotIn("_subjectIndex", documents[0])
+
+
+class SaveNewStudentGradesBulkTest(unittest.TestCase):
+    def save(self, collection, entries=ENTRIES, teacher=None):
+        recorded = []
+        with mock.patch.object(faculty_data_manager, "db", {"new_grades": collection}), \
+                mock.patch.object(faculty_data_manager, "record_new_grade_changes", recorded.extend):
+            result = faculty_data_manager.save_new_student_grades_bulk(entries, teacher)
+        return result, [(d["StudentID"], d["SemesterID"], d["SubjectCode"], d["Grade"], d["Teacher"]) for d in recorded]
+
+    def test_validation(self):
+        accepted, rejected = faculty_data_manager.validate_grade_entries(ENTRIES)
+        self.assertEqual(len(accepted), 4)
+        self.assertEqual(rejected["StudentID"].tolist(), [0, 2])
+        self.assertEqual(accepted["SubjectCode"].iloc[0], "SCI1")
+        self.assertEqual(accepted["Teacher"].iloc[0], "T3")
+
+        accepted, _ = faculty_data_manager.validate_grade_entries(
+            [{"StudentID": 1, "SemesterID": 10, "SubjectCode": "A", "Grade": 90}], teacher="T9"
+        )
+        self.assertEqual(accepted["Teacher"].tolist(), ["T9"])
+        with self.assertRaises(ValueError):
+            faculty_data_manager.validate_grade_entries([{"StudentID": 1, "Grade": 90}])
+
+    def test_saves_and_records_every_valid_row(self):
+        collection = FakeCollection(STORED)
+        result, recorded = self.save(collection)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["saved"], 4)
+        self.assertEqual(len(result["rejected"]), 2)
+        self.assertEqual(recorded, [
+            (1, 10, "SCI1", 91.0, "T3"), (2, 10, "MATH1", 78.0, "T1"),
+            (3, 10, "ENG1", 88.0, "T2"), (1, 10, "PE1", 95.0, "T4"),
+        ])
+        self.assertEqual(by_key(collection.documents)[(1, 10)]["Grades"], [85, None, 91.0, 95.0])
+
+    def test_partial_failure_records_the_applied_rows(self):
+        collection = FakeCollection(STORED, fail_at=2)
+        result, recorded = self.save(collection)
+        self.assertFalse(result["success"])
+        self.assertEqual(result["saved"], 2)
+        self.assertIn("row 3 failed", result["message"])
+        self.assertEqual(recorded, [(1, 10, "SCI1", 91.0, "T3"), (2, 10, "MATH1", 78.0, "T1")])
+        self.assertNotIn((3, 10), by_key(collection.documents))
+
+    def test_write_concern_error_records_every_row(self):
+        result, recorded = self.save(FakeCollection(STORED, write_concern_error=True))
+        self.assertFalse(result["success"])
+        self.assertEqual(result["saved"], 4)
+        self.assertIn("not acknowledged", result["message"])
+        self.assertEqual(len(recorded), 4)
+
+    def test_nothing_valid_writes_nothing(self):
+        collection = FakeCollection(STORED, fail_at=0)
+        result, recorded = self.save(collection, ENTRIES[4:])
+        self.assertFalse(result["success"])
+        self.assertEqual((result["saved"], recorded), (0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
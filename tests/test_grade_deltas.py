@@ -0,0 +1,211 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from snapshot_store import (
+    FACT_COLUMNS, build_grade_facts, apply_grade_deltas, replay_fact_deltas, grade_delta,
+    write_snapshot, append_grade_deltas, compact_grade_deltas, read_collection,
+    read_collection_facts, read_grade_deltas, decode_dimensions, snapshot_version,
+)
+import data_store
+import snapshot_store
+from data_store import DataStore
+
+
+def grade_documents():
+    return pd.DataFrame([
+        {"StudentID": 1, "SemesterID": 10, "section": "A", "SubjectCodes": ["MATH1", "ENG1"], "Grades": [85, 90], "Teachers": ["T1", "T2"]},
+        {"StudentID": 2, "SemesterID": 10, "section": "A", "SubjectCodes": ["MATH1"], "Grades": ["INC"], "Teachers": ["T1"]},
+        {"StudentID": 1, "SemesterID": 11, "section": "B", "SubjectCodes": ["MATH2", "SCI1", "PE1"], "Grades": [78.5, None, 95], "Teachers": ["T1", "T3", "T4"]},
+    ])
+
+
+def grade_changes():
+    return [
+        grade_delta(1, 10, "MATH1", 88, "T1"),         # overwrite an existing subject
+        grade_delta(2, 10, "MATH1", 80, "T5"),         # INC replaced by a numeric grade
+        grade_delta(1, 11, "PE2", "INC", "T4"),        # new subject in an existing document
+        grade_delta(3, 10, "ENG1", 75, "T2"),          # new document
+        grade_delta(3, 10, "MATH1", 82, "T1"),         # second subject of that new document
+        grade_delta(3, 10, "ENG1", 77, "T6"),          # overwrite a subject added in this batch
+        grade_delta(1, 11, "SCI1", 91, "T3"),          # missing grade filled in
+    ]
+
+
+def sorted_facts(facts):
+    facts = decode_dimensions(facts)[FACT_COLUMNS]
+    facts = facts.astype({"StudentID": "int64", "SemesterID": "int64", "Position": "int32"})
+    for column in ("SubjectCode", "GradeRemark", "Teacher", "section"):
+        facts[column] = facts[column].astype(object).where(facts[column].notna(), None)
+    return facts.sort_values(["StudentID", "SemesterID", "Position"], ignore_index=True)
+
+
+class ApplyGradeDeltasTest(unittest.TestCase):
+    def test_upserts_like_the_mongo_update(self):
+        docs = apply_grade_deltas(grade_documents(), grade_changes())
+        by_key = {(row.StudentID, row.SemesterID): row for row in docs.itertuples()}
+
+        self.assertEqual(len(docs), 4)
+        self.assertEqual(by_key[(1, 10)].Grades, [88, 90])
+        self.assertEqual(by_key[(2, 10)].Teachers, ["T5"])
+        self.assertEqual(by_key[(1, 11)].SubjectCodes, ["MATH2", "SCI1", "PE1", "PE2"])
+        self.assertEqual(by_key[(1, 11)].Grades, [78.5, 91, 95, "INC"])
+        self.assertEqual(by_key[(3, 10)].SubjectCodes, ["ENG1", "MATH1"])
+        self.assertEqual(by_key[(3, 10)].Grades, [77, 82])
+        self.assertEqual(by_key[(3, 10)].Teachers, ["T6", "T1"])
+
+    def test_no_deltas_returns_the_frame(self):
+        docs = grade_documents()
+        self.assertIs(apply_grade_deltas(docs, []), docs)
+
+    def test_does_not_modify_the_input(self):
+        docs = grade_documents()
+        apply_grade_deltas(docs, grade_changes())
+        assert_frame_equal(docs, grade_documents())
+
+
+class ReplayFactDeltasTest(unittest.TestCase):
+    def test_matches_a_full_rebuild(self):
+        rebuilt = build_grade_facts(apply_grade_deltas(grade_documents(), grade_changes()))
+        replayed, _ = replay_fact_deltas(build_grade_facts(grade_documents()), grade_changes())
+        assert_frame_equal(sorted_facts(replayed), sorted_facts(rebuilt))
+
+    def test_batches_match_a_single_replay(self):
+        deltas = grade_changes()
+        facts = build_grade_facts(grade_documents())
+        for start in range(0, len(deltas), 2):
+            facts, _ = replay_fact_deltas(facts, deltas[start:start + 2])
+        rebuilt = build_grade_facts(apply_grade_deltas(grade_documents(), deltas))
+        assert_frame_equal(sorted_facts(facts), sorted_facts(rebuilt))
+
+    def test_reports_each_change(self):
+        _, changes = replay_fact_deltas(build_grade_facts(grade_documents()), grade_changes())
+        self.assertEqual(len(changes), len(grade_changes()))
+
+        overwrite, inc_replaced, new_subject, new_document, second_subject, overwrite_new, filled = changes
+        self.assertEqual((overwrite.old["Grade"], overwrite.new["Grade"]), (85, 88))
+        self.assertFalse(overwrite.new_document)
+        self.assertEqual(inc_replaced.old["GradeRemark"], "INC")
+        self.assertIsNone(inc_replaced.new["GradeRemark"])
+        self.assertIsNone(new_subject.old)
+        self.assertEqual((new_subject.new["GradeRemark"], new_subject.new["Position"], new_subject.new["section"]), ("INC", 3, "B"))
+        self.assertTrue(new_document.new_document)
+        self.assertFalse(second_subject.new_document)
+        self.assertEqual(second_subject.new["Position"], 1)
+        self.assertEqual((overwrite_new.old["Grade"], overwrite_new.new["Grade"]), (75, 77))
+        self.assertTrue(pd.isna(filled.old["Grade"]))
+        self.assertEqual(filled.new["Grade"], 91)
+
+    def test_no_deltas_returns_the_table(self):
+        facts = build_grade_facts(grade_documents())
+        self.assertEqual(replay_fact_deltas(facts, []), (facts, []))
+
+
+class GradeSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.folder, "new_grades.pkl")
+        write_snapshot("new_grades", grade_documents().to_dict("records"), self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def rebuilt_facts(self):
+        return build_grade_facts(apply_grade_deltas(grade_documents(), grade_changes()))
+
+    def test_reads_replay_the_delta_log(self):
+        append_grade_deltas(self.cache_path, grade_changes())
+        assert_frame_equal(sorted_facts(read_collection_facts(self.cache_path)), sorted_facts(self.rebuilt_facts()))
+        assert_frame_equal(sorted_facts(build_grade_facts(read_collection(self.cache_path))), sorted_facts(self.rebuilt_facts()))
+
+    def test_compaction_matches_a_full_rebuild(self):
+        append_grade_deltas(self.cache_path, grade_changes())
+        self.assertEqual(compact_grade_deltas(self.cache_path), len(grade_changes()))
+        self.assertEqual(read_grade_deltas(self.cache_path), [])
+        self.assertEqual(os.listdir(self.folder).count("new_grades.delta.jsonl.lock"), 0)
+        assert_frame_equal(sorted_facts(read_collection_facts(self.cache_path)), sorted_facts(self.rebuilt_facts()))
+        assert_frame_equal(sorted_facts(build_grade_facts(read_collection(self.cache_path))), sorted_facts(self.rebuilt_facts()))
+
+    def test_background_compaction_logs_failures(self):
+        with mock.patch.object(snapshot_store, "compact_grade_deltas", side_effect=OSError("disk full")), \
+                self.assertLogs("snapshot_store", level="ERROR") as logs:
+            snapshot_store._compact_in_background(self.cache_path)
+        self.assertIn("compaction failed", logs.output[0])
+        self.assertIn("OSError: disk full", logs.output[0])
+
+    def no_reads(self):
+        """Patch the store's disk readers so a test fails if the store reloads"""
+        reload = AssertionError("reloaded from disk")
+        return mock.patch.multiple(data_store, read_collection=mock.Mock(side_effect=reload), _read_encoded_facts=mock.Mock(side_effect=reload))
+
+    def test_store_patch_matches_a_reload(self):
+        store = DataStore()
+        store.frame(self.cache_path)
+        store.grade_facts(self.cache_path)
+        versions = append_grade_deltas(self.cache_path, grade_changes())
+        self.assertEqual(versions[1], snapshot_version(self.cache_path))
+        store.apply_grade_deltas(self.cache_path, grade_changes(), versions)
+
+        with self.no_reads():
+            patched_facts = store.grade_facts(self.cache_path)
+            patched_frame = store.frame(self.cache_path)
+        reloaded = DataStore()
+        assert_frame_equal(sorted_facts(patched_facts), sorted_facts(reloaded.grade_facts(self.cache_path)))
+        assert_frame_equal(
+            sorted_facts(build_grade_facts(patched_frame)),
+            sorted_facts(build_grade_facts(reloaded.frame(self.cache_path))),
+        )
+
+    def test_store_reloads_when_another_writer_appended(self):
+        store = DataStore()
+        store.frame(self.cache_path)
+        store.grade_facts(self.cache_path)
+        store.derived("count", lambda: len(store.grade_facts(self.cache_path)), lambda value, changes: value, sources=(self.cache_path,))
+        deltas = grade_changes()
+        append_grade_deltas(self.cache_path, deltas[:3])   # another process, not applied to this store
+        versions = append_grade_deltas(self.cache_path, deltas[3:])
+        store.apply_grade_deltas(self.cache_path, deltas[3:], versions)
+
+        assert_frame_equal(sorted_facts(store.grade_facts(self.cache_path)), sorted_facts(self.rebuilt_facts()))
+        assert_frame_equal(sorted_facts(build_grade_facts(store.frame(self.cache_path))), sorted_facts(self.rebuilt_facts()))
+        self.assertEqual(store.derived("count", lambda: len(store.grade_facts(self.cache_path)), sources=(self.cache_path,)), len(self.rebuilt_facts()))
+
+    def test_append_reports_no_versions_when_the_snapshot_changed_meanwhile(self):
+        real_version = snapshot_store.snapshot_version
+        calls = []
+
+        def version_with_a_concurrent_append(cache_path):
+            calls.append(cache_path)
+            if len(calls) == 2:
+                with open(snapshot_store.delta_log_path(cache_path), "a", encoding="utf-8") as f:
+                    f.write("{}\n")
+            return real_version(cache_path)
+
+        with mock.patch.object(snapshot_store, "snapshot_version", version_with_a_concurrent_append):
+            self.assertIsNone(append_grade_deltas(self.cache_path, grade_changes()[:1]))
+        self.assertIsNotNone(append_grade_deltas(self.cache_path, grade_changes()[1:2]))
+        self.assertIsNone(append_grade_deltas(self.cache_path, []))
+
+    def test_store_drops_derived_values_without_a_handler(self):
+        store = DataStore()
+        store.grade_facts(self.cache_path)
+        store.derived("count", lambda: len(store.grade_facts(self.cache_path)))
+        store.derived("kept", lambda: "value", on_grade_change=lambda value, changes: value, sources=(self.cache_path,))
+        versions = append_grade_deltas(self.cache_path, grade_changes())
+        store.apply_grade_deltas(self.cache_path, grade_changes(), versions)
+
+        self.assertEqual(store.derived("kept", lambda: "rebuilt", sources=(self.cache_path,)), "value")
+        self.assertEqual(store.derived("count", lambda: len(store.grade_facts(self.cache_path))), len(self.rebuilt_facts()))
+
+    def test_derived_values_follow_their_source_versions(self):
+        store = DataStore()
+        store.derived("value", lambda: "first", sources=(self.cache_path,))
+        self.assertEqual(store.derived("value", lambda: "second", sources=(self.cache_path,)), "first")
+        append_grade_deltas(self.cache_path, grade_changes())   # another process
+        self.assertEqual(store.derived("value", lambda: "second", sources=(self.cache_path,)), "second")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from pandas.testing import assert_frame_equal
+from analytics.incomplete import IncompleteGradeIndex
+from snapshot_store import build_grade_facts, replay_fact_deltas, grade_delta
+from tests.test_grade_deltas import grade_documents, grade_changes
+
+
+def sorted_entries(index):
+    entries = index.entries.astype({"StudentID": "int64", "SemesterID": "int64", "Position": "int64"})
+    for column in ("SubjectCode", "Grade", "Teacher", "GradeType"):
+        entries[column] = entries[column].astype(object).where(entries[column].notna(), None)
+    return entries.sort_values(["StudentID", "SemesterID", "Position"], ignore_index=True)
+
+
+class IncompleteGradeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.facts = build_grade_facts(grade_documents())
+        self.index = IncompleteGradeIndex(self.facts)
+
+    def test_entries(self):
+        entries = sorted_entries(self.index)
+        self.assertEqual(entries[["StudentID", "SubjectCode", "Grade", "GradeType"]].values.tolist(), [
+            [1, "SCI1", None, "Missing"],
+            [2, "MATH1", "INC", "Incomplete"],
+        ])
+
+    def test_lookup_by_teacher_and_semester(self):
+        self.assertEqual(self.index.lookup(teacher="T1")["StudentID"].tolist(), [2])
+        self.assertEqual(self.index.lookup(semester_id=11)["SubjectCode"].tolist(), ["SCI1"])
+        self.assertTrue(self.index.lookup(teacher="T1", semester_id=11).empty)
+        self.assertTrue(self.index.lookup(teacher="T9").empty)
+        self.assertEqual(len(self.index.lookup()), 2)
+
+    def test_updated_matches_a_rebuild(self):
+        deltas = grade_changes() + [
+            grade_delta(1, 10, "ENG1", "Dropped", "T2"),   # numeric grade dropped
+            grade_delta(1, 11, "PE2", 88, "T4"),           # INC added in an earlier batch, then graded
+        ]
+        facts, index = self.facts, self.index
+        for start in range(0, len(deltas), 3):
+            facts, changes = replay_fact_deltas(facts, deltas[start:start + 3])
+            index = index.updated(changes)
+        assert_frame_equal(sorted_entries(index), sorted_entries(IncompleteGradeIndex(facts)))
+        self.assertEqual(index.lookup(teacher="T2")["GradeType"].tolist(), ["Dropped"])
+
+    def test_updated_keeps_the_original(self):
+        _, changes = replay_fact_deltas(self.facts, grade_changes())
+        updated = self.index.updated(changes)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(sorted_entries(updated)["SubjectCode"].tolist(), ["PE2"])
+        self.assertIs(self.index.updated([]), self.index)
+
+
+if __name__ == "__main__":
+    unittest.main()
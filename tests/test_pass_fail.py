@@ -0,0 +1,92 @@
+import unittest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from analytics.pass_fail import (
+    subject_pass_fail, pass_fail_rollup, teacher_grade_histogram, update_teacher_grade_histogram, grade_distribution,
+)
+from snapshot_store import build_grade_facts, replay_fact_deltas, grade_delta
+from tests.test_cube import cube
+from tests.test_grade_deltas import grade_documents, grade_changes
+
+# Pass/fail counts as GradeCube.query(by=["SubjectCode", ...], measures=["Fail", "Pass"]) returns them
+COUNTS = pd.DataFrame([
+    ("MATH1", "BSCS", 3, 1), ("MATH1", "BSIT", 1, 1), ("ENG1", "BSCS", 0, 4),
+    ("PE1", "BSCS", 0, 0), ("SCI1", "BSIT", 2, 0),
+], columns=["SubjectCode", "Course", "Fail", "Pass"])
+
+
+class SubjectPassFailTest(unittest.TestCase):
+    def test_rolls_up_to_subjects(self):
+        summary = subject_pass_fail(COUNTS).set_index("Subject")
+        self.assertEqual(summary.index.tolist(), ["ENG1", "MATH1", "SCI1"])
+        self.assertEqual(summary.loc["MATH1", ["Fail", "Pass", "Total"]].tolist(), [4, 2, 6])
+        self.assertEqual(summary.loc["MATH1", "Pass Rate (%)"], 33.33)
+        self.assertEqual(summary.loc["MATH1", "Fail Rate (%)"], 66.67)
+        self.assertEqual(summary.loc["SCI1", "Pass Rate (%)"], 0.0)
+
+    def test_subject_names(self):
+        summary = subject_pass_fail(COUNTS, {"MATH1": "Algebra", "ENG1": "Algebra"})
+        self.assertEqual(summary["Subject"].tolist(), ["Algebra", "SCI1"])
+        self.assertEqual(summary["Total"].tolist(), [10, 2])
+
+    def test_cube_counts_match_the_grades(self):
+        facts = build_grade_facts(grade_documents())
+        graded = facts[facts["Grade"].notna()]
+        for passing_grade in (75, 80, 90):
+            with self.subTest(passing_grade=passing_grade):
+                counts = cube(facts, passing_grade).query(by="SubjectCode", measures=["Fail", "Pass"])
+                summary = subject_pass_fail(counts).set_index("Subject")
+                passed = (graded["Grade"] >= passing_grade).groupby(graded["SubjectCode"]).agg(["sum", "size"])
+                self.assertEqual(summary.index.tolist(), sorted(passed.index))
+                self.assertEqual(summary["Pass"].tolist(), passed.loc[summary.index, "sum"].tolist())
+                self.assertEqual(summary["Total"].tolist(), passed.loc[summary.index, "size"].tolist())
+
+    def test_no_numeric_grades(self):
+        self.assertTrue(subject_pass_fail(COUNTS[COUNTS["SubjectCode"] == "PE1"]).empty)
+
+
+class PassFailRollupTest(unittest.TestCase):
+    def test_best_pass_rate_first(self):
+        rollup = pass_fail_rollup(COUNTS, "Course")
+        self.assertEqual(rollup["Course"].tolist(), ["BSCS", "BSIT"])
+        self.assertEqual(rollup[["Fail", "Pass", "Total"]].values.tolist(), [[3, 5, 8], [3, 1, 4]])
+        self.assertEqual(rollup["Pass Rate (%)"].tolist(), [62.5, 25.0])
+
+    def test_ties_break_on_total_then_pass(self):
+        counts = pd.DataFrame([("A", 1, 1), ("B", 2, 2), ("C", 0, 0), ("D", 4, 4)], columns=["Teacher", "Fail", "Pass"])
+        rollup = pass_fail_rollup(counts, "Teacher")
+        self.assertEqual(rollup["Teacher"].tolist(), ["D", "B", "A"])
+        self.assertEqual(rollup["Pass Rate (%)"].tolist(), [50.0, 50.0, 50.0])
+
+
+class TeacherGradeHistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.facts = build_grade_facts(grade_documents())
+
+    def test_counts_rounded_grades_per_teacher(self):
+        histogram = teacher_grade_histogram(self.facts, {"T1": "Ada"})
+        self.assertEqual(histogram.values.tolist(), [["Ada", 78, 1], ["Ada", 85, 1], ["T2", 90, 1], ["T4", 95, 1]])
+        self.assertEqual(grade_distribution(histogram[histogram["Teacher"] == "Ada"]).values.tolist(), [[78, 1], [85, 1]])
+        self.assertTrue(teacher_grade_histogram(self.facts.iloc[:0]).empty)
+
+    def test_update_matches_a_rebuild(self):
+        deltas = grade_changes() + [
+            grade_delta(1, 10, "MATH1", "INC", "T1"),     # numeric grade replaced by a remark
+            grade_delta(1, 11, "MATH2", 90.4, "T2"),      # grade moves to another teacher
+        ]
+        names = {"T1": "Ada", "T6": "Ada"}
+        facts, histogram = self.facts, teacher_grade_histogram(self.facts, names)
+        for start in range(0, len(deltas), 4):
+            facts, changes = replay_fact_deltas(facts, deltas[start:start + 4])
+            histogram = update_teacher_grade_histogram(histogram, changes, names)
+        assert_frame_equal(histogram, teacher_grade_histogram(facts, names))
+        assert_frame_equal(grade_distribution(histogram), grade_distribution(teacher_grade_histogram(facts, names)))
+
+    def test_update_without_numeric_changes_returns_the_histogram(self):
+        histogram = teacher_grade_histogram(self.facts)
+        _, changes = replay_fact_deltas(self.facts, [grade_delta(2, 10, "MATH1", "Dropped", "T1")])
+        self.assertIs(update_teacher_grade_histogram(histogram, changes), histogram)
+
+
+if __name__ == "__main__":
+    unittest.main()
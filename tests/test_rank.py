@@ -0,0 +1,126 @@
+import unittest
+import numpy as np
+import pandas as pd
+from analytics.rank import GPARankIndex
+from dimensions import DimensionTable
+
+STUDENTS = pd.DataFrame([
+    {"_id": 1, "Course": "A", "YearLevel": 1},
+    {"_id": 2, "Course": "A", "YearLevel": 1},
+    {"_id": 3, "Course": "A", "YearLevel": 2},
+    {"_id": 4, "Course": "B", "YearLevel": 1},
+    {"_id": 5, "Course": "B", "YearLevel": [2]},
+    {"_id": 6, "Course": "A", "YearLevel": 2},
+    {"_id": 8, "Course": "B", "YearLevel": 2},
+    {"_id": 9, "Course": None, "YearLevel": 1},
+])
+
+# Student 7 is not in the students dimension; 2 and 3 tie in semester 10;
+# 6 and 8 only differ past the second decimal
+SEMESTER_GPAS = pd.DataFrame([
+    (1, 10, 90.0), (2, 10, 85.0), (3, 10, 85.0), (4, 10, 95.0), (5, 10, 70.0),
+    (6, 10, 88.333), (7, 10, 99.0), (8, 10, 88.334), (9, 10, 80.0),
+    (1, 11, 80.0), (2, 11, 92.0), (4, 11, 92.0), (6, 11, 60.0),
+], columns=["StudentID", "SemesterID", "GPA"])
+
+BY = [(), ("Course",), ("YearLevel",), ("Course", "YearLevel")]
+
+
+def expected_positions(semester_id, by):
+    """Rank / CohortSize / Percentile per student, computed the slow way"""
+    rows = SEMESTER_GPAS if semester_id is None else SEMESTER_GPAS[SEMESTER_GPAS["SemesterID"] == semester_id]
+    gpa = rows.groupby("StudentID")["GPA"].mean().rename("GPA").reset_index()
+    students = STUDENTS.assign(YearLevel=[v[0] if isinstance(v, list) else v for v in STUDENTS["YearLevel"]])
+    scope = gpa.merge(students, left_on="StudentID", right_on="_id")
+    expected = {}
+    for _, row in scope.iterrows():
+        if any(pd.isna(row[field]) for field in by):
+            continue
+        cohort = scope
+        for field in by:
+            cohort = cohort[cohort[field] == row[field]]
+        expected[row["StudentID"]] = {
+            "Rank": int((cohort["GPA"] > row["GPA"]).sum()) + 1,
+            "CohortSize": len(cohort),
+            "Percentile": 100.0 * (cohort["GPA"] <= row["GPA"]).sum() / len(cohort),
+        }
+    return expected
+
+
+class GPARankIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = GPARankIndex(SEMESTER_GPAS, DimensionTable(STUDENTS))
+
+    def test_positions_match_brute_force(self):
+        for semester_id in (None, 10, 11):
+            for by in BY:
+                expected = expected_positions(semester_id, by)
+                for student_id in STUDENTS["_id"]:
+                    with self.subTest(semester_id=semester_id, by=by, student_id=student_id):
+                        position = self.index.position(student_id, semester_id, by)
+                        if student_id not in expected:
+                            self.assertIsNone(position)
+                            continue
+                        self.assertEqual(position["Rank"], expected[student_id]["Rank"])
+                        self.assertEqual(position["CohortSize"], expected[student_id]["CohortSize"])
+                        self.assertAlmostEqual(position["Percentile"], expected[student_id]["Percentile"])
+
+    def test_ties_share_rank_and_percentile(self):
+        tied = [self.index.position(student_id, 10, by=("Course",)) for student_id in (2, 3)]
+        self.assertEqual([p["Rank"] for p in tied], [3, 3])
+        self.assertEqual([p["Percentile"] for p in tied], [50.0, 50.0])
+        self.assertEqual(self.index.rank_of(85.0, 10, "A"), 3)
+        self.assertEqual(self.index.percentile_of(85.0, 10, "A"), 50.0)
+
+    def test_ranks_unrounded_gpa(self):
+        self.assertEqual(self.index.position(8, 10, by=())["Rank"], 3)
+        self.assertEqual(self.index.position(6, 10, by=())["Rank"], 4)
+        self.assertLess(self.index.position(6, 10)["GPA"], self.index.position(8, 10)["GPA"])
+
+    def test_year_level_lists_use_the_first_entry(self):
+        position = self.index.position(5, 10, by=("Course", "YearLevel"))
+        self.assertEqual((position["Course"], position["YearLevel"]), ("B", 2))
+        self.assertEqual(position["CohortSize"], 2)
+
+    def test_position_is_none_without_a_gpa_or_cohort(self):
+        self.assertIsNone(self.index.position(7, 10))      # not in the students dimension
+        self.assertIsNone(self.index.position(9, 10))      # no course
+        self.assertIsNotNone(self.index.position(9, 10, by=("YearLevel",)))
+        self.assertIsNone(self.index.position(3, 11))      # no grades that semester
+        self.assertIsNone(self.index.position(1, 12))      # unknown semester
+
+    def test_empty_cohort(self):
+        self.assertEqual(self.index.cohort_size(10, "C"), 0)
+        self.assertEqual(self.index.rank_of(90.0, 10, "C"), 1)
+        self.assertIsNone(self.index.percentile_of(90.0, 10, "C"))
+        student_ids, gpas = self.index.top(3, 10, "C")
+        self.assertEqual((len(student_ids), len(gpas)), (0, 0))
+
+    def test_top_keeps_first_seen_order_for_ties(self):
+        student_ids, gpas = self.index.top(4, 10, "A")
+        self.assertEqual(student_ids.tolist(), [1, 6, 2, 3])
+        np.testing.assert_allclose(gpas, [90.0, 88.333, 85.0, 85.0])
+
+    def test_is_top_agrees_with_top(self):
+        for n in range(1, 5):
+            for student_id in STUDENTS["_id"]:
+                with self.subTest(n=n, student_id=student_id):
+                    position = self.index.position(student_id, 10)
+                    listed = position is not None and student_id in self.index.top(n, 10, position["Course"], position["YearLevel"])[0]
+                    self.assertEqual(self.index.is_top(student_id, n, 10), listed)
+        # Exactly n, like the Top Performers tab: the second of two tied students is left out
+        self.assertTrue(self.index.is_top(2, 3, 10, by=("Course",)))
+        self.assertFalse(self.index.is_top(3, 3, 10, by=("Course",)))
+
+    def test_top_per_course_orders_on_unrounded_gpa(self):
+        top = self.index.top_per_course(3, 10)
+        self.assertEqual(top.columns.tolist(), ["StudentID", "Course", "YearLevel", "GPA"])
+        self.assertEqual(top["StudentID"].tolist(), [4, 1, 8, 6, 2, 5])
+        self.assertEqual(top["GPA"].tolist(), [95.0, 90.0, 88.33, 88.33, 85.0, 70.0])
+
+    def test_top_per_course_unknown_semester(self):
+        self.assertTrue(self.index.top_per_course(3, 12).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
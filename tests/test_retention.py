@@ -0,0 +1,71 @@
+import unittest
+import pandas as pd
+from analytics.retention import semester_order, student_activity, retention_status, status_by_year_level
+from analytics.standing import semester_standing
+from snapshot_store import build_grade_facts
+
+# Listed out of order; chronological order is 20, 21, 30, 31
+SEMESTERS = pd.DataFrame([
+    {"_id": 31, "SchoolYear": 2024, "Semester": "SecondSem"},
+    {"_id": 20, "SchoolYear": 2023, "Semester": "FirstSem"},
+    {"_id": 30, "SchoolYear": 2024, "Semester": "FirstSem"},
+    {"_id": 21, "SchoolYear": 2023, "Semester": "SecondSem"},
+])
+
+GRADES = pd.DataFrame([
+    {"StudentID": 1, "SemesterID": 30, "SubjectCodes": ["A"], "Grades": [92], "Teachers": ["T1"]},
+    {"StudentID": 1, "SemesterID": 20, "SubjectCodes": ["B"], "Grades": [70], "Teachers": ["T1"]},
+    {"StudentID": 2, "SemesterID": 31, "SubjectCodes": ["A", "B"], "Grades": [60, 70], "Teachers": ["T1", "T2"]},
+    {"StudentID": 2, "SemesterID": 21, "SubjectCodes": ["A"], "Grades": [95], "Teachers": ["T1"]},
+    {"StudentID": 3, "SemesterID": 31, "SubjectCodes": ["A"], "Grades": ["INC"], "Teachers": ["T1"]},
+    {"StudentID": 4, "SemesterID": 20, "SubjectCodes": ["A"], "Grades": [80], "Teachers": ["T1"]},
+    {"StudentID": 4, "SemesterID": 99, "SubjectCodes": ["A"], "Grades": [80], "Teachers": ["T1"]},   # unknown semester
+    {"StudentID": 5, "SemesterID": 20, "SubjectCodes": ["A"], "Grades": [60], "Teachers": ["T1"]},
+    {"StudentID": 5, "SemesterID": 31, "SubjectCodes": [], "Grades": [], "Teachers": []},
+])
+
+
+def activity():
+    return student_activity(GRADES, SEMESTERS, semester_standing(build_grade_facts(GRADES)))
+
+
+class StudentActivityTest(unittest.TestCase):
+    def test_semester_order(self):
+        self.assertEqual(semester_order(SEMESTERS).sort_values().index.tolist(), [20, 21, 30, 31])
+
+    def test_first_and_last_semester_in_semester_order(self):
+        index = activity()
+        self.assertEqual(index.index.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(index["FirstSemesterID"].tolist(), [20, 21, 31, 99, 20])
+        self.assertEqual(index["LastSemesterID"].tolist(), [30, 31, 31, 20, 31])
+        self.assertEqual(index["SemestersEnrolled"].tolist(), [2, 2, 1, 2, 2])
+        self.assertEqual(index["LatestStatus"].tolist()[:4], ["Dean's List", "Probation", "Probation", "Good Standing"])
+        self.assertTrue(pd.isna(index.loc[5, "LatestStatus"]))     # no standing for a document without subjects
+
+    def test_no_grades(self):
+        index = student_activity(GRADES.iloc[:0], SEMESTERS, semester_standing(build_grade_facts(GRADES.iloc[:0])))
+        self.assertTrue(index.empty)
+        self.assertEqual(index.columns.tolist(), ["FirstSemesterID", "LastSemesterID", "SemestersEnrolled", "LatestStatus"])
+
+
+class RetentionStatusTest(unittest.TestCase):
+    def test_matches_the_status_rules(self):
+        index = activity()
+        statuses = retention_status([1, 2, 3, 4, 5, 6], index, [31])
+        # 1 and 4 were not active in the latest semester; 2 is on probation there;
+        # 3 only has an INC (GPA 0, Probation) there; 5 has a document without
+        # subjects there; 6 has no grade records
+        self.assertEqual(statuses.tolist(), ["Retained", "At Risk", "At Risk", "Retained", "Retained", "Dropped"])
+        self.assertEqual(retention_status([1, 4], index, [30, 20]).tolist(), ["Retained", "Retained"])
+
+    def test_status_by_year_level(self):
+        counts = status_by_year_level([1, 1, 2, 2, 2], ["Retained", "At Risk", "Retained", "Retained", "Dropped"])
+        self.assertEqual(len(counts), 6)
+        counts = counts.set_index(["YearLevel", "Status"])["Count"]
+        self.assertEqual(counts.loc[(1, "Dropped")], 0)
+        self.assertEqual(counts.loc[(2, "Retained")], 2)
+        self.assertEqual(counts.sum(), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from analytics.standing import (
+    semester_standing, update_semester_standing, standing_status, standing_semester_gpa, filter_standing,
+)
+from snapshot_store import build_grade_facts, replay_fact_deltas, grade_delta
+from tests.test_grade_deltas import grade_documents, grade_changes
+
+
+def typed(standing):
+    return standing.astype({"StudentID": "int64", "SemesterID": "int64", "TotalUnits": "int64", "Status": object})
+
+
+class SemesterStandingTest(unittest.TestCase):
+    def setUp(self):
+        self.facts = build_grade_facts(grade_documents())
+        self.standing = semester_standing(self.facts)
+
+    def test_standing(self):
+        self.assertEqual(self.standing[["StudentID", "SemesterID"]].values.tolist(), [[1, 10], [1, 11], [2, 10]])
+        self.assertEqual(self.standing["GPA"].tolist(), [87.5, 86.75, 0.0])
+        self.assertEqual(self.standing["TotalUnits"].tolist(), [2, 2, 0])
+        self.assertEqual(self.standing["Status"].tolist(), ["Good Standing", "Good Standing", "Probation"])
+        self.assertEqual(standing_status([90, 89.99, 75, 74.99]).tolist(), ["Dean's List", "Good Standing", "Good Standing", "Probation"])
+
+    def test_update_matches_a_rebuild(self):
+        facts, changes = replay_fact_deltas(self.facts, grade_changes())
+        assert_frame_equal(typed(update_semester_standing(self.standing, changes)), typed(semester_standing(facts)))
+
+    def test_updates_in_batches_match_a_rebuild(self):
+        deltas = grade_changes() + [
+            grade_delta(1, 10, "ENG1", "Dropped", "T2"),   # numeric grade taken out
+            grade_delta(2, 10, "MATH1", 95, "T1"),         # Probation -> Dean's List
+            grade_delta(4, 11, "PE1", "INC", "T4"),        # new semester without numeric grades
+        ]
+        facts, standing = self.facts, self.standing
+        for start in range(0, len(deltas), 3):
+            facts, changes = replay_fact_deltas(facts, deltas[start:start + 3])
+            standing = update_semester_standing(standing, changes)
+        assert_frame_equal(typed(standing), typed(semester_standing(facts)))
+        self.assertEqual(filter_standing(standing, student_ids=2)["Status"].tolist(), ["Dean's List"])
+
+    def test_update_keeps_the_original(self):
+        original = self.standing.copy()
+        _, changes = replay_fact_deltas(self.facts, grade_changes())
+        update_semester_standing(self.standing, changes)
+        assert_frame_equal(self.standing, original)
+        self.assertIs(update_semester_standing(self.standing, []), self.standing)
+
+    def test_semester_gpa_leaves_out_semesters_without_numeric_grades(self):
+        gpa = standing_semester_gpa(self.standing)
+        self.assertEqual(gpa.columns.tolist(), ["StudentID", "SemesterID", "GPA", "Subjects"])
+        self.assertEqual(gpa[["StudentID", "SemesterID"]].values.tolist(), [[1, 10], [1, 11]])
+        self.assertEqual(filter_standing(self.standing, semester_ids=[10])["StudentID"].tolist(), [1, 2])
+
+    def test_empty_facts(self):
+        standing = semester_standing(self.facts.iloc[:0])
+        self.assertTrue(standing.empty)
+        self.assertEqual(standing.columns.tolist(), ["StudentID", "SemesterID", "Points", "GPA", "TotalUnits", "Status"])
+        self.assertTrue(standing_semester_gpa(standing).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
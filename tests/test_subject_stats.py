@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from analytics.subject_stats import SubjectGradeRanks, subject_statistics
+
+BY = ["SubjectCode", "section", "SemesterID"]
+
+FACTS = pd.DataFrame([
+    (1, 10, "MATH1", 90.0, "A"), (2, 10, "MATH1", 85.0, "A"), (3, 10, "MATH1", 85.0, "A"),
+    (4, 10, "MATH1", np.nan, "A"), (5, 10, "MATH1", 70.0, "A"), (6, 10, "MATH1", 95.0, "B"),
+    (1, 10, "ENG1", 75.0, "A"), (2, 10, "ENG1", 80.0, "A"), (1, 11, "MATH1", 60.0, "A"),
+], columns=["StudentID", "SemesterID", "SubjectCode", "Grade", "section"])
+
+
+class SubjectGradeRanksTest(unittest.TestCase):
+    def setUp(self):
+        self.ranks = SubjectGradeRanks(FACTS, BY)
+
+    def test_matches_pandas_min_rank(self):
+        expected = FACTS.groupby(BY)["Grade"].rank(method="min", ascending=False)
+        np.testing.assert_array_equal(self.ranks.ranks(FACTS).to_numpy(), expected.to_numpy())
+
+    def test_ties_share_the_best_rank(self):
+        self.assertEqual(self.ranks.rank_of(85, "MATH1", "A", 10), 2)
+        self.assertEqual(self.ranks.rank_of(100, "MATH1", "A", 10), 1)
+        self.assertEqual(self.ranks.rank_of(50, "MATH1", "A", 10), 5)
+
+    def test_no_rank_for_remarks_or_unknown_groups(self):
+        self.assertTrue(np.isnan(self.ranks.rank_of("INC", "MATH1", "A", 10)))
+        self.assertTrue(np.isnan(self.ranks.rank_of(None, "MATH1", "A", 10)))
+        self.assertTrue(np.isnan(self.ranks.rank_of(90, "MATH1", "C", 10)))
+
+    def test_single_column_groups(self):
+        ranks = SubjectGradeRanks(FACTS, "SubjectCode")
+        self.assertEqual(ranks.rank_of(85, "MATH1"), 3)
+
+    def test_class_size_and_failures_come_from_subject_statistics(self):
+        stats = subject_statistics(FACTS, BY).set_index(BY)
+        self.assertEqual(stats.loc[("MATH1", "A", 10), "Students"], 5)
+        self.assertEqual(stats.loc[("MATH1", "A", 10), "Count"], 4)
+        self.assertEqual(stats.loc[("MATH1", "A", 10), "Failed"], 1)
+        self.assertEqual(stats.loc[("MATH1", "A", 11), "Failed"], 1)
+        self.assertEqual(stats.loc[("ENG1", "A", 10), "Failed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()